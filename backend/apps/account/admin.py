@@ -48,8 +48,8 @@ class WishlistAdmin(admin.ModelAdmin):
 @admin.register(OTP)
 class OTPAdmin(admin.ModelAdmin):
     """A secure, read-only view for debugging OTP records"""
-    list_display = ('recipient', 'user', 'otp_type', 'status', 'created_at', 'expires_at')
-    list_filter = ('status', 'otp_type')
+    list_display = ('recipient', 'user', 'otp_type', 'status', 'delivery_status', 'created_at', 'expires_at')
+    list_filter = ('status', 'delivery_status', 'otp_type')
     search_fields = ('recipient', 'user__username')
     readonly_fields = [f.name for f in OTP._meta.fields]  # Make all fields read-only to prevent accidental changes
 
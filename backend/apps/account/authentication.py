@@ -0,0 +1,115 @@
+"""
+Authenticated-user resolution without a query per request.
+
+Users are kept in a two-tier cache (see apps.common.cache.TwoTierCache) keyed by id. Saving or deleting a
+user, which includes password changes and deactivation (delete_account), invalidates it in every process
+(see apps.account.signals). Each caller gets its own copy of the cached instance.
+
+Access tokens also carry USER_CACHE_SETTINGS['TOKEN_CLAIMS'] (e.g. is_staff), stamped again on every refresh.
+Read-only requests to views using ClaimsJWTAuthentication build their user from these claims and skip the
+lookup altogether; the claims can be as old as the access token.
+"""
+import copy
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from apps.common.cache import TwoTierCache
+
+User = get_user_model()
+
+_cache = TwoTierCache(
+    channel=settings.USER_CACHE_SETTINGS['CHANNEL'],
+    max_entries=settings.USER_CACHE_SETTINGS['MAX_ENTRIES'],
+    local_ttl=settings.USER_CACHE_SETTINGS['LOCAL_TTL'],
+    ttl=settings.USER_CACHE_SETTINGS['TTL'],
+)
+
+
+def _user_key(user_id) -> str:
+    return f'user:{user_id}'
+
+
+def get_cached_user(user_id) -> Optional[User]:
+    """The user with the given id, or None; a copy the caller may modify and save."""
+    user = _cache.get(_user_key(user_id), lambda: User.objects.filter(pk=user_id).first())
+    # copy.copy() gives the instance its own state and related-object cache (Model.__getstate__).
+    return copy.copy(user) if user is not None else None
+
+
+def invalidate_user(user_id) -> None:
+    _cache.invalidate(_user_key(user_id))
+
+
+def stamp_token_claims(token, user) -> None:
+    for claim in settings.USER_CACHE_SETTINGS['TOKEN_CLAIMS']:
+        token[claim] = getattr(user, claim)
+
+
+class UserRefreshToken(RefreshToken):
+    """A refresh token whose access tokens carry the user's TOKEN_CLAIMS."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        stamp_token_claims(token, user)
+        return token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves the token's user through the user cache."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
+
+
+class ClaimsJWTAuthentication(CachedJWTAuthentication):
+    """
+    For views whose read-only requests need no more of the user than its id and TOKEN_CLAIMS: GET, HEAD and
+    OPTIONS requests get an unsaved User built from the token; other requests, and tokens issued without
+    the claims, are resolved as usual. The user may have been deactivated since the token was issued.
+    """
+
+    def authenticate(self, request):
+        self.read_only = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        claims = settings.USER_CACHE_SETTINGS['TOKEN_CLAIMS']
+        if not self.read_only or not claims or any(claim not in validated_token for claim in claims):
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = User(pk=user_id, is_active=True, **{claim: validated_token[claim] for claim in claims})
+        # Lets the ORM treat it as an existing row, e.g. in filter(user=request.user).
+        user._state.adding = False
+        user._state.db = 'default'
+        return user
@@ -3,6 +3,8 @@ from django.db.models import Q
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
 
+from apps.account.authentication import get_cached_user
+
 logger = logging.getLogger(__name__)
 
 User = get_user_model()
@@ -39,12 +41,11 @@ class IdentifierBackend(ModelBackend):
         return None
 
     def get_user(self, user_id):
-        """Retrieves a user instance from the database, given a user ID. This is required for the session framework to work correctly."""
-        try:
-            return User.objects.get(pk=user_id)
-        except User.DoesNotExist:
+        """Retrieves a user instance through the user cache, given a user ID. This is required for the session framework to work correctly."""
+        user = get_cached_user(user_id)
+        if user is None:
             logger.warning(f"Failed to get user with id={user_id}: User does not exist.")
-            return None
+        return user
 
 
 class OTPBackend(ModelBackend):
@@ -61,9 +62,8 @@ class OTPBackend(ModelBackend):
         return None
 
     def get_user(self, user_id):
-        """Retrieves a user instance from the database, given a user ID."""
-        try:
-            return User.objects.get(pk=user_id)
-        except User.DoesNotExist:
+        """Retrieves a user instance through the user cache, given a user ID."""
+        user = get_cached_user(user_id)
+        if user is None:
             logger.warning(f"Failed to get user with id={user_id}: User does not exist.")
-            return None
+        return user
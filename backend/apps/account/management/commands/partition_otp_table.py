@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common import partitions
+from apps.account.models import OTP
+
+
+class Command(BaseCommand):
+    help = (
+        'Converts the OTP table into monthly range partitions on created_at (PostgreSQL), so the '
+        'purge_expired_otps task drops old months instead of deleting rows. Existing rows stay in place, in '
+        'a partition of their own. Run once, when the table is quiet; the switch takes a short exclusive lock.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Print the statements without running them.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning is only available for PostgreSQL databases.')
+        table = OTP._meta.db_table
+        if partitions.is_partitioned(table):
+            self.stdout.write(f'{table} is already partitioned.')
+            return
+
+        try:
+            statements = partitions.partition_table(
+                table, 'created_at', timezone.now(),
+                months_ahead=settings.ACCOUNT_RETENTION_SETTINGS['PARTITION_MONTHS_AHEAD'],
+                execute=not options['dry_run'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for statement in statements:
+            self.stdout.write(f'{statement};')
+        if not options['dry_run']:
+            partition_names = ', '.join(sorted(partitions.get_partitions(table)))
+            self.stdout.write(self.style.SUCCESS(f'{table} is now partitioned: {partition_names}.'))
@@ -1,3 +1,5 @@
+import time
+
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.base_user import BaseUserManager
@@ -45,6 +47,48 @@ class UserManager(BaseUserManager):
 
         return self._create_user(phone_number, password, **extra_fields)
 
+    def stale(self, older_than):
+        """
+        Accounts created by requesting a code (RequestOTPSerializer) and never used: inactive, phone number
+        never verified, never logged in, created before `older_than` and without a code requested since.
+        Deactivated (anonymized) accounts are not stale.
+
+        A code request leaves an OTP row and an outbox message only with DatabaseOTPStore. RedisOTPStore
+        writes neither until the code is verified, so an old account that is logging in right now is only
+        found by the store itself; purge_stale() asks it for live codes before deleting.
+        """
+        return self.filter(
+            is_active=False,
+            is_phone_number_verified=False,
+            is_staff=False,
+            is_superuser=False,
+            last_login_at__isnull=True,
+            created_at__lt=older_than,
+        ).exclude(phone_number__startswith='_deleted_').exclude(otps__created_at__gte=older_than).exclude(
+            outbox_messages__created_at__gte=older_than,
+        )
+
+    def purge_stale(self, older_than, batch_size: int = 500, pause: float = 0) -> int:
+        """
+        Deletes stale accounts with their related rows, one short transaction per batch. Accounts holding a
+        live code in the OTP store are skipped.
+        """
+        from apps.account.otp_stores import get_otp_store
+
+        deleted, last_pk = 0, 0
+        while True:
+            users = list(
+                self.stale(older_than).filter(pk__gt=last_pk).order_by('pk').only('pk', 'phone_number', 'email')[:batch_size]
+            )
+            if not users:
+                return deleted
+            last_pk = users[-1].pk
+            live = get_otp_store().users_with_live_codes(users)
+            batch = [user.pk for user in users if user.pk not in live]
+            # Filtered again, in case an account was used since the batch was read.
+            deleted += self.stale(older_than).filter(pk__in=batch).delete()[1].get(self.model._meta.label, 0)
+            time.sleep(pause)
+
 
 class OTPManager(models.Manager):
     """Manager for the OTP model."""
@@ -66,3 +110,35 @@ class OTPManager(models.Manager):
 
     def get_latest_otp(self, user, otp_type, recipient):
         return self.filter(user=user, otp_type=otp_type, recipient=recipient).order_by('-created_at').first()
+
+    def purge(self, older_than, batch_size: int = 1000, pause: float = 0) -> int:
+        """
+        Deletes OTPs created before `older_than` in batches, to keep each transaction short. Ids grow with
+        creation time, so the batches are read from the primary key index, below the first id created since
+        `older_than`, rather than by scanning created_at.
+        """
+        queryset = self.filter(created_at__lt=older_than)
+        boundary = self.filter(created_at__gte=older_than).order_by('pk').values_list('pk', flat=True).first()
+        if boundary is not None:
+            queryset = queryset.filter(pk__lt=boundary)
+
+        deleted = 0
+        while True:
+            batch = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                return deleted
+            deleted += self.filter(pk__in=batch).delete()[0]
+            time.sleep(pause)
+
+    def record_outcome(self, created_at=None, **fields):
+        """
+        Writes the outcome of an OTP that was kept outside this table (RedisOTPStore) for auditing,
+        keeping its original creation and expiry times.
+        """
+        otp_instance = self.model(**fields)
+        # bulk_create skips save(), which would reset expires_at.
+        self.bulk_create([otp_instance])
+        if created_at is not None:
+            self.filter(pk=otp_instance.pk).update(created_at=created_at)
+            otp_instance.created_at = created_at
+        return otp_instance
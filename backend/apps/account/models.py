@@ -202,6 +202,12 @@ class OTP(TimeStampedModel):
         EXPIRED = 'expired', _('Expired')
         FAILED = 'failed', _('Failed')
 
+    class DeliveryStatusChoices(models.TextChoices):
+        QUEUED = 'queued', _('Queued')
+        RETRYING = 'retrying', _('Retrying')
+        SENT = 'sent', _('Sent')
+        FAILED = 'failed', _('Failed')
+
     user = models.ForeignKey(
         "User",
         on_delete=models.CASCADE,
@@ -247,6 +253,30 @@ class OTP(TimeStampedModel):
         verbose_name=_("Verified At"),
         help_text=_("The date and time when this OTP was successfully verified. This field is set when the OTP status changes to VERIFIED.")
     )
+    delivery_status = models.CharField(
+        max_length=10,
+        choices=DeliveryStatusChoices.choices,
+        default=DeliveryStatusChoices.QUEUED,
+        verbose_name=_("Delivery Status"),
+        help_text=_("Whether the code has been handed to the SMS or email provider. Delivery runs in the background.")
+    )
+    delivery_attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name=_("Delivery Attempts"),
+        help_text=_("The number of failed attempts to send this OTP.")
+    )
+    delivered_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Delivered At"),
+        help_text=_("The date and time when the provider accepted the OTP message.")
+    )
+    delivery_error = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name=_("Delivery Error"),
+        help_text=_("The last error returned by the provider, if any.")
+    )
 
     objects = OTPManager()
 
@@ -285,6 +315,19 @@ class OTP(TimeStampedModel):
         self.status = self.StatusChoices.FAILED
         self.save(update_fields=['status'])
 
+    def mark_as_delivered(self):
+        self.delivery_status = self.DeliveryStatusChoices.SENT
+        self.delivered_at = timezone.now()
+        self.delivery_error = ''
+        self.save(update_fields=['delivery_status', 'delivered_at', 'delivery_error'])
+
+    def record_delivery_failure(self, error, final=False):
+        """Records a failed send; `final` when no further attempt will be made."""
+        self.delivery_status = self.DeliveryStatusChoices.FAILED if final else self.DeliveryStatusChoices.RETRYING
+        self.delivery_attempts += 1
+        self.delivery_error = str(error)[:255]
+        self.save(update_fields=['delivery_status', 'delivery_attempts', 'delivery_error'])
+
 
 class Address(TimeStampedModel):
     user = models.ForeignKey(
@@ -0,0 +1,269 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.utils.translation import gettext_lazy as _
+from django.core.exceptions import ImproperlyConfigured
+
+from apps.account.models import OTP
+from apps.account.utils import generate_numeric_otp
+from apps.common.cache import get_redis_client
+from apps.account.exceptions import OTPValidationError, OTPCooldownError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_CLASS = 'apps.account.otp_stores.DatabaseOTPStore'
+
+# Counts the attempt and checks the code in one step, so concurrent guesses cannot get past MAX_ATTEMPTS
+# and a correct code is consumed exactly once. Returns nil when there is no live code, otherwise
+# {attempts, matched, code, created_at, expires_at}.
+_VERIFY_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return false
+end
+local attempts = redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+local fields = redis.call('HMGET', KEYS[1], 'code', 'created_at', 'expires_at')
+local matched = 0
+if fields[1] == ARGV[1] then
+    matched = 1
+    redis.call('DEL', KEYS[1])
+elseif attempts >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+end
+return {attempts, matched, fields[1], fields[2], fields[3]}
+"""
+
+
+class BaseOTPStore:
+    """Where live OTPs are kept between generation and verification (OTP_SETTINGS['STORE_CLASS'])."""
+    # Whether codes are sent through the notification outbox, i.e. written to the database with the OTP.
+    sends_through_outbox = True
+
+    def check_cooldown(self, user, otp_type, recipient) -> None:
+        """Raises OTPCooldownError when a code was requested too recently."""
+        raise NotImplementedError
+
+    def create(self, user, otp_type, recipient) -> OTP:
+        """Generates a code that supersedes any earlier one for the recipient."""
+        raise NotImplementedError
+
+    def verify(self, user, otp_type, recipient, code) -> bool:
+        """Returns True for a valid code, otherwise raises OTPValidationError."""
+        raise NotImplementedError
+
+    def release_cooldown(self, user, otp_type, recipient) -> None:
+        """Lets the user request a new code at once, e.g. when the last one could not be delivered."""
+
+    def users_with_live_codes(self, users) -> set:
+        """
+        Ids of the given users holding a code that can still be verified, sent to their phone number or
+        email. Codes kept in the OTP table need no lookup here, as queries on that table already find them.
+        """
+        return set()
+
+
+class DatabaseOTPStore(BaseOTPStore):
+    """Keeps every OTP as a row of the OTP table, which is also its audit trail."""
+
+    def check_cooldown(self, user, otp_type, recipient):
+        cooldown_seconds = settings.OTP_SETTINGS.get('COOLDOWN_SECONDS', 60)
+        cooldown_time = timezone.now() - timedelta(seconds=cooldown_seconds)
+
+        # A code that could not be delivered does not hold the user back.
+        latest_otp = OTP.objects.filter(
+            user=user,
+            otp_type=otp_type,
+            recipient=recipient,
+            created_at__gte=cooldown_time
+        ).exclude(delivery_status=OTP.DeliveryStatusChoices.FAILED).order_by('-created_at').first()
+
+        if latest_otp:
+            cooldown_end_time = latest_otp.created_at + timedelta(seconds=cooldown_seconds)
+            remaining_cooldown = cooldown_end_time - timezone.now()
+            remaining_seconds = max(0, int(remaining_cooldown.total_seconds()))
+
+            if remaining_seconds > 0:
+                raise OTPCooldownError(
+                    _("Please wait %(seconds)d seconds before requesting a new code.") % {'seconds': remaining_seconds},
+                    remaining_seconds=remaining_seconds
+                )
+
+        # if OTP.objects.filter(user=user, otp_type=otp_type, recipient=recipient, created_at__gte=cooldown_time).exists():
+        #     raise OTPCooldownError(_("Please wait %(seconds)d seconds before requesting a new code.") % {'seconds': cooldown_seconds})
+
+    def create(self, user, otp_type, recipient):
+        return OTP.objects.create_otp(user, otp_type, recipient)
+
+    def verify(self, user, otp_type, recipient, code):
+        max_attempts = settings.OTP_SETTINGS.get('MAX_ATTEMPTS', 5)
+        otp_instance = OTP.objects.get_latest_otp(user, otp_type, recipient)
+
+        if not otp_instance:
+            raise OTPValidationError(_("No OTP found for this recipient. Please request a new one."))
+
+        if otp_instance.status == OTP.StatusChoices.VERIFIED:
+            raise OTPValidationError(_("This OTP has already been used and verified."))
+
+        if otp_instance.status in [OTP.StatusChoices.EXPIRED, OTP.StatusChoices.FAILED]:
+            raise OTPValidationError(_("This OTP is no longer valid. Please request a new one."))
+
+        if otp_instance.is_expired:
+            otp_instance.mark_as_failed()
+            raise OTPValidationError(_("OTP code has expired."))
+
+        if otp_instance.attempts >= max_attempts:
+            otp_instance.mark_as_failed()
+            raise OTPValidationError(_("Maximum verification attempts exceeded."))
+
+        if otp_instance.code != code:
+            otp_instance.increment_attempts()
+            # After incrementing, check if it now exceeds max attempts
+            if otp_instance.attempts >= max_attempts:
+                otp_instance.mark_as_failed()
+                raise OTPValidationError(_("Invalid OTP code. Maximum attempts exceeded."))
+            else:
+                # Notice: Revealing remaining attempts may reduce security. Consider removing this message.
+                remaining_attempts = max_attempts - otp_instance.attempts
+                raise OTPValidationError(_(f"Invalid OTP code. You have {remaining_attempts} attempts remaining."))
+                # raise OTPValidationError(_("Invalid OTP code."))
+
+        otp_instance.mark_as_verified()
+        return True
+
+
+class RedisOTPStore(BaseOTPStore):
+    """
+    Keeps live OTPs in Redis, where they expire on their own, instead of writing and updating a row per
+    request and attempt. The resend cooldown is a key set with NX, and attempts are counted atomically by
+    _VERIFY_SCRIPT. Only the outcome (verified, or failed after MAX_ATTEMPTS) reaches the OTP table, written
+    by the record_otp_outcome task for auditing; codes that simply expire leave no row.
+
+    Codes are not sent through the notification outbox either, which would write and update a row holding
+    the code: the send_otp_message task carries it in the broker and expires with it. A code whose task
+    cannot be queued is not sent at all, and the request fails so the user can ask again.
+    """
+    sends_through_outbox = False
+    CODE_KEY = 'otp:code:{otp_type}:{user_id}:{recipient}'
+    COOLDOWN_KEY = 'otp:cooldown:{otp_type}:{user_id}:{recipient}'
+
+    def __init__(self):
+        cache_alias = settings.OTP_SETTINGS.get('REDIS_CACHE_ALIAS', 'default')
+        self.client = get_redis_client(cache_alias)
+        if self.client is None:
+            raise ImproperlyConfigured(f"RedisOTPStore needs a django-redis cache; '{cache_alias}' is not one.")
+        self._verify = self.client.register_script(_VERIFY_SCRIPT)
+
+    def _key(self, template, user, otp_type, recipient):
+        return template.format(otp_type=otp_type, user_id=user.pk, recipient=recipient)
+
+    def check_cooldown(self, user, otp_type, recipient):
+        # Checking and starting the cooldown is one command, so parallel requests cannot both pass.
+        cooldown_seconds = settings.OTP_SETTINGS.get('COOLDOWN_SECONDS', 60)
+        key = self._key(self.COOLDOWN_KEY, user, otp_type, recipient)
+        if self.client.set(key, 1, nx=True, ex=cooldown_seconds):
+            return
+
+        remaining_seconds = max(self.client.ttl(key), 1)
+        raise OTPCooldownError(
+            _("Please wait %(seconds)d seconds before requesting a new code.") % {'seconds': remaining_seconds},
+            remaining_seconds=remaining_seconds
+        )
+
+    def create(self, user, otp_type, recipient):
+        created_at = timezone.now()
+        expires_at = created_at + timedelta(minutes=settings.OTP_SETTINGS.get('OTP_EXPIRY_MINUTES', 2))
+        otp_instance = OTP(
+            user=user, code=generate_numeric_otp(), otp_type=otp_type, recipient=recipient,
+            created_at=created_at, expires_at=expires_at,
+        )
+
+        key = self._key(self.CODE_KEY, user, otp_type, recipient)
+        pipeline = self.client.pipeline()
+        pipeline.delete(key)
+        pipeline.hset(key, mapping={
+            'code': otp_instance.code,
+            'attempts': 0,
+            'created_at': created_at.isoformat(),
+            'expires_at': expires_at.isoformat(),
+        })
+        pipeline.expireat(key, expires_at)
+        pipeline.execute()
+        return otp_instance
+
+    def verify(self, user, otp_type, recipient, code):
+        max_attempts = settings.OTP_SETTINGS.get('MAX_ATTEMPTS', 5)
+        key = self._key(self.CODE_KEY, user, otp_type, recipient)
+        result = self._verify(keys=[key], args=[str(code), max_attempts])
+
+        # Expired, consumed, or locked out: Redis no longer tells these apart.
+        if result is None:
+            raise OTPValidationError(_("No OTP found for this recipient. Please request a new one."))
+
+        attempts, matched, issued = int(result[0]), int(result[1]), result[2:]
+        if matched:
+            self._record_outcome(user, otp_type, recipient, OTP.StatusChoices.VERIFIED, attempts, *issued)
+            return True
+
+        if attempts >= max_attempts:
+            self._record_outcome(user, otp_type, recipient, OTP.StatusChoices.FAILED, attempts, *issued)
+            raise OTPValidationError(_("Invalid OTP code. Maximum attempts exceeded."))
+
+        # Notice: Revealing remaining attempts may reduce security. Consider removing this message.
+        remaining_attempts = max_attempts - attempts
+        raise OTPValidationError(_(f"Invalid OTP code. You have {remaining_attempts} attempts remaining."))
+
+    def release_cooldown(self, user, otp_type, recipient):
+        self.client.delete(self._key(self.COOLDOWN_KEY, user, otp_type, recipient))
+
+    def users_with_live_codes(self, users):
+        checked = [
+            (user.pk, self._key(self.CODE_KEY, user, otp_type, recipient))
+            for user in users
+            for otp_type, recipient in ((OTP.TypeChoices.SMS, user.phone_number), (OTP.TypeChoices.EMAIL, user.email))
+            if recipient
+        ]
+        pipeline = self.client.pipeline(transaction=False)
+        for _user_id, key in checked:
+            pipeline.exists(key)
+        return {user_id for (user_id, _key), exists in zip(checked, pipeline.execute()) if exists}
+
+    @staticmethod
+    def _record_outcome(user, otp_type, recipient, status, attempts, code, created_at, expires_at):
+        from apps.account.tasks import record_otp_outcome
+
+        code, created_at, expires_at = (value.decode() if isinstance(value, bytes) else value for value in (code, created_at, expires_at))
+        outcome = {
+            'user_id': user.pk,
+            'otp_type': otp_type,
+            'recipient': recipient,
+            'code': code,
+            'status': status,
+            'attempts': attempts,
+            'created_at': created_at,
+            'expires_at': expires_at,
+            'verified_at': timezone.now().isoformat() if status == OTP.StatusChoices.VERIFIED else None,
+        }
+        try:
+            record_otp_outcome.delay(**outcome)
+        except Exception as e:
+            # The audit row is cheap to write here and should not be lost with the broker.
+            logger.warning(f"Could not queue the OTP outcome for user {user.pk}, writing it inline: {e}")
+            record_otp_outcome(**outcome)
+
+
+_store = None
+
+
+def get_otp_store() -> BaseOTPStore:
+    """The store selected by OTP_SETTINGS['STORE_CLASS'], shared by the process."""
+    global _store
+    if _store is None:
+        _store = import_string(settings.OTP_SETTINGS.get('STORE_CLASS', DEFAULT_STORE_CLASS))()
+    return _store
+
+
+def reset_otp_store() -> None:
+    global _store
+    _store = None
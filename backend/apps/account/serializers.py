@@ -9,16 +9,20 @@ from django.core.exceptions import ValidationError as DjangoValidationError
 from django.contrib.auth import authenticate, get_user_model, password_validation
 
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from phonenumber_field.serializerfields import PhoneNumberField
 
 from apps.common.utils import get_client_ip
 from apps.account.services import OTPService
+from apps.notification.services import OutboxService
 from apps.products.models import ProductVariant
 from apps.account.utils import get_identifier_info
-from apps.products.serializers import ProductListSerializer
+from apps.common.serializers import ProjectedModelSerializer
 from apps.account.tokens import password_reset_token_generator
 from apps.account.models import OTP, Profile, Address, Wishlist
+from apps.account.authentication import UserRefreshToken, get_cached_user, stamp_token_claims
 from apps.account.exceptions import OTPValidationError, OTPGenerationError, OTPCooldownError
 
 logger = logging.getLogger(__name__)
@@ -122,7 +126,7 @@ class VerifyOTPAndLoginSerializer(serializers.Serializer):
         if not authenticated_user:
             raise serializers.ValidationError(_("Authentication failed after OTP verification. Please contact support."))
 
-        refresh_token = RefreshToken.for_user(authenticated_user)
+        refresh_token = UserRefreshToken.for_user(authenticated_user)
         return {
             'is_new_user': is_new_user,
             'access_token': str(refresh_token.access_token),
@@ -173,7 +177,7 @@ class LoginWithPasswordSerializer(serializers.Serializer):
             user.last_login_ip = get_client_ip(request=request)
         user.save(update_fields=['last_login_at', 'last_login_ip'])
 
-        refresh_token = RefreshToken.for_user(user)
+        refresh_token = UserRefreshToken.for_user(user)
         return {
             'access_token': str(refresh_token.access_token),
             'refresh_token': str(refresh_token),
@@ -181,6 +185,36 @@ class LoginWithPasswordSerializer(serializers.Serializer):
         }
 
 
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refreshes the access token with the user's current token claims, looking the user up in the user cache."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = get_cached_user(refresh.payload.get(jwt_settings.USER_ID_CLAIM))
+        if user is None or not jwt_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+
+        access = refresh.access_token
+        stamp_token_claims(access, user)
+        data = {'access': str(access)}
+
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            if jwt_settings.BLACKLIST_AFTER_ROTATION:
+                try:
+                    refresh.blacklist()
+                except AttributeError:
+                    # The token_blacklist app is not installed.
+                    pass
+            stamp_token_claims(refresh, user)
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+
+        return data
+
+
 class ProfileSerializer(serializers.ModelSerializer):
     """Serializer for the Profile model, used as a nested serializer."""
 
@@ -390,6 +424,8 @@ class PasswordResetRequestSerializer(serializers.Serializer):
     @staticmethod
     def _send_password_reset_email(user):
         """Generates and sends a password reset email to the user."""
+        if not user.email:
+            return
         uid = urlsafe_base64_encode(smart_bytes(user.pk))
         token = password_reset_token_generator.make_token(user)
 
@@ -397,14 +433,17 @@ class PasswordResetRequestSerializer(serializers.Serializer):
         frontend_url = settings.FRONTEND_URL.get('PASSWORD_RESET_CONFIRM')
         reset_url = f"{frontend_url}?uidb64={uid}&token={token}"
 
-        user.email_user(
-            subject=_("Password Reset Request"),
-            message=_("You have requested a password reset. Click the link below to reset your password:\n\n %(reset_url)s") % {'reset_url': reset_url},
+        OutboxService.enqueue(
+            'email',
+            user.email,
+            user=user,
+            kind='password_reset',
+            subject=str(_("Password Reset Request")),
+            message=str(_("You have requested a password reset. Click the link below to reset your password:\n\n %(reset_url)s") % {'reset_url': reset_url}),
             template_name='notifications/email/password_reset.html',
             context={
-                'user': user,
                 'reset_url': reset_url,
-                'site_name': settings.SITE_NAME
+                'site_name': str(settings.SITE_NAME)
             }
         )
 
@@ -497,7 +536,7 @@ class AddressSerializer(serializers.ModelSerializer):
 
 # NOTE: This is a simplified serializer for the variant.
 # In the future, we would import a more complete serializer from the 'products' app.
-class WishlistVariantSerializer(serializers.ModelSerializer):
+class WishlistVariantSerializer(ProjectedModelSerializer):
     """A simple serializer to represent a product variant within the wishlist."""
     product_name = serializers.CharField(source='product.name', read_only=True)
 
@@ -506,12 +545,12 @@ class WishlistVariantSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'sku', 'product_name')
 
 
-class WishlistSerializer(serializers.ModelSerializer):
+class WishlistSerializer(ProjectedModelSerializer):
     """
     Serializer for retrieving the user's wishlist details.
-    It uses the comprehensive ProductListSerializer to represent each variant.
+    Each entry is a ProductVariant, represented with the lightweight WishlistVariantSerializer.
     """
-    variants = ProductListSerializer(many=True, read_only=True)
+    variants = WishlistVariantSerializer(many=True, read_only=True)
 
     class Meta:
         model = Wishlist
@@ -1,97 +1,81 @@
-from datetime import timedelta
 from django.conf import settings
-from django.utils import timezone
+from django.db import transaction
+from django.utils import translation
 from django.utils.translation import gettext_lazy as _
 
 from apps.account.models import OTP
-from apps.account.exceptions import OTPGenerationError, OTPValidationError, OTPCooldownError
+from apps.account.otp_stores import get_otp_store
+from apps.account.exceptions import OTPGenerationError
+from apps.notification.services import OutboxService
 
 
 class OTPService:
     def __init__(self, user):
         self.user = user
+        self.store = get_otp_store()
 
-    def _check_cooldown(self, otp_type, recipient):
-        """Prevents sending OTPs too frequently and calculates remaining time."""
-        cooldown_seconds = settings.OTP_SETTINGS.get('COOLDOWN_SECONDS', 60)
-        cooldown_time = timezone.now() - timedelta(seconds=cooldown_seconds)
+    def generate_and_send_otp(self, otp_type, recipient):
+        """
+        Main method to generate and store an OTP, and trigger its sending by a worker on the `otp` queue.
+        Codes kept in the database are written to the notification outbox in the same transaction as the OTP;
+        codes kept in Redis are handed to the send_otp_message task instead (see RedisOTPStore).
+        """
+        self.store.check_cooldown(self.user, otp_type, recipient)
+        try:
+            with transaction.atomic():
+                otp_instance = self.store.create(self.user, otp_type, recipient)
+                self._enqueue_otp_message(otp_instance)
+        except Exception:
+            self.store.release_cooldown(self.user, otp_type, recipient)
+            raise
+        return otp_instance
 
-        latest_otp = OTP.objects.filter(
+    def _enqueue_otp_message(self, otp_instance):
+        message = str(_("Your verification code is: %(otp_code)s") % {'otp_code': otp_instance.code})
+        payload = {'message': message}
+        if otp_instance.otp_type == OTP.TypeChoices.EMAIL:
+            payload.update(
+                subject=str(_("Your Verification Code")),
+                template_name='notifications/email/otp.html',
+                context={'otp_code': otp_instance.code, 'site_name': str(settings.SITE_NAME)},
+            )
+        if not self.store.sends_through_outbox:
+            transaction.on_commit(lambda: self._dispatch_otp_message(otp_instance, payload))
+            return
+
+        # A code that can no longer be verified is not worth sending.
+        OutboxService.enqueue(
+            otp_instance.otp_type,
+            otp_instance.recipient,
             user=self.user,
-            otp_type=otp_type,
-            recipient=recipient,
-            created_at__gte=cooldown_time
-        ).order_by('-created_at').first()
-
-        if latest_otp:
-            cooldown_end_time = latest_otp.created_at + timedelta(seconds=cooldown_seconds)
-            remaining_cooldown = cooldown_end_time - timezone.now()
-            remaining_seconds = max(0, int(remaining_cooldown.total_seconds()))
+            kind='otp',
+            object_id=otp_instance.pk,
+            expires_at=otp_instance.expires_at,
+            queue='otp',
+            **payload,
+        )
 
-            if remaining_seconds > 0:
-                raise OTPCooldownError(
-                    _("Please wait %(seconds)d seconds before requesting a new code.") % {'seconds': remaining_seconds},
-                    remaining_seconds=remaining_seconds
-                )
-
-        # if OTP.objects.filter(user=self.user, otp_type=otp_type, recipient=recipient, created_at__gte=cooldown_time).exists():
-        #     raise OTPCooldownError(_("Please wait %(seconds)d seconds before requesting a new code.") % {'seconds': cooldown_seconds})
-
-    def generate_and_send_otp(self, otp_type, recipient):
-        """Main method to generate, store, and trigger the sending of an OTP."""
-        self._check_cooldown(otp_type, recipient)
-        otp_instance = OTP.objects.create_otp(self.user, otp_type, recipient)
+    @staticmethod
+    def _dispatch_otp_message(otp_instance, payload):
+        from apps.account.tasks import send_otp_message
 
         try:
-            if otp_type == OTP.TypeChoices.EMAIL:
-                self.user.email_user(
-                    subject=_("Your Verification Code"),
-                    message=_("Your verification code is: %(otp_code)s") % {'otp_code': otp_instance.code},
-                    template_name='notifications/email/otp.html',
-                    context={'otp_code': otp_instance.code, 'site_name': settings.SITE_NAME}
-                )
-            elif otp_type == OTP.TypeChoices.SMS:
-                self.user.sms_user(message=_("Your verification code is: %(otp_code)s") % {'otp_code': otp_instance.code})
+            send_otp_message.apply_async(
+                kwargs={
+                    'user_id': otp_instance.user_id,
+                    'otp_type': otp_instance.otp_type,
+                    'recipient': otp_instance.recipient,
+                    'payload': payload,
+                    'language': translation.get_language() or '',
+                    'expires_at': otp_instance.expires_at.isoformat(),
+                },
+                queue='otp',
+                expires=otp_instance.expires_at,
+            )
         except Exception as e:
-            # If sending fails, delete the created OTP to allow immediate retry
-            otp_instance.delete()
-            raise OTPGenerationError(_("Failed to send OTP. Please try again later."))
-
-        return otp_instance
+            # Without an outbox row nothing would send the code later; the user is asked to request it again.
+            raise OTPGenerationError(_("Could not send the code. Please try again.")) from e
 
     def verify_otp(self, otp_type, recipient, code):
         """Validates an OTP code with improved logic for handling different states."""
-        max_attempts = settings.OTP_SETTINGS.get('MAX_ATTEMPTS', 5)
-        otp_instance = OTP.objects.get_latest_otp(self.user, otp_type, recipient)
-
-        if not otp_instance:
-            raise OTPValidationError(_("No OTP found for this recipient. Please request a new one."))
-
-        if otp_instance.status == OTP.StatusChoices.VERIFIED:
-            raise OTPValidationError(_("This OTP has already been used and verified."))
-
-        if otp_instance.status in [OTP.StatusChoices.EXPIRED, OTP.StatusChoices.FAILED]:
-            raise OTPValidationError(_("This OTP is no longer valid. Please request a new one."))
-
-        if otp_instance.is_expired:
-            otp_instance.mark_as_failed()
-            raise OTPValidationError(_("OTP code has expired."))
-
-        if otp_instance.attempts >= max_attempts:
-            otp_instance.mark_as_failed()
-            raise OTPValidationError(_("Maximum verification attempts exceeded."))
-
-        if otp_instance.code != code:
-            otp_instance.increment_attempts()
-            # After incrementing, check if it now exceeds max attempts
-            if otp_instance.attempts >= max_attempts:
-                otp_instance.mark_as_failed()
-                raise OTPValidationError(_("Invalid OTP code. Maximum attempts exceeded."))
-            else:
-                # Notice: Revealing remaining attempts may reduce security. Consider removing this message.
-                remaining_attempts = max_attempts - otp_instance.attempts
-                raise OTPValidationError(_(f"Invalid OTP code. You have {remaining_attempts} attempts remaining."))
-                # raise OTPValidationError(_("Invalid OTP code."))
-
-        otp_instance.mark_as_verified()
-        return True
+        return self.store.verify(self.user, otp_type, recipient, code)
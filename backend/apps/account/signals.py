@@ -1,12 +1,18 @@
 import logging
 from PIL import Image
 from django.utils import timezone
+from django.db import transaction
 from django.dispatch import receiver
 from django.contrib.auth import user_logged_in
-from django.db.models.signals import post_save, pre_save
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save, pre_save
 
+from apps.common import metrics
 from apps.common.utils import get_client_ip
-from apps.account.models import Profile, User, Wishlist
+from apps.account.models import OTP, Profile, User, Wishlist
+from apps.account.authentication import invalidate_user
+from apps.account.otp_stores import reset_otp_store
+from apps.notification.services import outbox_message_sent, outbox_message_failed
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +28,14 @@ def create_user_related_objects(sender, instance, created, **kwargs):
             logger.error(f"Failed to create related objects for user {instance.pk}: {e}")
 
 
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drops the user from the user cache once the change is committed: profile edits, password changes, deactivation."""
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+
 @receiver(user_logged_in)
 def update_last_login_info(sender, request, user, **kwargs):
     """Updates the user's last login timestamp and IP address upon login."""
@@ -32,6 +46,39 @@ def update_last_login_info(sender, request, user, **kwargs):
     except Exception as e:
         logger.error(f"Failed to update last login info for user {user.pk}: {e}")
 
+
+@receiver(outbox_message_sent)
+def record_otp_delivered(sender, message, **kwargs):
+    """Marks an OTP as delivered once the outbox has sent its message."""
+    if message.kind != 'otp':
+        return
+    metrics.otp_sent_total.labels(channel=message.channel).inc()
+    if message.object_id is None:
+        return
+    otp = OTP.objects.filter(pk=message.object_id).first()
+    if otp is not None:
+        otp.mark_as_delivered()
+
+
+@receiver(outbox_message_failed)
+def record_otp_delivery_failure(sender, message, error, final, **kwargs):
+    """Records a failed send on the OTP; a final failure frees the user from the resend cooldown."""
+    if message.kind != 'otp':
+        return
+    if message.object_id is None:
+        return
+    otp = OTP.objects.filter(pk=message.object_id).first()
+    if otp is not None:
+        otp.record_delivery_failure(error, final=final)
+
+
+@receiver(setting_changed)
+def reset_otp_store_on_setting_change(setting=None, **kwargs):
+    """Loads the store from the new settings when OTP_SETTINGS is overridden (e.g. in tests)."""
+    if setting == 'OTP_SETTINGS':
+        reset_otp_store()
+
+
 # @receiver(pre_save, sender=Profile)
 # def resize_profile_avatar(sender, instance, **kwargs):
 #     """Optimized signal to resize an avatar image before it's saved."""
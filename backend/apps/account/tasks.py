@@ -0,0 +1,85 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone, translation
+from django.utils.dateparse import parse_datetime
+
+from celery import shared_task
+
+from apps.common import metrics, partitions
+from apps.account.models import OTP, User
+from apps.account.otp_stores import get_otp_store
+from apps.notification.services import NotificationService
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def record_otp_outcome(user_id, otp_type, recipient, code, status, attempts, created_at, expires_at, verified_at=None):
+    """Stores the outcome of an OTP kept in Redis (RedisOTPStore) in the OTP table, for auditing."""
+    OTP.objects.record_outcome(
+        user_id=user_id,
+        otp_type=otp_type,
+        recipient=recipient,
+        code=code,
+        status=status,
+        attempts=attempts,
+        created_at=parse_datetime(created_at),
+        expires_at=parse_datetime(expires_at),
+        verified_at=parse_datetime(verified_at) if verified_at else None,
+        # Only a delivered code can be verified; whether a failed one was delivered is not recorded.
+        delivery_status=OTP.DeliveryStatusChoices.SENT if status == OTP.StatusChoices.VERIFIED else OTP.DeliveryStatusChoices.QUEUED,
+    )
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=None)
+def send_otp_message(self, user_id, otp_type, recipient, payload, language, expires_at):
+    """
+    Sends a code kept in Redis (RedisOTPStore) to its provider, without an outbox row. Failed sends are
+    retried with the outbox's backoff while the code is valid; a code that could not be delivered frees
+    the user from the resend cooldown.
+    """
+    try:
+        with translation.override(language or None):
+            getattr(NotificationService(), f'send_{otp_type}')(recipient, **payload)
+    except Exception as e:
+        config = settings.NOTIFICATION_OUTBOX_SETTINGS
+        countdown = min(config['RETRY_BACKOFF'] * 2 ** self.request.retries, config['RETRY_BACKOFF_MAX'])
+        if timezone.now() + timedelta(seconds=countdown) < parse_datetime(expires_at):
+            logger.warning(f"Sending an OTP to user {user_id} failed (attempt {self.request.retries + 1}), retrying in {countdown}s: {e}")
+            raise self.retry(exc=e, countdown=countdown)
+        logger.error(f"Could not send an OTP to user {user_id} before it expired: {e}")
+        get_otp_store().release_cooldown(User(pk=user_id), otp_type, recipient)
+        return
+    metrics.otp_sent_total.labels(channel=otp_type).inc()
+
+
+@shared_task(ignore_result=True)
+def purge_expired_otps() -> None:
+    """
+    Deletes OTPs older than OTP_RETENTION_DAYS. When the OTP table is partitioned (partition_otp_table),
+    drops the months that are entirely older instead, and creates the partitions of the coming months.
+    """
+    config = settings.ACCOUNT_RETENTION_SETTINGS
+    now = timezone.now()
+    older_than = now - timedelta(days=config['OTP_RETENTION_DAYS'])
+    table = OTP._meta.db_table
+
+    if partitions.is_partitioned(table):
+        created = partitions.ensure_partitions(table, now, config['PARTITION_MONTHS_AHEAD'])
+        dropped = partitions.drop_partitions(table, older_than)
+        logger.info(f"OTP partitions created: {created or 'none'}, dropped: {dropped or 'none'}.")
+        return
+
+    deleted = OTP.objects.purge(older_than, batch_size=config['BATCH_SIZE'], pause=config['BATCH_PAUSE'])
+    logger.info(f"Deleted {deleted} OTP(s) created before {older_than:%Y-%m-%d}.")
+
+
+@shared_task(ignore_result=True)
+def purge_stale_accounts() -> None:
+    """Deletes accounts created by requesting a code and never used for STALE_ACCOUNT_DAYS."""
+    config = settings.ACCOUNT_RETENTION_SETTINGS
+    older_than = timezone.now() - timedelta(days=config['STALE_ACCOUNT_DAYS'])
+    deleted = User.objects.purge_stale(older_than, batch_size=config['BATCH_SIZE'], pause=config['BATCH_PAUSE'])
+    logger.info(f"Deleted {deleted} stale account(s) created before {older_than:%Y-%m-%d}.")
@@ -0,0 +1,71 @@
+import hashlib
+
+from rest_framework.exceptions import ParseError
+from phonenumber_field.phonenumber import to_python
+
+from apps.common.throttling import RedisRateThrottle
+
+
+def get_identifier(request, view):
+    """
+    The phone number (E.164) or email address a request is about, from the field named by the view's
+    `throttle_identifier_field` (default 'identifier'); None when missing or unreadable.
+    """
+    try:
+        value = request.data.get(getattr(view, 'throttle_identifier_field', 'identifier'))
+    except (ParseError, AttributeError):
+        return None
+    if not value or not isinstance(value, str):
+        return None
+    value = value.strip()
+    if '@' in value:
+        return value.lower()
+    phone_number = to_python(value)
+    return phone_number.as_e164 if phone_number and phone_number.is_valid() else value
+
+
+class AuthIPThrottle(RedisRateThrottle):
+    """Requests per client IP to the login and OTP endpoints, in bursts."""
+    scope = 'auth_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class IdentifierThrottle(RedisRateThrottle):
+    """Requests per phone number or email address, whichever IP they come from."""
+    algorithm = 'sliding_window'
+
+    def get_cache_key(self, request, view):
+        identifier = get_identifier(request, view)
+        if identifier is None:
+            return None
+        # Keeps phone numbers and emails out of the Redis keys.
+        ident = hashlib.blake2b(identifier.encode(), digest_size=12).hexdigest()
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class LoginIdentifierThrottle(IdentifierThrottle):
+    """Password logins and account checks per identifier, against password guessing."""
+    scope = 'login_identifier'
+
+
+class OTPIdentifierThrottle(IdentifierThrottle):
+    """Codes and reset messages sent per identifier, on top of the resend cooldown."""
+    scope = 'otp_identifier'
+
+
+class OTPPhonePrefixThrottle(RedisRateThrottle):
+    """
+    Codes sent per block of phone numbers sharing their first PREFIX_DIGITS digits, against SMS pumping
+    through ranges of numbers that each stay under the per-number limit.
+    """
+    scope = 'otp_phone_prefix'
+    algorithm = 'sliding_window'
+    PREFIX_DIGITS = 9
+
+    def get_cache_key(self, request, view):
+        identifier = get_identifier(request, view)
+        if identifier is None or not identifier.startswith('+'):
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': identifier[:self.PREFIX_DIGITS + 1]}
@@ -4,9 +4,12 @@ from django.utils.translation import gettext_lazy as _
 from rest_framework.response import Response
 from rest_framework import generics, viewsets, status
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.authentication import SessionAuthentication
 
 from apps.account.models import Address, Wishlist
+from apps.account.authentication import ClaimsJWTAuthentication
 from apps.account.permissions import IsOwnerOrReadOnly
+from apps.account.throttles import AuthIPThrottle, LoginIdentifierThrottle, OTPIdentifierThrottle, OTPPhonePrefixThrottle
 from apps.account.serializers import (
     EmailAddSerializer,
     RequestOTPSerializer,
@@ -27,6 +30,7 @@ User = get_user_model()
 
 class IdentifierStatusCheckView(generics.GenericAPIView):
     permission_classes = [AllowAny]
+    throttle_classes = [AuthIPThrottle, LoginIdentifierThrottle]
     serializer_class = IdentifierStatusCheckSerializer
 
     def post(self, request, *args, **kwargs):
@@ -37,6 +41,8 @@ class IdentifierStatusCheckView(generics.GenericAPIView):
 
 class RequestOTPView(generics.GenericAPIView):
     permission_classes = [AllowAny]
+    throttle_classes = [AuthIPThrottle, OTPIdentifierThrottle, OTPPhonePrefixThrottle]
+    throttle_identifier_field = 'phone_number'
     serializer_class = RequestOTPSerializer
 
     def post(self, request, *args, **kwargs):
@@ -58,6 +64,7 @@ class VerifyOTPAndLoginView(generics.GenericAPIView):
 
 class LoginWithPasswordView(generics.GenericAPIView):
     permission_classes = [AllowAny]
+    throttle_classes = [AuthIPThrottle, LoginIdentifierThrottle]
     serializer_class = LoginWithPasswordSerializer
 
     def post(self, request, *args, **kwargs):
@@ -127,6 +134,7 @@ class EmailVerifyView(generics.GenericAPIView):
 class PasswordResetRequestView(generics.GenericAPIView):
     """Initiates the password reset process via email or phone."""
     permission_classes = [AllowAny]
+    throttle_classes = [AuthIPThrottle, OTPIdentifierThrottle, OTPPhonePrefixThrottle]
     serializer_class = PasswordResetRequestSerializer
 
     def post(self, request, *args, **kwargs):
@@ -165,6 +173,8 @@ class AddressViewSet(viewsets.ModelViewSet):
     """A ViewSet for viewing and editing user addresses. Provides list, create, retrieve, update, destroy."""
     serializer_class = AddressSerializer
     permission_classes = [IsAuthenticated]
+    # Only the user's id is needed to list and retrieve addresses.
+    authentication_classes = [ClaimsJWTAuthentication, SessionAuthentication]
 
     def get_queryset(self):
         """This view should return a list of all addresses for the currently authenticated user. Excludes snapshots."""
@@ -183,6 +193,8 @@ class WishlistAPIView(generics.GenericAPIView):
     - DELETE: Remove a variant from the wishlist.
     """
     permission_classes = [IsAuthenticated]
+    # Only the user's id is needed to read the wishlist.
+    authentication_classes = [ClaimsJWTAuthentication, SessionAuthentication]
 
     def get_serializer_class(self):
         """
@@ -200,7 +212,9 @@ class WishlistAPIView(generics.GenericAPIView):
 
     def get(self, request, *args, **kwargs):
         """Handle GET request to retrieve the wishlist."""
-        wishlist = self.get_object()
+        # Load the wishlist with only the columns and variants the serializer reads.
+        queryset = WishlistSerializer.project_queryset(Wishlist.objects.all())
+        wishlist, _ = queryset.get_or_create(user=self.request.user)
         serializer = self.get_serializer(wishlist)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
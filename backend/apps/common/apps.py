@@ -5,4 +5,8 @@ from django.utils.translation import gettext_lazy as _
 class CommonConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.common"
-    verbose_name = _("Common Utilities")
\ No newline at end of file
+    verbose_name = _("Common Utilities")
+
+    def ready(self):
+        """Import signals when the app is ready."""
+        import apps.common.signals
@@ -0,0 +1,510 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.core.cache import caches
+from django.dispatch import Signal
+from django_redis.client import DefaultClient
+from asgiref.sync import sync_to_async
+import redis.asyncio as aioredis
+
+from apps.common import metrics
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# Sent with `tags` and `cache_alias` after invalidate_tags(), so other caches (e.g. the edge) can follow.
+tags_invalidated = Signal()
+
+
+def get_redis_client(cache_alias: str = 'default'):
+    """Returns the raw Redis client behind a django-redis cache, or None for other cache backends."""
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection(cache_alias)
+    except NotImplementedError:
+        return None
+
+
+def get_redis_url(cache_alias: str = 'default') -> Optional[str]:
+    """The URL of the Redis server behind a django-redis cache, or None for other cache backends."""
+    config = settings.CACHES[cache_alias]
+    if config['BACKEND'] != 'django_redis.cache.RedisCache':
+        return None
+    location = config['LOCATION']
+    return location[0] if isinstance(location, (list, tuple)) else location
+
+
+# One redis.asyncio client per event loop; a client cannot be shared between loops.
+_async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def get_async_redis_client(cache_alias: str = 'default'):
+    """
+    A redis.asyncio client for the server behind a django-redis cache, or None for other cache backends.
+    django-redis has no native async support; Django's cache.aget() runs the sync client in a thread.
+    """
+    url = get_redis_url(cache_alias)
+    if url is None:
+        return None
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    if cache_alias not in clients:
+        clients[cache_alias] = aioredis.from_url(url)
+    return clients[cache_alias]
+
+
+class MetricsRedisClient(DefaultClient):
+    """
+    A django-redis client that counts cache hits and misses, so the hit ratio can be
+    graphed as `rate(cache_requests_total{result="hit"}) / rate(cache_requests_total)`.
+    """
+
+    def get(self, key: Any, default: Optional[Any] = None, version: Optional[int] = None, client: Any = None) -> Any:
+        value = super().get(key, default=_MISSING, version=version, client=client)
+        if value is _MISSING:
+            metrics.cache_requests_total.labels(result='miss').inc()
+            return default
+        metrics.cache_requests_total.labels(result='hit').inc()
+        return value
+
+    def get_many(self, keys: Iterable[Any], version: Optional[int] = None, client: Any = None) -> dict:
+        keys = list(keys)
+        recovered_data = super().get_many(keys, version=version, client=client)
+        hits = len(recovered_data)
+        if hits:
+            metrics.cache_requests_total.labels(result='hit').inc(hits)
+        if len(keys) - hits:
+            metrics.cache_requests_total.labels(result='miss').inc(len(keys) - hits)
+        return recovered_data
+
+
+def get_or_fill(
+        key: str,
+        fill: Callable[[], Any],
+        soft_ttl: int,
+        hard_ttl: int,
+        lock_ttl: int = 10,
+        wait: float = 2.0,
+        tags: Iterable[str] | Callable[[Any], Iterable[str]] = (),
+        cache_alias: str = 'default',
+) -> Any:
+    """
+    Returns the cached value for `key`, computing it with `fill()` so that only one process does so at a time.
+
+    Values are stored for `hard_ttl` seconds together with a soft expiry (`soft_ttl`):
+    - Fresh value: returned as is.
+    - Stale value (soft TTL passed): the caller that wins a short lock recomputes it, everybody else
+      keeps serving the stale value meanwhile (stale-while-revalidate).
+    - No value: the lock winner computes it while the others wait up to `wait` seconds for the
+      result, then compute it themselves rather than block the request any longer.
+    The lock is a plain cache.add(), i.e. SET NX with a `lock_ttl` expiry on Redis.
+    `tags` (or a callable returning them from the computed value) are the dependencies of the entry;
+    see register_tags() and invalidate_tags(). A value computed while one of them was invalidated is
+    returned but not kept, as it may predate the change (any invalidation counts for callable tags).
+    """
+    cache = caches[cache_alias]
+    entry = cache.get(key)
+    if entry is not None:
+        soft_expires_at, value = entry
+        if time.time() < soft_expires_at:
+            metrics.cache_fill_total.labels(result='fresh').inc()
+            return value
+        lock = _CacheLock(cache, key, lock_ttl)
+        if not lock.acquire():
+            metrics.cache_fill_total.labels(result='stale').inc()
+            return value
+        with lock:
+            metrics.cache_fill_total.labels(result='refreshed').inc()
+            return _fill(cache, key, fill, soft_ttl, hard_ttl, tags, cache_alias)
+
+    lock = _CacheLock(cache, key, lock_ttl)
+    if lock.acquire():
+        with lock:
+            metrics.cache_fill_total.labels(result='filled').inc()
+            return _fill(cache, key, fill, soft_ttl, hard_ttl, tags, cache_alias)
+
+    # Another process is computing the value; give it a moment before doing the work ourselves.
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            metrics.cache_fill_total.labels(result='waited').inc()
+            return entry[1]
+    logger.warning(f"Timed out waiting for cache key '{key}' to be filled by another process; computing it locally.")
+    metrics.cache_fill_total.labels(result='timeout').inc()
+    return _fill(cache, key, fill, soft_ttl, hard_ttl, tags, cache_alias)
+
+
+async def aget_fresh(key: str, cache_alias: str = 'default') -> Any:
+    """
+    The value of a get_or_fill() entry if it is still fresh, read without leaving the event loop; None otherwise,
+    in which case the caller goes through get_or_fill() (in a thread) to refresh or fill the entry.
+    """
+    cache = caches[cache_alias]
+    client = get_async_redis_client(cache_alias)
+    try:
+        if client is None:
+            entry = await cache.aget(key)
+        else:
+            raw = await client.get(cache.make_key(key))
+            # Decoded exactly as django-redis would (serializer and compressor).
+            entry = None if raw is None else cache.client.decode(raw)
+    except Exception as e:
+        logger.warning(f"Could not read cache key '{key}' asynchronously: {e}")
+        return None
+
+    if entry is None or time.time() >= entry[0]:
+        return None
+    metrics.cache_fill_total.labels(result='fresh').inc()
+    return entry[1]
+
+
+def _fill(cache, key: str, fill: Callable[[], Any], soft_ttl: int, hard_ttl: int, tags, cache_alias: str) -> Any:
+    # Tags computed from the value are unknown before the fill, so any invalidation counts for those.
+    guard = [_ANY_TAG] if callable(tags) else list(tags)
+    versions = get_tag_versions(guard, cache_alias=cache_alias) if guard else None
+    value = fill()
+    cache.set(key, (time.time() + soft_ttl, value), timeout=hard_ttl)
+    tags = tags(value) if callable(tags) else guard
+    if tags:
+        register_tags(key, tags, cache_alias=cache_alias)
+    # invalidate_tags() bumps the versions before deleting the registered entries, so one that ran
+    # before this entry was registered, and missed it, shows here.
+    if guard and get_tag_versions(guard, cache_alias=cache_alias) != versions:
+        cache.delete(key)
+    return value
+
+
+class _CacheLock:
+    """A short-lived lock on a cache key. Expires by itself if its holder dies."""
+
+    def __init__(self, cache, key: str, ttl: int):
+        self.cache = cache
+        self.key = f'{key}:lock'
+        self.ttl = ttl
+        self.token = uuid.uuid4().hex
+
+    def acquire(self) -> bool:
+        return self.cache.add(self.key, self.token, timeout=self.ttl)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        # Only release our own lock; it may have expired and been taken by another process meanwhile.
+        if self.cache.get(self.key) == self.token:
+            self.cache.delete(self.key)
+
+
+class LocalLRUCache:
+    """A bounded, thread-safe, in-process LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class TwoTierCache:
+    """
+    An in-process LRU (tier 1) in front of the shared Django cache (tier 2, Redis in production).
+
+    Meant for small, hot, rarely changing data: reads are served from process memory, and
+    `invalidate()` deletes the shared entry and tells every process to drop its local copy
+    through Redis pub/sub. A listener thread per process receives those messages; if it loses
+    its connection the local tier is cleared on reconnect, and the local TTL bounds staleness
+    in the meantime. Without django-redis (e.g. locmem in development) only the local tier of
+    the calling process is invalidated.
+
+    Shared entries are stamped with a per-key version that `invalidate()` bumps. An entry written by a
+    `get()` whose load raced with an invalidation carries the old version and is ignored, and a value
+    loaded while the version moved is returned without being cached in either tier.
+    """
+
+    def __init__(self, channel: str, max_entries: int, local_ttl: int, ttl: int, cache_alias: str = 'default'):
+        self.channel = channel
+        self.ttl = ttl
+        self.cache_alias = cache_alias
+        self.local = LocalLRUCache(max_entries=max_entries, ttl=local_ttl)
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+
+    def get(self, key: str, load: Callable[[], Any]) -> Any:
+        self._ensure_listener()
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        cache = caches[self.cache_alias]
+        version_key = f'{key}:version'
+        entries = cache.get_many([key, version_key])
+        version, entry = entries.get(version_key), entries.get(key)
+        if version is not None and isinstance(entry, tuple) and len(entry) == 2 and entry[0] == version:
+            value = entry[1]
+        else:
+            if version is None:
+                cache.add(version_key, _initial_version(), timeout=None)
+                version = cache.get(version_key)
+            value = load()
+            # Invalidated while loading: the value may predate the change, so it is not cached.
+            if cache.get(version_key) != version:
+                return value
+            cache.set(key, (version, value), timeout=self.ttl)
+        self.local.set(key, value)
+        return value
+
+    def invalidate(self, key: str) -> None:
+        """Drops `key` from the shared cache and from the local tier of every process."""
+        cache = caches[self.cache_alias]
+        # The version goes first, so a concurrent get() cannot store what it loaded before the change.
+        version_key = f'{key}:version'
+        if not cache.add(version_key, _initial_version(), timeout=None):
+            cache.incr(version_key)
+        cache.delete(key)
+        self.local.delete(key)
+        client = get_redis_client(self.cache_alias)
+        if client is not None:
+            try:
+                client.publish(self.channel, key)
+            except Exception as e:
+                logger.warning(f"Could not publish invalidation of '{key}' on '{self.channel}': {e}")
+
+    def _ensure_listener(self) -> None:
+        """Starts the pub/sub listener once per process (gunicorn forks workers after import)."""
+        if self._listener_pid == os.getpid():
+            return
+        with self._listener_lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            self.local.clear()
+            if get_redis_client(self.cache_alias) is not None:
+                threading.Thread(target=self._listen, name=f'cache-invalidation:{self.channel}', daemon=True).start()
+
+    def _listen(self) -> None:
+        backoff = 1
+        while True:
+            try:
+                pubsub = get_redis_client(self.cache_alias).pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                # Messages published while we were not subscribed are lost; start from a clean slate.
+                self.local.clear()
+                backoff = 1
+                for message in pubsub.listen():
+                    key = message['data']
+                    self.local.delete(key.decode() if isinstance(key, bytes) else key)
+            except Exception as e:
+                logger.warning(f"Cache invalidation listener on '{self.channel}' disconnected: {e}")
+                self.local.clear()
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+
+# --- Tag-based invalidation ---
+# Every tag is a Redis set holding the (full, prefixed) keys of the entries that depend on it,
+# e.g. "product:42" -> {the product detail entry, every listing showing product 42}.
+
+# Its version is bumped by every invalidate_tags() call.
+_ANY_TAG = '*'
+
+# SPOP with a count at least the size of the set returns every member and deletes the set in one command.
+_POP_ALL = 2 ** 31 - 1
+
+_pending_tags = threading.local()
+
+
+def _tag_key(cache, tag: str) -> str:
+    return cache.make_key(f'tag:{tag}')
+
+
+def _version_key(cache, tag: str) -> str:
+    return cache.make_key(f'tagver:{tag}')
+
+
+def _initial_version() -> int:
+    # Counters start from the clock rather than from zero, so a counter lost with a Redis flush
+    # never repeats a version (and an ETag) that was handed out before.
+    return time.time_ns() // 1_000_000
+
+
+def register_tags(key: str, tags: Iterable[str], cache_alias: str = 'default') -> None:
+    """Records that the cache entry `key` depends on `tags`, so invalidate_tags() will delete it."""
+    cache = caches[cache_alias]
+    ttl = settings.CACHE_TAG_SETTINGS['TAG_TTL']
+    client = get_redis_client(cache_alias)
+    if client is None:
+        # Development fallback for non-Redis caches: the tag sets live in the cache itself (not atomic).
+        for tag in tags:
+            members = cache.get(f'tag:{tag}', set())
+            members.add(key)
+            cache.set(f'tag:{tag}', members, timeout=ttl)
+        return
+
+    full_key = cache.make_key(key)
+    with client.pipeline(transaction=False) as pipe:
+        for tag in tags:
+            pipe.sadd(_tag_key(cache, tag), full_key)
+            pipe.expire(_tag_key(cache, tag), ttl)
+        pipe.execute()
+
+
+def invalidate_tags(tags: Iterable[str], cache_alias: str = 'default', replayed: bool = False) -> None:
+    """
+    Bumps the version of `tags`, then deletes every cache entry registered with any of them.
+    Each Redis command touches a single key, so this also works on Redis Cluster.
+    `replayed` marks the repeat sent once read replicas have caught up (see apps.common.signals).
+    """
+    tags = list(dict.fromkeys(tags))
+    if not tags:
+        return
+    cache = caches[cache_alias]
+    client = get_redis_client(cache_alias)
+    if client is None:
+        for tag in (*tags, _ANY_TAG):
+            if not cache.add(f'tagver:{tag}', _initial_version(), timeout=None):
+                cache.incr(f'tagver:{tag}')
+        for tag in tags:
+            cache.delete_many(list(cache.get(f'tag:{tag}', ())))
+            cache.delete(f'tag:{tag}')
+    else:
+        try:
+            with client.pipeline(transaction=False) as pipe:
+                for tag in (*tags, _ANY_TAG):
+                    pipe.set(_version_key(cache, tag), _initial_version(), nx=True)
+                    pipe.incr(_version_key(cache, tag))
+                pipe.execute()
+            # Popping a set reads and deletes it at once, so no key registered meanwhile is dropped unseen.
+            with client.pipeline(transaction=False) as pipe:
+                for tag in tags:
+                    pipe.spop(_tag_key(cache, tag), _POP_ALL)
+                members = list({member for popped in pipe.execute() for member in popped or ()})
+            with client.pipeline(transaction=False) as pipe:
+                for member in members:
+                    pipe.delete(member)
+                pipe.execute()
+        except Exception as e:
+            logger.error(f"Could not invalidate cache tags {tags}: {e}")
+
+    tags_invalidated.send(sender=None, tags=tags, cache_alias=cache_alias, replayed=replayed)
+
+
+def get_tag_versions(tags: Iterable[str], cache_alias: str = 'default') -> Optional[list[int]]:
+    """
+    The current version of each tag, bumped by every invalidate_tags() call, or None if Redis is unavailable.
+    Lets callers tell whether anything a response depends on has changed (e.g. for ETags)
+    without reading or building the response itself.
+    """
+    tags = list(tags)
+    cache = caches[cache_alias]
+    client = get_redis_client(cache_alias)
+    if client is None:
+        for tag in tags:
+            cache.add(f'tagver:{tag}', _initial_version(), timeout=None)
+        versions = cache.get_many([f'tagver:{tag}' for tag in tags])
+        return [versions.get(f'tagver:{tag}', 0) for tag in tags]
+
+    keys = [_version_key(cache, tag) for tag in tags]
+    try:
+        versions = client.mget(keys)
+        missing = [key for key, version in zip(keys, versions) if version is None]
+        if missing:
+            # First read of these tags: start their counters so later reads agree on the version.
+            with client.pipeline(transaction=False) as pipe:
+                for key in missing:
+                    pipe.set(key, _initial_version(), nx=True)
+                pipe.execute()
+            versions = client.mget(keys)
+    except Exception as e:
+        logger.warning(f"Could not read cache tag versions {tags}: {e}")
+        return None
+    return [int(version or 0) for version in versions]
+
+
+async def aget_tag_versions(tags: Iterable[str], cache_alias: str = 'default') -> Optional[list[int]]:
+    """get_tag_versions() for async callers; a single MGET on the event loop when every counter exists."""
+    tags = list(tags)
+    client = get_async_redis_client(cache_alias)
+    if client is not None:
+        cache = caches[cache_alias]
+        try:
+            versions = await client.mget([_version_key(cache, tag) for tag in tags])
+        except Exception as e:
+            logger.warning(f"Could not read cache tag versions {tags}: {e}")
+            return None
+        if None not in versions:
+            return [int(version) for version in versions]
+    # First read of a tag (its counter is created) or a non-Redis cache.
+    return await sync_to_async(get_tag_versions, thread_sensitive=False)(tags, cache_alias)
+
+
+def invalidate_tags_on_commit(*tags: str, cache_alias: str = 'default') -> None:
+    """
+    Invalidates `tags` once the current transaction commits (immediately outside of one).
+    Tags collected during a transaction are sent in a single call, so bulk saves do not
+    cost one Redis round trip each.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        invalidate_tags(tags, cache_alias=cache_alias)
+        return
+
+    pending = getattr(_pending_tags, cache_alias, None)
+    # Reuse the batch only while its callback is still queued; a rollback discards it.
+    if pending is not None and any(entry[1] == pending.flush for entry in connection.run_on_commit):
+        pending.update(tags)
+        return
+
+    pending = _PendingTags(tags, cache_alias)
+    setattr(_pending_tags, cache_alias, pending)
+    transaction.on_commit(pending.flush)
+
+
+class _PendingTags(set):
+    """Tags waiting for the current transaction to commit."""
+
+    def __init__(self, tags: Iterable[str], cache_alias: str):
+        super().__init__(tags)
+        self.cache_alias = cache_alias
+
+    def flush(self) -> None:
+        if getattr(_pending_tags, self.cache_alias, None) is self:
+            setattr(_pending_tags, self.cache_alias, None)
+        invalidate_tags(self, cache_alias=self.cache_alias)
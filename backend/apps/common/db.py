@@ -0,0 +1,265 @@
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from apps.common import metrics
+
+logger = logging.getLogger(__name__)
+
+# Clients that wrote are sent back to the primary until this timestamp; API clients without cookies
+# are recognised by user (PIN_CACHE_KEY) once authenticated.
+PIN_COOKIE = 'db_pin'
+PIN_CACHE_KEY = 'db:pin:user:{user_id}'
+
+# Seconds a streaming replica is behind the primary; 0 when it has replayed everything it received.
+_REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class _RoutingState:
+    """Routing decisions for the current request (or replica_reads() block)."""
+    __slots__ = ('replica_reads', 'replica', 'wrote')
+
+    def __init__(self, replica_reads: bool = False):
+        self.replica_reads = replica_reads
+        self.replica: Optional[str] = None
+        self.wrote = False
+
+
+_state: ContextVar[Optional[_RoutingState]] = ContextVar('db_routing_state', default=None)
+
+
+def get_replicas() -> list[str]:
+    """The database aliases of the configured read replicas."""
+    return [alias for alias in settings.DATABASE_REPLICA_SETTINGS['REPLICAS'] if alias in settings.DATABASES]
+
+
+# --- Request scope (see DatabaseRoutingMiddleware) ---
+
+def begin_request():
+    return _state.set(_RoutingState())
+
+
+def end_request(token) -> bool:
+    """Ends the request's routing scope; returns whether it wrote to the primary."""
+    state = _state.get()
+    _state.reset(token)
+    return state is not None and state.wrote
+
+
+def allow_replica_reads(request, user=None) -> None:
+    """
+    Lets the rest of the request read from a replica, unless the client wrote recently
+    (read-your-writes). Called by read-only views once the user is known.
+    """
+    state = _state.get()
+    if state is None or not get_replicas():
+        return
+    if is_pinned(request, user):
+        metrics.db_replica_fallbacks_total.labels(reason='pinned').inc()
+        return
+    state.replica_reads = True
+
+
+def is_pinned(request, user=None) -> bool:
+    try:
+        if float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time():
+            return True
+    except ValueError:
+        pass
+    return bool(user and user.is_authenticated and cache.get(PIN_CACHE_KEY.format(user_id=user.pk)))
+
+
+def pin(request, response, user=None) -> None:
+    """Sends the client's reads to the primary for STICKY_SECONDS after a write."""
+    sticky = settings.DATABASE_REPLICA_SETTINGS['STICKY_SECONDS']
+    response.set_cookie(
+        PIN_COOKIE, str(int(time.time()) + sticky), max_age=sticky,
+        secure=request.is_secure(), httponly=True, samesite='Lax',
+    )
+    if user is not None and user.is_authenticated:
+        cache.set(PIN_CACHE_KEY.format(user_id=user.pk), 1, timeout=sticky)
+
+
+@contextmanager
+def replica_reads():
+    """Routes the reads in the block to a replica when one is healthy, e.g. in reporting commands and tasks."""
+    state = _state.get()
+    if state is not None:
+        previous, state.replica_reads = state.replica_reads, True
+        try:
+            yield
+        finally:
+            state.replica_reads = previous
+        return
+
+    token = _state.set(_RoutingState(replica_reads=True))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+# --- Replica health ---
+
+def measure_lag(alias: str) -> float:
+    """Replication lag of a replica in seconds (0 for databases other than PostgreSQL)."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(_REPLICA_LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+class ReplicaMonitor:
+    """
+    This process's view of which replicas are usable: reachable, and no more than MAX_LAG_SECONDS
+    behind the primary. Each replica is measured at most once per CHECK_INTERVAL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked_at: dict[str, float] = {}
+        self._healthy: dict[str, bool] = {}
+
+    def healthy_replicas(self) -> list[str]:
+        config = settings.DATABASE_REPLICA_SETTINGS
+        now = time.monotonic()
+        for alias in get_replicas():
+            with self._lock:
+                due = now - self._checked_at.get(alias, float('-inf')) >= config['CHECK_INTERVAL']
+                if due:
+                    # Claimed before measuring, so concurrent threads keep using the previous result.
+                    self._checked_at[alias] = now
+            if due:
+                self._healthy[alias] = self.check(alias)
+        return [alias for alias in get_replicas() if self._healthy.get(alias)]
+
+    @staticmethod
+    def check(alias: str) -> bool:
+        try:
+            lag = measure_lag(alias)
+        except Exception as e:
+            logger.warning(f"Read replica '{alias}' is unavailable, reading from the primary: {e}")
+            metrics.db_replica_healthy.labels(alias=alias).set(0)
+            return False
+        healthy = lag <= settings.DATABASE_REPLICA_SETTINGS['MAX_LAG_SECONDS']
+        if not healthy:
+            logger.warning(f"Read replica '{alias}' is {lag:.1f}s behind, reading from the primary.")
+        metrics.db_replica_lag_seconds.labels(alias=alias).set(lag)
+        metrics.db_replica_healthy.labels(alias=alias).set(int(healthy))
+        return healthy
+
+
+monitor = ReplicaMonitor()
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends reads to a replica only where it was asked for: in read-only views that called
+    allow_replica_reads() and in replica_reads() blocks. Everything else, including any read after a
+    write or inside a transaction, goes to the primary. One replica is picked per request, so its
+    reads see a single consistent snapshot.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica_reads or state.wrote:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        if state.replica is None:
+            replicas = monitor.healthy_replicas()
+            if not replicas:
+                metrics.db_replica_fallbacks_total.labels(reason='unhealthy').inc()
+                state.replica_reads = False
+                return None
+            state.replica = random.choice(replicas)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication.
+        if db in get_replicas():
+            return False
+        return None
+
+
+# --- Connection pools ---
+# Django keeps one psycopg pool per alias and process (DATABASES[...]['OPTIONS']['pool']). Their
+# statistics live in the process, so each worker adds its share to the multiprocess metrics.
+
+# psycopg_pool counters (reset by pop_stats()) and the metrics they are added to.
+_POOL_COUNTERS = {
+    'requests_num': metrics.db_pool_checkouts_total,
+    'requests_queued': metrics.db_pool_waits_total,
+    'connections_num': metrics.db_pool_connections_opened_total,
+}
+_POOL_ERRORS = {
+    'requests_errors': 'timeout',
+    'connections_errors': 'connect',
+    'connections_lost': 'lost',
+    'returns_bad': 'bad_return',
+}
+_pool_stats_exported_at = 0.0
+
+
+def get_connection_pools() -> dict:
+    """The connection pools this process has opened, by alias."""
+    pools = {}
+    for alias in connections:
+        # The PostgreSQL backend's process-wide registry; reading it, unlike `connection.pool`, does not open a pool.
+        pool = getattr(connections[alias], '_connection_pools', {}).get(alias)
+        if pool is not None:
+            pools[alias] = pool
+    return pools
+
+
+def close_connection_pools() -> None:
+    """Closes this process's pools, e.g. before forking workers that must not share their sockets."""
+    for alias in get_connection_pools():
+        connections[alias].close_pool()
+
+
+def export_pool_stats(force: bool = False) -> None:
+    """Adds the pool statistics gathered since the last call to the metrics, at most once per POOL_STATS_INTERVAL."""
+    global _pool_stats_exported_at
+    now = time.monotonic()
+    if not force and now - _pool_stats_exported_at < settings.METRICS_SETTINGS['POOL_STATS_INTERVAL']:
+        return
+    _pool_stats_exported_at = now
+
+    for alias, pool in get_connection_pools().items():
+        stats = pool.pop_stats()
+        for stat, counter in _POOL_COUNTERS.items():
+            counter.labels(alias=alias).inc(stats.get(stat, 0))
+        metrics.db_pool_wait_seconds_total.labels(alias=alias).inc(stats.get('requests_wait_ms', 0) / 1000)
+        for stat, kind in _POOL_ERRORS.items():
+            if stats.get(stat):
+                metrics.db_pool_errors_total.labels(alias=alias, kind=kind).inc(stats[stat])
+        metrics.db_pool_size.labels(alias=alias).set(stats.get('pool_size', 0))
+        metrics.db_pool_available.labels(alias=alias).set(stats.get('pool_available', 0))
@@ -0,0 +1,150 @@
+import logging
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import caches
+
+import requests
+
+from apps.common import metrics
+from apps.common.cache import get_redis_client, get_async_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Response headers understood by the edge: nginx reads X-Accel-Expires (and hides it from clients),
+# CDNs read s-maxage and Surrogate-Key.
+SURROGATE_KEY_HEADER = 'Surrogate-Key'
+
+_session = None
+
+
+def is_purge_enabled() -> bool:
+    return bool(settings.EDGE_CACHE_SETTINGS['PURGE_URL'])
+
+
+def get_edge_ttl(keyed: bool) -> int:
+    """
+    How long the edge may keep a response. Responses labelled with surrogate keys are refreshed
+    by purge_keys() on change, so they can be kept longer, but only when purging is configured.
+    """
+    config = settings.EDGE_CACHE_SETTINGS
+    return config['KEYED_TTL'] if keyed and is_purge_enabled() else config['TTL']
+
+
+def set_public_headers(response, keys: list[str]) -> list[str]:
+    """
+    Lets the edge keep an anonymous response, labelled with `keys`. Returns the keys actually sent,
+    to be passed to register_surrogate_keys().
+    """
+    if len(keys) > settings.EDGE_CACHE_SETTINGS['MAX_SURROGATE_KEYS']:
+        # Keeps the headers within the proxy's buffers; such responses rely on the short TTL instead.
+        keys = []
+    ttl = get_edge_ttl(keyed=bool(keys))
+    # Clients revalidate every time (cheaply, see ConditionalGetMixin); only shared caches keep a copy.
+    response.headers['Cache-Control'] = f'public, max-age=0, s-maxage={ttl}'
+    response.headers['X-Accel-Expires'] = str(ttl)
+    if keys:
+        response.headers[SURROGATE_KEY_HEADER] = ' '.join(keys)
+    return keys
+
+
+def _path_set_key(cache, key: str) -> str:
+    return cache.make_key(f'edge:{key}')
+
+
+def _path_member(request) -> str:
+    # The edge's cache key includes the scheme the client used, which only the forwarded header tells.
+    scheme = request.META.get('HTTP_X_FORWARDED_PROTO', request.scheme)
+    return f'{scheme}|{request.get_host()}|{request.get_full_path()}'
+
+
+def register_surrogate_keys(request, keys: Iterable[str], cache_alias: str = 'default') -> None:
+    """Remembers that the edge holds the response to `request` under `keys`, so purge_keys() knows what to refresh."""
+    keys = list(keys)
+    client = get_redis_client(cache_alias)
+    if client is None or not keys or not is_purge_enabled():
+        return
+
+    cache = caches[cache_alias]
+    ttl = settings.EDGE_CACHE_SETTINGS['KEY_TTL']
+    member = _path_member(request)
+    try:
+        with client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.sadd(_path_set_key(cache, key), member)
+                pipe.expire(_path_set_key(cache, key), ttl)
+            pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not register surrogate keys for {request.path}: {e}")
+
+
+async def aregister_surrogate_keys(request, keys: Iterable[str], cache_alias: str = 'default') -> None:
+    """register_surrogate_keys() for the async views."""
+    keys = list(keys)
+    client = get_async_redis_client(cache_alias)
+    if client is None or not keys or not is_purge_enabled():
+        return
+
+    cache = caches[cache_alias]
+    ttl = settings.EDGE_CACHE_SETTINGS['KEY_TTL']
+    member = _path_member(request)
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.sadd(_path_set_key(cache, key), member)
+                pipe.expire(_path_set_key(cache, key), ttl)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not register surrogate keys for {request.path}: {e}")
+
+
+def purge_keys(keys: Iterable[str], cache_alias: str = 'default') -> int:
+    """
+    Refreshes every edge-cached response labelled with any of `keys` and returns how many were refreshed.
+    Open-source nginx cannot delete cache entries, so each path is re-requested through the purge server
+    (see nginx/snippets/catalog-cache-http.conf), which bypasses the cache and stores the fresh response
+    under the same key.
+    """
+    client = get_redis_client(cache_alias)
+    if client is None or not is_purge_enabled():
+        return 0
+
+    cache = caches[cache_alias]
+    set_keys = [_path_set_key(cache, key) for key in dict.fromkeys(keys)]
+    if not set_keys:
+        return 0
+    with client.pipeline(transaction=True) as pipe:
+        for set_key in set_keys:
+            pipe.smembers(set_key)
+        pipe.delete(*set_keys)
+        *members, _ = pipe.execute()
+
+    config = settings.EDGE_CACHE_SETTINGS
+    targets = sorted({member.decode() for group in members for member in group})
+    if len(targets) > config['MAX_PURGE_PATHS']:
+        # The rest expire with the edge TTL; refreshing thousands of filter combinations would just load the API.
+        logger.warning(f"Edge purge for {len(targets)} paths truncated to {config['MAX_PURGE_PATHS']}.")
+        targets = targets[:config['MAX_PURGE_PATHS']]
+
+    refreshed = 0
+    for target in targets:
+        scheme, host, path = target.split('|', 2)
+        try:
+            response = _get_session().get(
+                config['PURGE_URL'] + path,
+                headers={'Host': host, 'X-Forwarded-Proto': scheme},
+                timeout=config['PURGE_TIMEOUT'],
+            )
+            refreshed += response.ok
+        except requests.RequestException as e:
+            logger.warning(f"Could not refresh edge cache entry {path}: {e}")
+    metrics.edge_cache_purges_total.inc(refreshed)
+    return refreshed
+
+
+def _get_session() -> requests.Session:
+    """One keep-alive session per worker process, reused across purges."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
@@ -0,0 +1,67 @@
+import copy
+import time
+
+from django.db import connections
+from django.db.utils import load_backend
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures what a request pays to get a database connection: a new connection per request '
+        '(no pool) against a connection borrowed from the psycopg pool, each running the same query '
+        'and releasing the connection the way the end of a request does.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to benchmark (PostgreSQL only).')
+        parser.add_argument('--requests', type=int, default=500, help='Simulated requests per mode.')
+        parser.add_argument('--query', default='SELECT 1', help='Query run by every simulated request.')
+
+    def handle(self, *args, **options):
+        if connections[options['database']].vendor != 'postgresql':
+            raise CommandError('Connection pooling is only available for PostgreSQL databases.')
+
+        results = {}
+        for mode in ('direct', 'pooled'):
+            connection = self._get_connection(options['database'], pooled=mode == 'pooled')
+            try:
+                # The first connection of each mode pays for DNS, TLS setup, opening the pool, etc.
+                self._request(connection, options['query'])
+                results[mode] = sorted(self._request(connection, options['query']) for _ in range(options['requests']))
+            finally:
+                connection.close()
+                if mode == 'pooled':
+                    connection.close_pool()
+
+        self.stdout.write(f"{'mode':<8} {'mean ms':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        for mode, latencies in results.items():
+            self.stdout.write(
+                f'{mode:<8} {sum(latencies) / len(latencies) * 1000:>8.2f} '
+                f'{latencies[len(latencies) // 2] * 1000:>8.2f} {latencies[int(len(latencies) * 0.99)] * 1000:>8.2f}'
+            )
+        saved = (sum(results['direct']) - sum(results['pooled'])) / options['requests']
+        self.stdout.write(self.style.SUCCESS(f'Pooling saves {saved * 1000:.2f} ms per request on average.'))
+
+    @staticmethod
+    def _get_connection(alias: str, pooled: bool):
+        """A separate connection to `alias`, with or without a pool, so the benchmark does not disturb the app's own."""
+        settings_dict = copy.deepcopy(connections.settings[alias])
+        settings_dict['CONN_MAX_AGE'] = 0
+        if pooled:
+            settings_dict['OPTIONS'].setdefault('pool', {'min_size': 1, 'max_size': 1})
+        else:
+            settings_dict['OPTIONS'].pop('pool', None)
+        backend = load_backend(settings_dict['ENGINE'])
+        # The pool registry is keyed by alias, so the benchmark gets a pool of its own.
+        return backend.DatabaseWrapper(settings_dict, alias=f'{alias}_benchmark_{"pooled" if pooled else "direct"}')
+
+    @staticmethod
+    def _request(connection, query: str) -> float:
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(query)
+            cursor.fetchall()
+        # What request_finished does with CONN_MAX_AGE = 0: disconnect, or return the connection to the pool.
+        connection.close()
+        return time.perf_counter() - started
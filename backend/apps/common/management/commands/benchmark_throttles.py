@@ -0,0 +1,105 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.request import Request
+from rest_framework.parsers import JSONParser
+from rest_framework.test import APIRequestFactory
+from rest_framework.throttling import SimpleRateThrottle
+
+from apps.common.cache import get_redis_client
+from apps.common.ratelimit import RedisSlidingWindow, RedisTokenBucket
+from apps.account.throttles import AuthIPThrottle, OTPIdentifierThrottle, OTPPhonePrefixThrottle
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures what a throttle check costs per request: the Redis token bucket and sliding window scripts, '
+        'the account throttles as DRF runs them (key derivation included), and DRF\'s own cache-based '
+        'throttle for comparison. Then fires concurrent requests at one key to check that no more than the '
+        'limit get through.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cache', default='default', help='A django-redis cache alias.')
+        parser.add_argument('--checks', type=int, default=5000, help='Checks per measurement.')
+        parser.add_argument('--concurrency', type=int, default=32, help='Threads in the concurrency check.')
+        parser.add_argument('--limit', type=int, default=100, help='Requests allowed in the concurrency check.')
+
+    def handle(self, *args, **options):
+        client = get_redis_client(options['cache'])
+        if client is None:
+            raise CommandError(f"Cache '{options['cache']}' is not a Redis cache.")
+        run = uuid.uuid4().hex[:8]
+        checks = options['checks']
+        # Rates high enough that every check is allowed: the cost of the normal path is measured.
+        bucket = RedisTokenBucket(client, rate=checks * 10, capacity=checks * 10)
+        window = RedisSlidingWindow(client, limit=checks * 10, window=3600)
+
+        results = {
+            'token bucket': self._measure(checks, lambda i: bucket.hit(f'benchmark:{run}:bucket:{i % 100}')),
+            'sliding window': self._measure(checks, lambda i: window.hit(f'benchmark:{run}:window:{i % 100}')),
+        }
+
+        view = type('View', (), {'throttle_identifier_field': 'phone_number'})()
+        for throttle_class in (AuthIPThrottle, OTPIdentifierThrottle, OTPPhonePrefixThrottle):
+            throttle_class = type(throttle_class.__name__, (throttle_class,), {
+                'cache_alias': options['cache'], 'rate': f'{checks * 10}/hour', 'scope': f'benchmark_{run}',
+            })
+            requests = self._requests(checks)
+            results[throttle_class.__name__] = self._measure(
+                checks, lambda i: throttle_class().allow_request(requests[i], view),
+            )
+
+        drf_throttle = type('CacheThrottle', (SimpleRateThrottle,), {
+            'rate': f'{checks * 10}/hour', 'cache': caches[options['cache']],
+            'get_cache_key': lambda self, request, view: f'benchmark:{run}:drf:{self.get_ident(request)}',
+        })
+        requests = self._requests(checks)
+        results['DRF cache throttle'] = self._measure(checks, lambda i: drf_throttle().allow_request(requests[i], view))
+
+        self.stdout.write(f"{'check':<24} {'mean µs':>8} {'p50 µs':>8} {'p99 µs':>8}")
+        for name, latencies in results.items():
+            self.stdout.write(
+                f'{name:<24} {sum(latencies) / len(latencies) * 1e6:>8.0f} '
+                f'{latencies[len(latencies) // 2] * 1e6:>8.0f} {latencies[int(len(latencies) * 0.99)] * 1e6:>8.0f}'
+            )
+
+        limit = options['limit']
+        for name, limiter in (
+            ('token bucket', RedisTokenBucket(client, rate=limit / 3600, capacity=limit)),
+            ('sliding window', RedisSlidingWindow(client, limit=limit, window=3600)),
+        ):
+            key = f'benchmark:{run}:concurrent:{name.replace(" ", "_")}'
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+                allowed = sum(wait == 0 for wait in executor.map(lambda _: limiter.hit(key), range(limit * 5)))
+            style = self.style.SUCCESS if allowed == limit else self.style.ERROR
+            self.stdout.write(style(f'{name}: {allowed} of {limit * 5} concurrent requests allowed (limit {limit}).'))
+
+        for key in client.scan_iter(f'*benchmark*{run}*'):
+            client.delete(key)
+
+    @staticmethod
+    def _requests(count: int) -> list[Request]:
+        """Sign-in requests from `count` different phone numbers and IPs; the body is parsed by the first throttle that reads it."""
+        factory = APIRequestFactory()
+        return [
+            Request(
+                factory.post('/', {'phone_number': f'+98912{i:07d}'}, format='json', REMOTE_ADDR=f'10.0.{i // 250 % 250}.{i % 250}'),
+                parsers=[JSONParser()],
+            )
+            for i in range(count)
+        ]
+
+    @staticmethod
+    def _measure(checks: int, check) -> list[float]:
+        check(0)
+        latencies = []
+        for i in range(checks):
+            started = time.perf_counter()
+            check(i)
+            latencies.append(time.perf_counter() - started)
+        return sorted(latencies)
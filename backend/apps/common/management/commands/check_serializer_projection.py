@@ -0,0 +1,64 @@
+from django.conf import settings
+from django.db import connection
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.test.utils import CaptureQueriesContext
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.request import Request
+from rest_framework.mixins import ListModelMixin
+from rest_framework.test import APIRequestFactory
+
+from apps.common.mixins import ProjectedQuerySetMixin
+
+
+class Command(BaseCommand):
+    help = (
+        'Serializes every projected list endpoint in strict mode and fails if a serializer reads a deferred '
+        'column or the number of queries grows with the number of rows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20, help='Number of rows to serialize per endpoint.')
+
+    def handle(self, *args, **options):
+        failures = []
+        for name, view_class in self._iter_projected_list_views(get_resolver().url_patterns):
+            try:
+                single, many = self._count_queries(view_class, 1), self._count_queries(view_class, options['rows'])
+            except Exception as e:
+                failures.append(f'{name}: {e}')
+                continue
+            if many > single:
+                failures.append(f'{name}: {single} queries for 1 row but {many} for {options["rows"]} rows')
+            else:
+                self.stdout.write(f'  {name}: {many} queries')
+
+        if failures:
+            raise CommandError('Serializer projection check failed:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('All projected list endpoints load only the columns they read.'))
+
+    def _iter_projected_list_views(self, patterns, namespace=''):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                prefix = f'{namespace}{pattern.namespace}:' if pattern.namespace else namespace
+                yield from self._iter_projected_list_views(pattern.url_patterns, prefix)
+            elif isinstance(pattern, URLPattern):
+                view_class = getattr(pattern.callback, 'cls', None)
+                if view_class and issubclass(view_class, ProjectedQuerySetMixin) and issubclass(view_class, ListModelMixin):
+                    yield f'{namespace}{pattern.name}', view_class
+
+    @staticmethod
+    def _count_queries(view_class, rows: int) -> int:
+        """Serializes the first `rows` objects of the view and returns the number of queries issued."""
+        view = view_class()
+        # Serializers may build absolute URLs, so the request must carry an allowed host.
+        host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+        view.request = Request(APIRequestFactory().get('/', HTTP_HOST=host))
+        view.format_kwarg = None
+        view.args, view.kwargs = (), {}
+        with CaptureQueriesContext(connection) as context:
+            queryset = view.filter_queryset(view.get_queryset())[:rows]
+            serializer = view.get_serializer(queryset, many=True)
+            serializer.context['strict_projection'] = True
+            serializer.data
+        return len(context.captured_queries)
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common import db
+
+
+class Command(BaseCommand):
+    help = (
+        'Reports the replication lag of each read replica (DATABASE_REPLICA_SETTINGS) and whether the '
+        'router would use it. Exits with an error when a replica is unusable, for use in health checks.'
+    )
+
+    def handle(self, *args, **options):
+        replicas = db.get_replicas()
+        if not replicas:
+            self.stdout.write('No read replicas configured; every query goes to the primary.')
+            return
+
+        max_lag = settings.DATABASE_REPLICA_SETTINGS['MAX_LAG_SECONDS']
+        unusable = []
+        for alias in replicas:
+            try:
+                lag = db.measure_lag(alias)
+            except Exception as e:
+                unusable.append(alias)
+                self.stdout.write(self.style.ERROR(f'{alias}: unavailable ({e})'))
+                continue
+            if lag > max_lag:
+                unusable.append(alias)
+                self.stdout.write(self.style.WARNING(f'{alias}: {lag:.2f}s behind, above {max_lag}s; bypassed'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{alias}: {lag:.2f}s behind'))
+
+        if unusable:
+            raise CommandError(f"Unusable replicas: {', '.join(unusable)}")
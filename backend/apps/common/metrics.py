@@ -0,0 +1,246 @@
+import os
+import glob
+import logging
+
+from django.conf import settings
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram, CollectorRegistry, generate_latest, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+# --- Latency buckets (seconds), tuned for API requests and Celery tasks ---
+REQUEST_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0)
+QUERY_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+TASK_LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# --- HTTP ---
+http_requests_total = Counter(
+    'http_requests_total',
+    'Total HTTP requests by resolved view, method and status code.',
+    ['view', 'method', 'status'],
+)
+http_request_duration_seconds = Histogram(
+    'http_request_duration_seconds',
+    'HTTP request latency by resolved view and method.',
+    ['view', 'method'],
+    buckets=REQUEST_LATENCY_BUCKETS,
+)
+throttled_requests_total = Counter(
+    'throttled_requests_total',
+    'Requests refused by a Redis throttle (apps.common.throttling), by scope.',
+    ['scope'],
+)
+
+# --- Database ---
+db_query_duration_seconds = Histogram(
+    'db_query_duration_seconds',
+    'Database query execution time by connection alias.',
+    ['alias'],
+    buckets=QUERY_LATENCY_BUCKETS,
+)
+db_replica_lag_seconds = Gauge(
+    'db_replica_lag_seconds',
+    'Replication lag of each read replica, as last measured by a worker.',
+    ['alias'],
+    multiprocess_mode='max',
+)
+db_replica_healthy = Gauge(
+    'db_replica_healthy',
+    'Whether a read replica is reachable and within the allowed lag (1) or bypassed (0).',
+    ['alias'],
+    multiprocess_mode='min',
+)
+db_pool_checkouts_total = Counter(
+    'db_pool_checkouts_total',
+    'Connections handed out by the psycopg connection pools.',
+    ['alias'],
+)
+db_pool_waits_total = Counter(
+    'db_pool_waits_total',
+    'Connection checkouts that had to wait for a connection to be returned or opened.',
+    ['alias'],
+)
+db_pool_wait_seconds_total = Counter(
+    'db_pool_wait_seconds_total',
+    'Time spent waiting for a pooled connection.',
+    ['alias'],
+)
+db_pool_connections_opened_total = Counter(
+    'db_pool_connections_opened_total',
+    'Connections opened to the database by the pools.',
+    ['alias'],
+)
+db_pool_errors_total = Counter(
+    'db_pool_errors_total',
+    'Pool errors by kind: timeout (no connection in time), connect, lost (failed health check), bad_return.',
+    ['alias', 'kind'],
+)
+db_pool_size = Gauge(
+    'db_pool_size',
+    'Connections currently held by the pools, in use or idle.',
+    ['alias'],
+    multiprocess_mode='livesum',
+)
+db_pool_available = Gauge(
+    'db_pool_available',
+    'Idle connections ready in the pools.',
+    ['alias'],
+    multiprocess_mode='livesum',
+)
+db_replica_fallbacks_total = Counter(
+    'db_replica_fallbacks_total',
+    'Replica-eligible requests served by the primary, by reason: pinned (recent write) or unhealthy.',
+    ['reason'],
+)
+
+# --- Cache ---
+cache_requests_total = Counter(
+    'cache_requests_total',
+    'Cache lookups by result (hit or miss).',
+    ['result'],
+)
+cache_fill_total = Counter(
+    'cache_fill_total',
+    'get_or_fill() outcomes: fresh, stale (served while another process refreshes), refreshed, filled, waited, timeout.',
+    ['result'],
+)
+edge_cache_purges_total = Counter(
+    'edge_cache_purges_total',
+    'Edge (nginx) cache entries refreshed after a change to the data they show.',
+)
+
+# --- Business events ---
+otp_sent_total = Counter(
+    'otp_sent_total',
+    'One-time passwords sent, by delivery channel.',
+    ['channel'],
+)
+notification_failures_total = Counter(
+    'notification_failures_total',
+    'Failed notification sends, by channel and provider.',
+    ['channel', 'provider'],
+)
+notification_outbox_messages_total = Counter(
+    'notification_outbox_messages_total',
+    'Outbox delivery attempts by channel and outcome: sent, retried, dead (dead-lettered), expired.',
+    ['channel', 'outcome'],
+)
+notification_outbox_delay_seconds = Histogram(
+    'notification_outbox_delay_seconds',
+    'Time from writing a notification to the outbox until its provider accepted it.',
+    ['channel'],
+    buckets=TASK_LATENCY_BUCKETS,
+)
+notification_campaign_messages_total = Counter(
+    'notification_campaign_messages_total',
+    'Campaign messages by channel and outcome: sent, failed.',
+    ['channel', 'outcome'],
+)
+notification_provider_sends_total = Counter(
+    'notification_provider_sends_total',
+    'Sends attempted by routing channels, by provider and outcome: sent, failed, timeout.',
+    ['channel', 'provider', 'outcome'],
+)
+notification_provider_latency_seconds = Histogram(
+    'notification_provider_latency_seconds',
+    'Time providers took to accept a message, for routing channels.',
+    ['channel', 'provider'],
+    buckets=REQUEST_LATENCY_BUCKETS,
+)
+notification_provider_circuit_open = Gauge(
+    'notification_provider_circuit_open',
+    '1 while a routing channel is not sending to the provider after repeated failures (circuit breaker open).',
+    ['channel', 'provider'],
+    multiprocess_mode='max',
+)
+stock_reservation_conflicts_total = Counter(
+    'stock_reservation_conflicts_total',
+    'Stock decrements rejected because the requested quantity was not available.',
+)
+
+# --- Celery ---
+celery_task_duration_seconds = Histogram(
+    'celery_task_duration_seconds',
+    'Celery task execution time by task name and final state.',
+    ['task', 'state'],
+    buckets=TASK_LATENCY_BUCKETS,
+)
+
+
+class CeleryQueueDepthCollector:
+    """
+    Reports the number of messages waiting in each Celery queue at scrape time.
+    With the Redis broker every queue is a plain list, so the depth is a single LLEN.
+    """
+
+    def describe(self):
+        # Describing the metric lets the registry register it without touching the broker.
+        yield self._family()
+
+    def collect(self):
+        gauge = self._family()
+        queues = settings.METRICS_SETTINGS.get('CELERY_QUEUES', [])
+        try:
+            import redis
+
+            client = redis.Redis.from_url(settings.CELERY_BROKER_URL, socket_timeout=1)
+            with client.pipeline(transaction=False) as pipe:
+                for queue in queues:
+                    pipe.llen(queue)
+                lengths = pipe.execute()
+            for queue, length in zip(queues, lengths):
+                gauge.add_metric([queue], length)
+        except Exception as e:
+            logger.warning(f"Could not read Celery queue depth from the broker: {e}")
+        yield gauge
+
+    @staticmethod
+    def _family() -> GaugeMetricFamily:
+        return GaugeMetricFamily('celery_queue_length', 'Messages waiting in a Celery queue.', labels=['queue'])
+
+
+def is_multiprocess_mode() -> bool:
+    """Multiprocess mode is enabled by pointing PROMETHEUS_MULTIPROC_DIR at a shared, writable directory."""
+    return bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+
+def build_registry(include_queue_depth: bool = True) -> CollectorRegistry:
+    """
+    Returns the registry used for a single scrape.
+    In multiprocess mode the samples written by every gunicorn/Celery worker are aggregated from disk.
+    """
+    if not is_multiprocess_mode():
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    if include_queue_depth:
+        registry.register(CeleryQueueDepthCollector())
+    return registry
+
+
+def render_metrics(include_queue_depth: bool = True) -> bytes:
+    """Renders all metrics in the Prometheus text exposition format."""
+    return generate_latest(build_registry(include_queue_depth=include_queue_depth))
+
+
+def clear_multiprocess_dir() -> None:
+    """Removes the sample files of a previous run. Must be called before any worker process starts."""
+    multiproc_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not multiproc_dir:
+        return
+    os.makedirs(multiproc_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(multiproc_dir, '*.db')):
+        os.remove(path)
+
+
+def mark_process_dead(pid: int) -> None:
+    """Cleans up the live-gauge files of an exited worker process."""
+    if is_multiprocess_mode():
+        multiprocess.mark_process_dead(pid)
+
+
+if not is_multiprocess_mode():
+    # In a single process (e.g. runserver) the queue depth is read through the default registry.
+    REGISTRY.register(CeleryQueueDepthCollector())
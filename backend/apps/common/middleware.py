@@ -0,0 +1,113 @@
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from apps.common import db, metrics
+
+
+class PrometheusMetricsMiddleware:
+    """
+    Records request count and latency per resolved view, and the execution time of every
+    database query issued while handling the request.
+    Should be placed first in MIDDLEWARE so that the measured latency covers the whole stack.
+    Works under both WSGI and ASGI; under ASGI the ORM runs in worker threads, so query timings
+    are only recorded for sync requests.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(QueryTimer(connection.alias)))
+            response = self.get_response(request)
+        self._observe(request, response, start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._observe(request, response, start)
+        return response
+
+    def _observe(self, request, response, start: float) -> None:
+        duration = time.perf_counter() - start
+        view = self._get_view_name(request)
+        metrics.http_requests_total.labels(view=view, method=request.method, status=response.status_code).inc()
+        metrics.http_request_duration_seconds.labels(view=view, method=request.method).observe(duration)
+        db.export_pool_stats()
+
+    @staticmethod
+    def _get_view_name(request) -> str:
+        """Uses the URL pattern name (not the raw path) to keep the label cardinality bounded."""
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is None:
+            return '<unresolved>'
+        return resolver_match.view_name or resolver_match._func_path
+
+
+class DatabaseRoutingMiddleware:
+    """
+    Scopes the read-replica routing of apps.common.db to the request, and pins clients that wrote
+    to the primary for a few seconds so their next reads see their own changes.
+    Must come after AuthenticationMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        token = db.begin_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = db.end_request(token)
+        if wrote:
+            db.pin(request, response, getattr(request, 'user', None))
+        return response
+
+    async def __acall__(self, request):
+        token = db.begin_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            wrote = db.end_request(token)
+        if wrote:
+            # request.user may still be a lazy session lookup.
+            await sync_to_async(db.pin)(request, response, getattr(request, 'user', None))
+        return response
+
+
+class QueryTimer:
+    """A database execute wrapper that observes the duration of each query."""
+
+    def __init__(self, alias: str):
+        self.histogram = metrics.db_query_duration_seconds.labels(alias=alias)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.histogram.observe(time.perf_counter() - start)
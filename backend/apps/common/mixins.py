@@ -0,0 +1,120 @@
+import hashlib
+from datetime import datetime
+from typing import Optional
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+from apps.common import db, edge_cache
+
+
+def make_etag(source: str, version: str, accepted_format: str, host: str, query_params) -> str:
+    """
+    The ETag for `source`, scoped to everything else the representation depends on:
+    the API version, the negotiated format, the host (absolute URLs) and the query string.
+    """
+    params = sorted((key, sorted(values)) for key, values in query_params.lists())
+    scope = f'{source}|{version}|{accepted_format}|{host}|{params}'
+    return quote_etag(hashlib.md5(scope.encode()).hexdigest())
+
+
+class ProjectedQuerySetMixin:
+    """
+    For generic DRF views: narrows the view's queryset to the columns and relations declared by
+    its serializer (see `apps.common.serializers.ProjectedModelSerializer`).
+    Hooks into filter_queryset(), so views remain free to override get_queryset().
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'project_queryset'):
+            queryset = serializer_class.project_queryset(queryset)
+        return queryset
+
+
+class ConditionalGetMixin:
+    """
+    For DRF views: answers If-None-Match / If-Modified-Since with 304 Not Modified before the payload
+    is built, and sends ETag / Last-Modified with full responses.
+
+    By default the validators come from a single aggregate over the view's filtered queryset: the newest
+    `updated_at` and the row count (so deletions change the ETag too). Lists get no Last-Modified: the
+    newest `updated_at` does not move when a row is deleted or filtered out, so If-Modified-Since would
+    answer 304 with a stale list. Views whose payload depends on other rows override get_validators(),
+    e.g. with cache tag versions.
+    """
+
+    def get_validators(self, request) -> tuple[Optional[str], Optional[datetime]]:
+        """Returns (etag source, last modified); (None, None) disables conditional handling for the request."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = getattr(self, 'lookup_url_kwarg', None) or getattr(self, 'lookup_field', None)
+        is_detail = lookup_url_kwarg in self.kwargs
+        if is_detail:
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+
+        freshness = queryset.order_by().aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+        if not freshness['count']:
+            # Let the view answer with its empty list or 404.
+            return None, None
+        source = f"{freshness['count']}:{freshness['last_modified'].isoformat()}"
+        return source, (freshness['last_modified'] if is_detail else None)
+
+    def make_etag(self, request, source: str) -> str:
+        accepted_format = getattr(request.accepted_renderer, 'format', '')
+        return make_etag(source, request.version, accepted_format, request.get_host(), request.query_params)
+
+    def get(self, request, *args, **kwargs):
+        source, last_modified = self.get_validators(request)
+        etag = self.make_etag(request, source) if source is not None else None
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+        if etag:
+            response.headers['ETag'] = etag
+        if timestamp is not None:
+            response.headers['Last-Modified'] = http_date(timestamp)
+        return response
+
+
+class EdgeCacheMixin:
+    """
+    For public read-only DRF views: lets the edge cache (the nginx micro-cache, or a CDN) keep anonymous
+    responses, and labels them with the surrogate keys returned by get_surrogate_keys() so they can be
+    purged when the data they show changes (see `apps.common.edge_cache`).
+    Responses without keys are only kept for the short EDGE_CACHE_SETTINGS['TTL'].
+    """
+
+    def get_surrogate_keys(self, data) -> list[str]:
+        return []
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+            return response
+        if request.user.is_authenticated:
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+
+        keys = self.get_surrogate_keys(response.data) if response.data is not None else []
+        keys = edge_cache.set_public_headers(response, keys)
+        edge_cache.register_surrogate_keys(request, keys)
+        return response
+
+
+class ReplicaReadMixin:
+    """
+    For read-only DRF views: lets the view's queries go to a read replica (see `apps.common.db`),
+    unless the client wrote recently. Views whose results must never lag behind, like delta sync
+    cursors, should not use it.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        db.allow_replica_reads(request, request.user)
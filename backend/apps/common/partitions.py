@@ -0,0 +1,151 @@
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import connections, transaction
+from django.utils.dateparse import parse_datetime
+
+# Monthly range partitions (PostgreSQL) for tables whose old rows are removed by age: dropping a month is
+# instant and leaves no dead rows behind, where DELETE has to touch, vacuum and un-index every row.
+# Partitions are named <table>_<yyyy>_<mm>; <table>_legacy holds the rows from before the conversion.
+
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+
+def month_start(value: datetime, months: int = 0) -> datetime:
+    """The first instant (UTC) of the month of `value`, `months` months later."""
+    value = value.astimezone(dt_timezone.utc)
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+
+def is_partitioned(table: str, using: str = 'default') -> bool:
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [table])
+        return cursor.fetchone() is not None
+
+
+def get_partitions(table: str, using: str = 'default') -> dict[str, datetime | None]:
+    """The partitions of `table` and their (exclusive) upper bounds; None for the default partition."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+            """,
+            [table],
+        )
+        partitions = {}
+        for name, bound in cursor.fetchall():
+            match = _UPPER_BOUND.search(bound)
+            partitions[name] = parse_datetime(match.group(1)) if match else None
+        return partitions
+
+
+def ensure_partitions(table: str, now: datetime, months_ahead: int = 2, using: str = 'default') -> list[str]:
+    """Creates the partitions of the current month and the next `months_ahead` months that do not exist yet."""
+    # Months already covered, e.g. by the legacy partition, are skipped.
+    covered_until = max((bound for bound in get_partitions(table, using).values() if bound), default=None)
+    created = []
+    with connections[using].cursor() as cursor:
+        for months in range(months_ahead + 1):
+            start = month_start(now, months)
+            if covered_until is not None and start < covered_until:
+                continue
+            name = f'{table}_{start:%Y_%m}'
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{table}" '
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{month_start(start, 1).isoformat()}')"
+            )
+            created.append(name)
+    return created
+
+
+def drop_partitions(table: str, older_than: datetime, using: str = 'default') -> list[str]:
+    """Drops the partitions whose rows are all older than `older_than`."""
+    dropped = []
+    with connections[using].cursor() as cursor:
+        for name, upper_bound in sorted(get_partitions(table, using).items()):
+            if upper_bound is not None and upper_bound <= older_than:
+                cursor.execute(f'DROP TABLE "{name}"')
+                dropped.append(name)
+    return dropped
+
+
+def partition_table(table: str, column: str, now: datetime, months_ahead: int = 2, using: str = 'default', execute: bool = True) -> list[str]:
+    """
+    Turns `table` into a table partitioned by month on `column` and returns the statements it ran.
+
+    No rows are copied: the table becomes the partition <table>_legacy, for everything before next month.
+    The slow steps (a CHECK constraint proving the bound, and a unique index including `column` for the new
+    primary key) run first without blocking writes; the switch itself holds an exclusive lock for a
+    moment. Must run before next month starts and needs PostgreSQL 13 or later. The primary key becomes
+    (id, `column`), so a row is still found by id, through the index of each partition.
+    """
+    connection = connections[using]
+    legacy = f'{table}_legacy'
+    boundary = f"'{month_start(now, 1).isoformat()}'"
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexrelid::regclass::text, pg_get_indexdef(indexrelid), indisunique FROM pg_index "
+            "WHERE indrelid = %s::regclass AND NOT indisprimary",
+            [table],
+        )
+        indexes = cursor.fetchall()
+        if any(unique for _, _, unique in indexes):
+            raise ValueError(f"{table} has unique indexes other than its primary key, which a partitioned table cannot enforce.")
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+            [table],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'p'", [table])
+        primary_key = cursor.fetchone()[0]
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+        sequence = cursor.fetchone()[0]
+
+    prepare = [
+        f'ALTER TABLE "{table}" ADD CONSTRAINT "{legacy}_bound" CHECK ("{column}" < {boundary}) NOT VALID',
+        f'ALTER TABLE "{table}" VALIDATE CONSTRAINT "{legacy}_bound"',
+        f'CREATE UNIQUE INDEX CONCURRENTLY "{legacy}_id_{column}_uniq" ON "{table}" (id, "{column}")',
+    ]
+    switch = [
+        f'LOCK TABLE "{table}" IN ACCESS EXCLUSIVE MODE',
+        f'ALTER TABLE "{table}" RENAME TO "{legacy}"',
+        # The unique index built beforehand becomes the primary key the partition needs, without a scan.
+        f'ALTER TABLE "{legacy}" DROP CONSTRAINT "{primary_key}", '
+        f'ADD CONSTRAINT "{legacy}_pkey" PRIMARY KEY USING INDEX "{legacy}_id_{column}_uniq"',
+        *(f'ALTER INDEX "{name}" RENAME TO "{name[:55]}_legacy"' for name, _, _ in indexes),
+        *(f'ALTER TABLE "{legacy}" RENAME CONSTRAINT "{name}" TO "{name[:55]}_legacy"' for name, _ in foreign_keys),
+        f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE ("{column}")',
+        f'ALTER TABLE "{table}" ALTER COLUMN id DROP DEFAULT',
+        f'ALTER TABLE "{table}" DROP CONSTRAINT "{legacy}_bound"',
+        f'ALTER TABLE "{table}" ADD CONSTRAINT "{primary_key}" PRIMARY KEY (id, "{column}")',
+        *(definition for _, definition, _ in indexes),
+        *(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" {definition}' for name, definition in foreign_keys),
+        # Identity columns cannot be added to partitioned tables before PostgreSQL 17; a sequence can.
+        f'ALTER TABLE "{legacy}" ALTER COLUMN id DROP IDENTITY IF EXISTS',
+        f'ALTER TABLE "{legacy}" ALTER COLUMN id DROP DEFAULT',
+        f'DROP SEQUENCE IF EXISTS {sequence}' if sequence else None,
+        f'CREATE SEQUENCE "{table}_id_seq" OWNED BY "{table}".id',
+        f'SELECT setval(\'"{table}_id_seq"\', COALESCE((SELECT max(id) FROM "{legacy}"), 0) + 1, false)',
+        f'ALTER TABLE "{table}" ALTER COLUMN id SET DEFAULT nextval(\'"{table}_id_seq"\')',
+        f'ALTER TABLE "{table}" ATTACH PARTITION "{legacy}" FOR VALUES FROM (MINVALUE) TO ({boundary})',
+    ]
+    switch = [statement for statement in switch if statement]
+    if not execute:
+        return prepare + switch
+
+    with connection.cursor() as cursor:
+        for statement in prepare:
+            # CREATE INDEX CONCURRENTLY cannot run in a transaction.
+            cursor.execute(statement)
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        for statement in switch:
+            cursor.execute(statement)
+    ensure_partitions(table, now, months_ahead, using)
+    return prepare + switch
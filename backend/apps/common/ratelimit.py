@@ -0,0 +1,109 @@
+import time
+import threading
+
+# Both scripts check and update the limit in one step, so concurrent requests cannot both take the last token.
+# They return the seconds to wait as a string (Redis truncates Lua numbers to integers); "0" when allowed.
+
+# KEYS[1]: bucket hash; ARGV: refill rate (tokens/s), capacity, tokens to take. Uses the Redis clock, so every
+# process sees the same time.
+_TOKEN_BUCKET_SCRIPT = """
+local rate, capacity, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(wait)
+"""
+
+# KEYS: counters of the current and the previous window; ARGV: limit, window (s), elapsed part of the current
+# window (0-1). The previous window counts in proportion to how much of it the sliding window still covers.
+_SLIDING_WINDOW_SCRIPT = """
+local limit, window, elapsed = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local current = tonumber(redis.call('GET', KEYS[1])) or 0
+local previous = tonumber(redis.call('GET', KEYS[2])) or 0
+if previous * (1 - elapsed) + current + 1 > limit then
+    local wait = (1 - elapsed) * window
+    if previous > 0 and current + 1 <= limit then
+        wait = math.max(0, (1 - (limit - 1 - current) / previous - elapsed) * window)
+    end
+    return tostring(wait)
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], math.ceil(window * 2))
+return '0'
+"""
+
+
+class TokenBucket:
+    """
+    Paces a sender to `rate` events per second on average, allowing bursts of up to `capacity`.
+    Thread-safe; the limit applies to this process.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1) -> float:
+        """Takes `tokens`, sleeping until they are available; returns the seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            # Tokens are taken at once and may go negative: callers queue behind each other's debt, and a
+            # request larger than the bucket (e.g. a whole provider batch) waits for the tokens it lacks.
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+class RedisTokenBucket:
+    """
+    A token bucket shared by every process through Redis, e.g. to throttle a client across all workers.
+    Unlike TokenBucket it does not wait: a request that finds no token is refused.
+    """
+
+    def __init__(self, client, rate: float, capacity: float = None):
+        self.client = client
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._script = client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    def hit(self, key: str, tokens: float = 1) -> float:
+        """Takes `tokens` from the bucket `key` and returns 0, or, when they are not available, the seconds until they are."""
+        return float(self._script(keys=[key], args=[self.rate, self.capacity, tokens]))
+
+
+class RedisSlidingWindow:
+    """
+    At most `limit` events per sliding `window` of seconds, shared by every process through Redis. The
+    count is estimated from two fixed-window counters, so each key costs two small integers, not a log of
+    every event.
+    """
+
+    def __init__(self, client, limit: int, window: float):
+        self.client = client
+        self.limit = limit
+        self.window = window
+        self._script = client.register_script(_SLIDING_WINDOW_SCRIPT)
+
+    def hit(self, key: str) -> float:
+        """Counts an event for `key` and returns 0, or, when over the limit, the seconds until it is not (uncounted)."""
+        current, elapsed = divmod(time.time(), self.window)
+        keys = [f'{key}:{int(current)}', f'{key}:{int(current) - 1}']
+        return float(self._script(keys=keys, args=[self.limit, self.window, elapsed / self.window]))
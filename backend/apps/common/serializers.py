@@ -0,0 +1,305 @@
+import inspect
+import keyword
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.db.models.manager import BaseManager
+from django.db.models.query_utils import DeferredAttribute
+from django.utils.functional import cached_property
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db.models.fields.related_descriptors import (
+    ForwardManyToOneDescriptor, ManyToManyDescriptor, ReverseManyToOneDescriptor,
+)
+
+from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+
+class ProjectedModelSerializer(serializers.ModelSerializer):
+    """
+    A ModelSerializer that knows which model columns and relations it reads, so that list views
+    can load only those (see `apps.common.mixins.ProjectedQuerySetMixin`).
+
+    The projection is derived from the serializer declaration:
+    - Concrete model fields listed in `Meta.fields` (or used as `source`) are loaded with `.only()`.
+    - Nested projected serializers on forward or one-to-one relations are joined with `select_related()`.
+    - Nested projected serializers with `many=True` are loaded with a trimmed `Prefetch()`.
+    Columns read by properties or method fields are declared in `Meta.read_columns`, and any extra
+    prefetches they need in `Meta.prefetch_related`.
+
+    With `STRICT_SERIALIZER_PROJECTION` enabled, touching a deferred field raises instead of silently
+    issuing a refresh query for every row.
+    """
+
+    @classmethod
+    def get_projection(cls) -> tuple[list, list, list]:
+        """Returns the (only, select_related, prefetch_related) lookups this serializer needs."""
+        model = cls.Meta.model
+        only = [model._meta.pk.name, *getattr(cls.Meta, 'read_columns', ())]
+        select_related = []
+        prefetch_related = list(getattr(cls.Meta, 'prefetch_related', ()))
+
+        for field in cls().fields.values():
+            if field.source == '*' or field.write_only:
+                continue
+            path = field.source.split('.')
+
+            if isinstance(field, serializers.ListSerializer):
+                if isinstance(field.child, ProjectedModelSerializer):
+                    prefetch_related.append(Prefetch(path[0], queryset=field.child.get_related_queryset(model, path[0])))
+                else:
+                    prefetch_related.append(path[0])
+                continue
+
+            if isinstance(field, ProjectedModelSerializer):
+                child_only, child_select, child_prefetch = field.get_projection()
+                select_related.append(path[0])
+                select_related.extend(f'{path[0]}__{lookup}' for lookup in child_select)
+                only.extend(f'{path[0]}__{lookup}' for lookup in child_only)
+                prefetch_related.extend(cls._prefix_prefetch(path[0], lookup) for lookup in child_prefetch)
+                continue
+
+            try:
+                model_field = model._meta.get_field(path[0])
+            except FieldDoesNotExist:
+                # Properties and methods declare their columns in Meta.read_columns.
+                continue
+            if len(path) > 1 and model_field.is_relation:
+                # e.g. CharField(source='product.name')
+                select_related.append(path[0])
+                only.append('__'.join(path))
+            elif model_field.concrete:
+                only.append(path[0])
+
+        return only, select_related, prefetch_related
+
+    @classmethod
+    def project_queryset(cls, queryset, extra_columns=()):
+        """Applies the serializer's projection to a queryset of its model."""
+        only, select_related, prefetch_related = cls.get_projection()
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset.only(*dict.fromkeys([*only, *extra_columns]))
+
+    @classmethod
+    def get_related_queryset(cls, parent_model, accessor: str):
+        """
+        Returns the projected queryset used to prefetch `accessor` of `parent_model`.
+        For reverse foreign keys the column pointing back to the parent is kept, since the
+        prefetch needs it to attach every row to its parent.
+        """
+        relation = parent_model._meta.get_field(accessor)
+        extra_columns = [relation.field.name] if relation.one_to_many else []
+        return cls.project_queryset(cls.Meta.model._default_manager.all(), extra_columns=extra_columns)
+
+    @staticmethod
+    def _prefix_prefetch(prefix: str, lookup):
+        if isinstance(lookup, Prefetch):
+            return Prefetch(f'{prefix}__{lookup.prefetch_through}', queryset=lookup.queryset, to_attr=lookup.to_attr)
+        return f'{prefix}__{lookup}'
+
+    def to_representation(self, instance):
+        if not self._is_strict():
+            return super().to_representation(instance)
+
+        deferred = instance.get_deferred_fields()
+        data = super().to_representation(instance)
+        loaded = deferred - instance.get_deferred_fields()
+        if loaded:
+            raise ImproperlyConfigured(
+                f"{self.__class__.__name__} read the deferred field(s) {', '.join(sorted(loaded))} of "
+                f"{instance.__class__.__name__}, causing a query per row. Add them to Meta.read_columns."
+            )
+        return data
+
+    def _is_strict(self) -> bool:
+        return is_strict_projection(self.context)
+
+
+def is_strict_projection(context: dict) -> bool:
+    """The `strict_projection` context key overrides the STRICT_SERIALIZER_PROJECTION setting."""
+    strict = context.get('strict_projection')
+    if strict is None:
+        return getattr(settings, 'STRICT_SERIALIZER_PROJECTION', False)
+    return strict
+
+
+# --- Compiled read serializers ---
+
+# Fields whose to_representation() does not depend on the serializer context, so the instance
+# built at import time can be shared by every request.
+_CONTEXT_FREE_FIELDS = (
+    serializers.BooleanField, serializers.CharField, serializers.SlugField, serializers.EmailField,
+    serializers.URLField, serializers.UUIDField, serializers.IntegerField, serializers.FloatField,
+    serializers.DecimalField, serializers.DateTimeField, serializers.DateField, serializers.TimeField,
+    serializers.DurationField, serializers.ChoiceField, serializers.JSONField, serializers.ReadOnlyField,
+)
+# Model attributes that can be read with a plain getattr(): they are not called and never raise ObjectDoesNotExist.
+_PLAIN_ATTRIBUTES = (
+    DeferredAttribute, ForwardManyToOneDescriptor, ManyToManyDescriptor, ReverseManyToOneDescriptor,
+    property, cached_property,
+)
+
+
+def compile_serializer(serializer_class):
+    """
+    Compiles a read-only ModelSerializer into a specialized to-dict function, built once at import time.
+    Returns a drop-in replacement class for list/retrieve views, exposing `.data`, `many=True`, `context`
+    and the original `project_queryset()`.
+
+    Per-field dispatch (get_attribute() and its callable checks, to_representation(), SkipField handling)
+    is resolved here, so serializing a row is a straight run of attribute reads. Fields that depend on the
+    request (method fields, file URLs, hyperlinks) are bound once per call, not once per row.
+    """
+    attrs = {
+        '__doc__': f"Compiled, read-only version of {serializer_class.__name__}.",
+        'serializer_class': serializer_class,
+        'plan': SerializerPlan(serializer_class()),
+    }
+    if hasattr(serializer_class, 'project_queryset'):
+        attrs['project_queryset'] = classmethod(lambda cls, queryset: cls.serializer_class.project_queryset(queryset))
+    return type(f"Compiled{serializer_class.__name__}", (CompiledSerializer,), attrs)
+
+
+class CompiledSerializer:
+    """Base class of the serializers produced by compile_serializer()."""
+    serializer_class = None
+    plan = None
+
+    def __init__(self, instance=None, many: bool = False, context: dict = None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self._context = context or {}
+
+    @property
+    def context(self) -> dict:
+        return self._context
+
+    @property
+    def data(self):
+        if is_strict_projection(self._context):
+            # The deferred-field guard lives in the regular serializer.
+            return self.serializer_class(self.instance, many=self.many, context=self._context).data
+
+        to_dict = self.plan.bind(self.serializer_class(context=self._context))
+        if self.many:
+            iterable = self.instance.all() if isinstance(self.instance, BaseManager) else self.instance
+            return ReturnList([to_dict(item) for item in iterable], serializer=self)
+        return ReturnDict(to_dict(self.instance), serializer=self)
+
+
+def _takes_only_self(function) -> bool:
+    """Mirrors rest_framework.fields.is_simple_callable() for a method looked up on the class."""
+    parameters = list(inspect.signature(function).parameters.values())[1:]
+    return all(
+        param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD) or param.default is not param.empty
+        for param in parameters
+    )
+
+
+class SerializerPlan:
+    """
+    The generated to-dict function of one (possibly nested) serializer.
+    Values only known per call are passed to the generated code as `b[i]`, computed from the
+    per-call serializer by `self.binders[i]`; import-time constants are available as `c<i>`.
+    """
+
+    def __init__(self, serializer: serializers.ModelSerializer):
+        self.model = serializer.Meta.model
+        self.binders = []
+        self.constants = []
+
+        lines = ['def make(b):', '    def to_dict(instance):', '        ret = {}']
+        for name, field in serializer.fields.items():
+            if not field.write_only:
+                lines.extend(self._compile_field(name, field))
+        lines.extend(['        return ret', '    return to_dict'])
+        self.source = '\n'.join(lines)
+
+        namespace = {
+            'BaseManager': BaseManager, 'PKOnlyObject': PKOnlyObject, 'SkipField': SkipField,
+            **{f'c{i}': constant for i, constant in enumerate(self.constants)},
+        }
+        exec(compile(self.source, f'<compiled {serializer.__class__.__name__}>', 'exec'), namespace)
+        self._make = namespace['make']
+
+    def bind(self, serializer):
+        """Returns the to-dict function for one call, given the serializer instance of that call."""
+        return self._make(tuple(binder(serializer) for binder in self.binders))
+
+    def _compile_field(self, name: str, field) -> list[str]:
+        key = repr(name)
+        if isinstance(field, serializers.SerializerMethodField):
+            method = self._bind(lambda s, n=field.method_name: getattr(s, n))
+            return [f'        ret[{key}] = {method}(instance)']
+
+        convert = self._compile_conversion(name, field)
+        read = self._compile_read(field)
+        if read is not None and convert == 'value':
+            return [f'        ret[{key}] = {read}']
+        if read is not None:
+            return [
+                f'        value = {read}',
+                f'        ret[{key}] = None if value is None else {convert}',
+            ]
+        # Same semantics as Serializer.to_representation(): skipped fields are left out of the output.
+        return [
+            '        try:',
+            f'            value = {self._constant(field.get_attribute)}(instance)',
+            '        except SkipField:',
+            '            pass',
+            '        else:',
+            f'            ret[{key}] = None if (value.pk if isinstance(value, PKOnlyObject) else value) is None else {convert}',
+        ]
+
+    def _compile_read(self, field) -> str | None:
+        """Returns the expression reading the field's value, or None when DRF's get_attribute() is needed."""
+        if len(field.source_attrs) != 1:
+            return None
+        attr = field.source_attrs[0]
+        if not attr.isidentifier() or keyword.iskeyword(attr):
+            return None
+        descriptor = inspect.getattr_static(self.model, attr, None)
+        if isinstance(descriptor, _PLAIN_ATTRIBUTES):
+            return f'instance.{attr}'
+        if inspect.isfunction(descriptor) and _takes_only_self(descriptor):
+            # A method such as get_logo_url, which DRF would call.
+            return f'instance.{attr}()'
+        return None
+
+    def _compile_conversion(self, name: str, field) -> str:
+        """Returns the expression turning `value` into its primitive representation."""
+        if isinstance(field, serializers.ListSerializer) and isinstance(field.child, serializers.ModelSerializer):
+            child = self._bind_child(SerializerPlan(field.child), lambda s: s.fields[name].child)
+            return f'[{child}(item) for item in (value.all() if isinstance(value, BaseManager) else value)]'
+        if isinstance(field, serializers.ModelSerializer):
+            child = self._bind_child(SerializerPlan(field), lambda s: s.fields[name])
+            return f'{child}(value)'
+
+        field_type = type(field)
+        if field_type is serializers.ReadOnlyField:
+            return 'value'
+        if field_type is serializers.IntegerField:
+            return 'int(value)'
+        if issubclass(field_type, serializers.CharField) and field_type.to_representation is serializers.CharField.to_representation:
+            return 'str(value)'
+        if field_type in _CONTEXT_FREE_FIELDS:
+            return f'{self._constant(field.to_representation)}(value)'
+        # Anything else may read the request from the context, so it is bound per call.
+        return f'{self._bind(lambda s: s.fields[name].to_representation)}(value)'
+
+    def _bind_child(self, plan: 'SerializerPlan', get_child) -> str:
+        # The per-call nested serializer is only needed (and its parent's fields only built) when the child binds values.
+        return self._bind(lambda s: plan.bind(get_child(s) if plan.binders else None))
+
+    def _bind(self, binder) -> str:
+        self.binders.append(binder)
+        return f'b[{len(self.binders) - 1}]'
+
+    def _constant(self, value) -> str:
+        self.constants.append(value)
+        return f'c{len(self.constants) - 1}'
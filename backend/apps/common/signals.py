@@ -0,0 +1,98 @@
+import os
+import time
+import logging
+
+from django.conf import settings
+
+from celery.signals import task_prerun, task_postrun, worker_init, worker_process_shutdown
+
+from apps.common import db, metrics, edge_cache
+from apps.common.cache import tags_invalidated
+
+logger = logging.getLogger(__name__)
+
+_task_start_times: dict[str, float] = {}
+
+
+@task_prerun.connect
+def record_task_start(task_id=None, **kwargs):
+    """Remembers when a task started executing in this worker process."""
+    _task_start_times[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def record_task_duration(task_id=None, task=None, state=None, **kwargs):
+    """Observes the execution time of a finished task, labelled with its final state."""
+    start = _task_start_times.pop(task_id, None)
+    if start is None or task is None:
+        return
+    metrics.celery_task_duration_seconds.labels(task=task.name, state=state or 'UNKNOWN').observe(time.perf_counter() - start)
+    db.export_pool_stats()
+
+
+@worker_init.connect
+def close_connection_pools(**kwargs):
+    """
+    Pool processes are forked from the worker, and a connection pool cannot be shared across a fork:
+    its sockets would be used by two processes and its threads would not exist in the child.
+    Each pool process opens its own pool on first use instead.
+    """
+    db.close_connection_pools()
+
+
+@worker_init.connect
+def start_celery_metrics_exporter(**kwargs):
+    """
+    Serves the metrics written by the pool processes of this Celery worker on a dedicated port.
+    Queue depth is exported by the API's /metrics endpoint only, to avoid duplicate series.
+    """
+    port = settings.METRICS_SETTINGS.get('CELERY_EXPORTER_PORT')
+    if not port:
+        return
+    if not metrics.is_multiprocess_mode():
+        logger.warning("PROMETHEUS_MULTIPROC_DIR is not set; Celery task metrics from pool processes will not be exported.")
+        return
+
+    # Clear samples left over from a previous run before the pool processes start writing.
+    metrics.clear_multiprocess_dir()
+
+    from prometheus_client import start_http_server
+    start_http_server(port, registry=metrics.build_registry(include_queue_depth=False))
+
+
+@worker_process_shutdown.connect
+def mark_pool_process_dead(pid=None, **kwargs):
+    """
+    Removes the samples of a pool process that exits (e.g. recycled after max-tasks-per-child), so its
+    livesum gauges stop counting towards the worker's totals; the counterpart of gunicorn's child_exit.
+    """
+    metrics.mark_process_dead(pid or os.getpid())
+
+
+@tags_invalidated.connect
+def purge_edge_cache(tags=(), **kwargs):
+    """Cached API responses share their tags with the edge cache's surrogate keys, so they are purged together."""
+    if not edge_cache.is_purge_enabled():
+        return
+    from apps.common.tasks import purge_edge_cache as purge_task
+    try:
+        purge_task.delay(list(tags))
+    except Exception as e:
+        logger.warning(f"Could not queue an edge cache purge for {list(tags)}: {e}")
+
+
+@tags_invalidated.connect
+def replay_after_replica_lag(tags=(), cache_alias='default', replayed=False, **kwargs):
+    """
+    A cache entry or edge copy refilled from a replica right after a change may still show the old data.
+    Invalidating again once the replicas are at most MAX_LAG_SECONDS behind bounds how long that lasts.
+    """
+    if replayed or not db.get_replicas():
+        return
+    from apps.common.tasks import replay_tag_invalidation
+    try:
+        replay_tag_invalidation.apply_async(
+            (list(tags), cache_alias), countdown=settings.DATABASE_REPLICA_SETTINGS['MAX_LAG_SECONDS'] + 1,
+        )
+    except Exception as e:
+        logger.warning(f"Could not schedule the replay of cache invalidation for {list(tags)}: {e}")
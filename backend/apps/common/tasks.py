@@ -0,0 +1,16 @@
+from celery import shared_task
+
+from apps.common import edge_cache
+from apps.common.cache import invalidate_tags
+
+
+@shared_task(ignore_result=True)
+def purge_edge_cache(keys: list[str]) -> int:
+    """Refreshes the edge-cached responses labelled with `keys`; see edge_cache.purge_keys()."""
+    return edge_cache.purge_keys(keys)
+
+
+@shared_task(ignore_result=True)
+def replay_tag_invalidation(tags: list[str], cache_alias: str = 'default') -> None:
+    """Invalidates `tags` again, once read replicas have replayed the change that first invalidated them."""
+    invalidate_tags(tags, cache_alias=cache_alias, replayed=True)
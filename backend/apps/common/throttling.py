@@ -0,0 +1,69 @@
+import logging
+
+from rest_framework.throttling import SimpleRateThrottle
+
+from apps.common import metrics
+from apps.common.cache import get_redis_client
+from apps.common.ratelimit import RedisSlidingWindow, RedisTokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class RedisRateThrottle(SimpleRateThrottle):
+    """
+    A DRF throttle checked in Redis by one Lua script: a single round trip that counts and decides
+    atomically for every worker. Subclasses set `scope` (its rate is in DEFAULT_THROTTLE_RATES, e.g.
+    '30/min') and `get_cache_key()`, which runs before the view and must not touch the database.
+
+    `algorithm` is 'token_bucket' (the rate on average, in bursts of up to the whole rate) or
+    'sliding_window' (never more than the rate in any period). Without a Redis cache (e.g. in
+    development) DRF's cache-based throttling is used; if Redis fails, requests are let through.
+    """
+    algorithm = 'token_bucket'
+    cache_alias = 'default'
+
+    # Limiters by (alias, algorithm, rate), shared by the throttle instances DRF creates for every request.
+    _limiters: dict = {}
+
+    def __init__(self):
+        super().__init__()
+        self._wait = None
+
+    def get_limiter(self):
+        client = get_redis_client(self.cache_alias)
+        if client is None:
+            return None
+        cache_key = (self.cache_alias, self.algorithm, self.num_requests, self.duration)
+        limiter = self._limiters.get(cache_key)
+        if limiter is None:
+            if self.algorithm == 'sliding_window':
+                limiter = RedisSlidingWindow(client, self.num_requests, self.duration)
+            else:
+                limiter = RedisTokenBucket(client, self.num_requests / self.duration, self.num_requests)
+            self._limiters[cache_key] = limiter
+        return limiter
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        limiter = self.get_limiter()
+        if limiter is None:
+            return super().allow_request(request, view)
+        try:
+            self._wait = limiter.hit(self.key)
+        except Exception as e:
+            logger.warning(f"Throttle '{self.scope}' could not reach Redis, allowing the request: {e}")
+            return True
+        if self._wait:
+            metrics.throttled_requests_total.labels(scope=self.scope).inc()
+            return False
+        return True
+
+    def wait(self):
+        if self._wait is None:
+            return super().wait()
+        return self._wait
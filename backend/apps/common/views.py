@@ -0,0 +1,169 @@
+import ipaddress
+from datetime import datetime
+from typing import Any, Optional
+
+from django.conf import settings
+from django.views import View
+from django.http import HttpResponse, HttpResponseForbidden
+from django.db import close_old_connections
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from asgiref.sync import sync_to_async
+
+from prometheus_client import CONTENT_TYPE_LATEST
+from rest_framework.settings import api_settings
+
+from apps.common import db, edge_cache
+from apps.common.metrics import render_metrics
+from apps.common.mixins import make_etag
+from apps.common.renderers import ORJSONRenderer
+
+
+def _can_scrape_metrics(request) -> bool:
+    token = settings.METRICS_SETTINGS['AUTH_TOKEN']
+    if token:
+        return constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    # Requests through nginx come from a private address too; they are told apart by the header it adds.
+    if 'X-Forwarded-For' in request.headers:
+        return False
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network) for network in settings.METRICS_SETTINGS['ALLOWED_NETWORKS'])
+
+
+@require_GET
+def metrics_view(request):
+    """
+    Exposes application metrics in the Prometheus text format.
+    Only for scrapers on the internal network, or holding METRICS_SETTINGS['AUTH_TOKEN']; nginx denies
+    /api/metrics as well.
+    """
+    if not _can_scrape_metrics(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
+
+
+def _run_sync_view(view, request, args, kwargs) -> HttpResponse:
+    # Runs in a shared thread pool rather than the request's own thread, so the connection is
+    # recycled here the way the request_started/request_finished signals would in a sync worker.
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+class AsyncReadView(View):
+    """
+    Async counterpart of a public, read-only DRF view (`sync_view_class`), for the ASGI deployment.
+
+    Anonymous JSON requests are answered on the event loop: revalidation from aget_validators(), full
+    responses from aget_data(), e.g. a fresh catalog cache entry read with the async Redis client.
+    Everything else (authenticated or browsable API requests, cache misses, errors) is handed to the
+    DRF view in a thread, so both paths always give the same answer.
+    """
+    sync_view_class = None
+    http_method_names = ['get', 'head', 'options']
+
+    _renderer = ORJSONRenderer()
+
+    def setup(self, request, *args, **kwargs):
+        super().setup(request, *args, **kwargs)
+        self.sync_view = self.sync_view_class.as_view()
+
+    async def aget_validators(self, request, *args, **kwargs) -> tuple[Optional[str], Optional[datetime]]:
+        """Same contract as ConditionalGetMixin.get_validators()."""
+        return None, None
+
+    async def aget_data(self, request, *args, **kwargs) -> Any:
+        """The response payload, or None to let the DRF view build the response."""
+        return None
+
+    def get_surrogate_keys(self, data) -> list[str]:
+        return []
+
+    def can_serve(self, request, version: Optional[str]) -> bool:
+        """Whether the request can skip DRF: anonymous, asking for JSON, for a known API version."""
+        if 'HTTP_AUTHORIZATION' in request.META or settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return False
+        if api_settings.URL_FORMAT_OVERRIDE in request.GET or 'text/html' in request.META.get('HTTP_ACCEPT', ''):
+            return False
+        return version in api_settings.ALLOWED_VERSIONS
+
+    async def run_sync_view(self, request, *args, **kwargs) -> HttpResponse:
+        return await sync_to_async(_run_sync_view, thread_sensitive=False)(self.sync_view, request, args, kwargs)
+
+    async def get(self, request, *args, **kwargs):
+        version = kwargs.get('version')
+        if not self.can_serve(request, version):
+            return await self.run_sync_view(request, *args, **kwargs)
+
+        # Anonymous by now, so only the pin cookie can keep the request on the primary.
+        db.allow_replica_reads(request)
+        source, last_modified = await self.aget_validators(request, *args, **kwargs)
+        # Same ETag as the DRF view sends for JSON, so caches can revalidate against either deployment.
+        etag = make_etag(source, version, self._renderer.format, request.get_host(), request.GET) if source is not None else None
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            data = await self.aget_data(request, *args, **kwargs)
+            if data is None:
+                return await self.run_sync_view(request, *args, **kwargs)
+            response = HttpResponse(self._renderer.render(data), content_type=self._renderer.media_type)
+            keys = edge_cache.set_public_headers(response, self.get_surrogate_keys(data))
+            await edge_cache.aregister_surrogate_keys(request, keys)
+
+        patch_vary_headers(response, ['Accept'])
+        if etag:
+            response.headers['ETag'] = etag
+        if timestamp is not None:
+            response.headers['Last-Modified'] = http_date(timestamp)
+        return response
+
+
+class AsyncProjectedReadView(AsyncReadView):
+    """
+    AsyncReadView for the simple list and retrieve views: runs the DRF view's queryset (projected by its
+    serializer, see ProjectedQuerySetMixin) with Django's async ORM. Views with filter backends or
+    custom list()/retrieve() need their own aget_data().
+    """
+
+    def _get_queryset(self, request, kwargs):
+        view = self.sync_view_class(request=request, kwargs=kwargs, format_kwarg=None)
+        queryset = view.get_queryset()
+        lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+        if lookup_url_kwarg in kwargs:
+            queryset = queryset.filter(**{view.lookup_field: kwargs[lookup_url_kwarg]})
+        return view, queryset
+
+    async def aget_validators(self, request, *args, **kwargs):
+        view, queryset = self._get_queryset(request, kwargs)
+        freshness = await queryset.order_by().aaggregate(last_modified=Max('updated_at'), count=Count('pk'))
+        if not freshness['count']:
+            return None, None
+        source = f"{freshness['count']}:{freshness['last_modified'].isoformat()}"
+        # As in ConditionalGetMixin, lists are revalidated by their ETag only.
+        is_detail = (view.lookup_url_kwarg or view.lookup_field) in kwargs
+        return source, (freshness['last_modified'] if is_detail else None)
+
+    async def aget_data(self, request, *args, **kwargs):
+        view, queryset = self._get_queryset(request, kwargs)
+        serializer_class = view.get_serializer_class()
+        if hasattr(serializer_class, 'project_queryset'):
+            queryset = serializer_class.project_queryset(queryset)
+        rows = [row async for row in queryset]
+        context = {'request': request, 'view': view, 'format': None}
+
+        if (view.lookup_url_kwarg or view.lookup_field) in kwargs:
+            # A missing row is the DRF view's 404.
+            return serializer_class(rows[0], context=context).data if rows else None
+        return serializer_class(rows, many=True, context=context).data
@@ -0,0 +1,59 @@
+from django.contrib import admin
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from .models import Campaign, OutboxMessage
+from .services import CampaignService
+from .tasks import run_campaign
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    """Inspect the notification outbox and requeue dead-lettered messages that have not expired"""
+    list_display = ('recipient', 'channel', 'kind', 'status', 'attempts', 'created_at', 'available_at', 'sent_at')
+    list_filter = ('status', 'channel', 'kind')
+    search_fields = ('recipient', 'user__username', 'last_error')
+    # The payload holds OTP codes and password reset links, so it is not shown.
+    exclude = ('payload',)
+    readonly_fields = [f.name for f in OutboxMessage._meta.fields if f.name != 'payload']
+    actions = ('requeue',)
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description=_("Requeue the selected dead-lettered messages"))
+    def requeue(self, request, queryset):
+        """
+        Expired messages, and dead-lettered ones past their expiry, are not requeued: their codes and links
+        are no longer valid (and their payload is gone).
+        """
+        now = timezone.now()
+        updated = queryset.filter(status=OutboxMessage.StatusChoices.DEAD).filter(
+            Q(expires_at__isnull=True) | Q(expires_at__gt=now)
+        ).update(status=OutboxMessage.StatusChoices.PENDING, attempts=0, available_at=now, updated_at=now)
+        self.message_user(request, _("%(count)d message(s) requeued.") % {'count': updated})
+
+
+@admin.register(Campaign)
+class CampaignAdmin(admin.ModelAdmin):
+    """Write campaigns, start, pause and resume them, and follow their progress"""
+    list_display = ('name', 'channel', 'status', 'sent_count', 'failed_count', 'started_at', 'finished_at')
+    list_filter = ('status', 'channel')
+    search_fields = ('name',)
+    readonly_fields = ('status', 'last_user_id', 'sent_count', 'failed_count', 'started_at', 'finished_at')
+    actions = ('start', 'pause')
+
+    @admin.action(description=_("Start or resume the selected campaigns"))
+    def start(self, request, queryset):
+        campaigns = list(queryset.exclude(status__in=[Campaign.StatusChoices.RUNNING, Campaign.StatusChoices.COMPLETED]))
+        for campaign in campaigns:
+            CampaignService(campaign).start()
+            transaction.on_commit(lambda pk=campaign.pk: run_campaign.delay(pk))
+        self.message_user(request, _("%(count)d campaign(s) started.") % {'count': len(campaigns)})
+
+    @admin.action(description=_("Pause the selected campaigns"))
+    def pause(self, request, queryset):
+        updated = queryset.filter(status=Campaign.StatusChoices.RUNNING).update(status=Campaign.StatusChoices.PAUSED)
+        self.message_user(request, _("%(count)d campaign(s) paused; they stop after their current chunk.") % {'count': updated})
@@ -6,3 +6,7 @@ class NotificationConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.notification"
     verbose_name = _("Notification")
+
+    def ready(self):
+        """Import signals when the app is ready."""
+        import apps.notification.signals
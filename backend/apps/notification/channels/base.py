@@ -1,9 +1,25 @@
 from abc import ABC, abstractmethod
+from typing import Iterable
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from apps.common.ratelimit import TokenBucket
+from apps.notification.exceptions import NotificationError
 
 
 class BaseNotificationChannel(ABC):
+    """
+    Optional CONFIG: RATE_LIMIT, the messages per second send_many() may send through the provider
+    (per process), with bursts of up to RATE_BURST.
+    """
+
     def __init__(self, **config: object) -> None:
         self.config: dict[str, object] = config
+        rate_limit = self.config.get('RATE_LIMIT')
+        self.rate_limiter: TokenBucket | None = (
+            TokenBucket(float(rate_limit), self.config.get('RATE_BURST')) if rate_limit else None
+        )
 
     @abstractmethod
     def send(self, recipient: str, **kwargs: object) -> None:
@@ -13,3 +29,52 @@ class BaseNotificationChannel(ABC):
         'kwargs' can contain message, subject, context, etc.
         """
         raise NotImplementedError("Each channel must implement the 'send' method.")
+
+    def send_many(self, recipients: Iterable[str], **kwargs: object) -> dict[str, str]:
+        """
+        Sends the same message to many recipients, within the provider's RATE_LIMIT, and returns the errors
+        of the recipients it could not be sent to. Channels override it to use the provider's bulk API.
+        """
+        failures: dict[str, str] = {}
+        for recipient in recipients:
+            self.throttle()
+            try:
+                self.send(recipient, **kwargs)
+            except NotificationError as e:
+                failures[recipient] = str(e)
+        return failures
+
+    def throttle(self, messages: int = 1) -> None:
+        """Waits until `messages` more may be sent within RATE_LIMIT."""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(messages)
+
+    def close(self) -> None:
+        """Releases the channel's connections. Called when the channel registry is reset."""
+
+
+class HTTPNotificationChannel(BaseNotificationChannel):
+    """
+    A channel that talks to its provider over HTTP. Channels live as long as the process (see
+    apps.notification.services.ChannelRegistry), so the session keeps connections to the provider
+    open between messages instead of paying for a TCP and TLS handshake on each one.
+
+    Optional CONFIG: TIMEOUT (seconds, or a (connect, read) pair) and POOL_SIZE (connections kept
+    per host, at least the number of threads sending at once).
+    """
+    default_timeout: tuple[float, float] = (3.05, 10)
+    default_pool_size: int = 10
+
+    def __init__(self, **config: object) -> None:
+        super().__init__(**config)
+        self.timeout = self.config.get('TIMEOUT', self.default_timeout)
+        pool_size = int(self.config.get('POOL_SIZE', self.default_pool_size))
+
+        self.session = requests.Session()
+        # Retrying is left to the caller (the Celery tasks), which knows whether a message may be sent twice.
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def close(self) -> None:
+        self.session.close()
@@ -1,6 +1,6 @@
-from typing import Any
+from typing import Any, Iterable
 
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection, send_mail
 from django.utils.html import strip_tags
 from django.template.loader import render_to_string
 
@@ -33,3 +33,33 @@ class EmailChannel(BaseNotificationChannel):
             )
         except Exception as e:
             raise NotificationError(f"Failed to send email via EmailChannel: {e}") from e
+
+    def send_many(self, recipients: Iterable[str], **kwargs: Any) -> dict[str, str]:
+        """Renders the message once and sends it to each recipient over a single SMTP connection."""
+        subject: str = kwargs.get('subject', 'Notification')
+        template_name: str | None = kwargs.get('template_name')
+        if not template_name:
+            raise NotificationError("EmailChannel requires a 'template_name' in kwargs.")
+
+        try:
+            from_email: str = str(self.config.get('FROM_EMAIL', ''))
+            html_message: str = render_to_string(template_name, kwargs.get('context', {}))
+            plain_message: str = strip_tags(kwargs.get('message'))
+            connection = get_connection(fail_silently=False)
+            connection.open()
+        except Exception as e:
+            raise NotificationError(f"Failed to send emails via EmailChannel: {e}") from e
+
+        failures: dict[str, str] = {}
+        try:
+            for recipient in recipients:
+                self.throttle()
+                email = EmailMultiAlternatives(subject, plain_message, from_email, [recipient], connection=connection)
+                email.attach_alternative(html_message, 'text/html')
+                try:
+                    email.send()
+                except Exception as e:
+                    failures[recipient] = f"Failed to send email via EmailChannel: {e}"
+        finally:
+            connection.close()
+        return failures
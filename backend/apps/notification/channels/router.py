@@ -0,0 +1,193 @@
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Optional
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from apps.common import metrics
+from apps.notification.exceptions import NotificationError
+from apps.notification.channels.base import BaseNotificationChannel
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderHealth:
+    """
+    Rolling latency and error rate of one provider over its last WINDOW sends, and its circuit breaker:
+    the circuit opens when at least FAILURE_RATE of the last sends failed (once there are MIN_SAMPLES of
+    them), stays open for OPEN_SECONDS, then lets a single trial send through (half-open) that closes it
+    again on success.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, name: str, window: int, min_samples: int, failure_rate: float, open_seconds: float):
+        self.name = name
+        self.min_samples = min_samples
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self._samples: deque = deque(maxlen=window)  # (succeeded, seconds)
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def error_rate(self) -> float:
+        samples = list(self._samples)
+        return sum(1 for succeeded, _ in samples if not succeeded) / len(samples) if samples else 0.0
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Mean latency of the recent successful sends; None until there is one."""
+        latencies = [seconds for succeeded, seconds in list(self._samples) if succeeded]
+        return sum(latencies) / len(latencies) if latencies else None
+
+    def score(self) -> Optional[float]:
+        """Expected time to a successful send (lower is healthier); None while the provider is unmeasured."""
+        latency = self.latency
+        if latency is None:
+            return None
+        return latency / max(1 - self.error_rate, 0.05)
+
+    def is_open(self) -> bool:
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._set_state(self.HALF_OPEN)
+                self._trial_in_flight = False
+            return self.state == self.OPEN
+
+    def allow_request(self) -> bool:
+        """Whether a send may go to the provider now; in half-open state only one trial send is let through."""
+        if self.is_open():
+            return False
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record(self, succeeded: bool, seconds: float) -> None:
+        with self._lock:
+            self._samples.append((succeeded, seconds))
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+                if succeeded:
+                    # Start afresh, so the failures that opened the circuit do not open it again.
+                    self._samples.clear()
+                    self._samples.append((succeeded, seconds))
+                    self._set_state(self.CLOSED)
+                else:
+                    self._open()
+            elif self.state == self.CLOSED and not succeeded and len(self._samples) >= self.min_samples:
+                if self.error_rate >= self.failure_rate:
+                    self._open()
+
+    def _open(self) -> None:
+        self._opened_at = time.monotonic()
+        self._set_state(self.OPEN)
+        logger.warning(f"SMS provider '{self.name}' is failing ({self.error_rate:.0%} of recent sends), "
+                       f"routing around it for {self.open_seconds}s.")
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        metrics.notification_provider_circuit_open.labels(channel='sms', provider=self.name).set(int(state == self.OPEN))
+
+
+class SMSRouterChannel(BaseNotificationChannel):
+    """
+    Sends each SMS through the healthiest of several providers (PROVIDERS, keys of SMS_PROVIDERS), falling
+    over to the next one when a provider fails or does not answer in time, all within DEADLINE seconds.
+    Providers are ranked by their rolling latency and error rate; unmeasured ones follow in PROVIDERS order.
+    A provider is given at most ATTEMPT_TIMEOUT seconds (half the deadline by default) while others remain
+    to fall over to, and EXPLORE_RATE of the sends try a lower-ranked provider so a recovered one is noticed.
+
+    A provider that misses the deadline may still deliver its message later, so a message can rarely
+    arrive twice. Health is tracked per process.
+    """
+
+    def __init__(self, **config: Any) -> None:
+        super().__init__(**config)
+        self.deadline = float(self.config.get('DEADLINE', 5))
+        self.attempt_timeout = float(self.config.get('ATTEMPT_TIMEOUT', self.deadline / 2))
+        self.explore_rate = float(self.config.get('EXPLORE_RATE', 0.05))
+        providers_settings = settings.NOTIFICATIONS_SETTINGS['SMS_PROVIDERS']
+
+        self.providers: dict[str, BaseNotificationChannel] = {}
+        self.health: dict[str, ProviderHealth] = {}
+        for name in self.config.get('PROVIDERS', []):
+            try:
+                provider_config = providers_settings[name]
+                self.providers[name] = import_string(provider_config['CHANNEL_CLASS'])(**provider_config.get('CONFIG', {}))
+            except Exception as e:
+                # One misconfigured provider should not take the others down with it.
+                logger.error(f"SMS provider '{name}' is not available to the router: {e}")
+                continue
+            self.health[name] = ProviderHealth(
+                name,
+                window=int(self.config.get('WINDOW', 50)),
+                min_samples=int(self.config.get('MIN_SAMPLES', 10)),
+                failure_rate=float(self.config.get('FAILURE_RATE', 0.5)),
+                open_seconds=float(self.config.get('OPEN_SECONDS', 30)),
+            )
+        if not self.providers:
+            raise NotificationError("SMSRouterChannel has no usable PROVIDERS.")
+
+        # Sends run on these threads so the router can stop waiting for a provider at the deadline.
+        self._executor = ThreadPoolExecutor(max_workers=int(self.config.get('MAX_WORKERS', 32)), thread_name_prefix='sms-router')
+
+    def ranked_providers(self) -> list[str]:
+        """Providers whose circuit is not open, healthiest first; a half-open provider goes first for its trial send."""
+        order = {name: index for index, name in enumerate(self.providers)}
+        candidates = [name for name, health in self.health.items() if not health.is_open()]
+        scores = {name: self.health[name].score() for name in candidates}
+        ranked = sorted(candidates, key=lambda name: (
+            self.health[name].state != ProviderHealth.HALF_OPEN, scores[name] is None, scores[name] or 0, order[name],
+        ))
+        if len(ranked) > 1 and random.random() < self.explore_rate:
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+        return ranked
+
+    def send(self, recipient: str, **kwargs: Any) -> None:
+        deadline = time.monotonic() + self.deadline
+        errors = []
+        ranked = self.ranked_providers()
+        for position, name in enumerate(ranked):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            health = self.health[name]
+            if not health.allow_request():
+                continue
+
+            timeout = remaining if position == len(ranked) - 1 else min(remaining, self.attempt_timeout)
+            started = time.monotonic()
+            future = self._executor.submit(self.providers[name].send, recipient, **kwargs)
+            try:
+                future.result(timeout=timeout)
+            except FutureTimeoutError:
+                outcome, error = 'timeout', f"{name}: no response within {timeout:.2f}s"
+            except Exception as e:
+                outcome, error = 'failed', f"{name}: {e}"
+            else:
+                elapsed = time.monotonic() - started
+                health.record(True, elapsed)
+                metrics.notification_provider_sends_total.labels(channel='sms', provider=name, outcome='sent').inc()
+                metrics.notification_provider_latency_seconds.labels(channel='sms', provider=name).observe(elapsed)
+                return
+
+            health.record(False, time.monotonic() - started)
+            metrics.notification_provider_sends_total.labels(channel='sms', provider=name, outcome=outcome).inc()
+            errors.append(error)
+
+        raise NotificationError(f"No SMS provider could send the message: {'; '.join(errors) or 'all providers are unavailable'}")
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        for channel in self.providers.values():
+            channel.close()
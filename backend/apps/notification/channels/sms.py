@@ -1,4 +1,6 @@
-from typing import Any
+import time
+import random
+from typing import Any, Iterable
 
 from apps.notification.exceptions import NotificationError
 from apps.notification.channels.base import BaseNotificationChannel
@@ -13,11 +15,30 @@ class ConsoleSMSChannel(BaseNotificationChannel):
         print("-------------------")
 
 
+class FakeSMSChannel(BaseNotificationChannel):
+    """
+    A stand-in provider for local testing of routing and failover: each send takes LATENCY seconds
+    (a number, or a [min, max] range) and fails with probability FAILURE_RATE.
+    """
+
+    def __init__(self, **config: Any) -> None:
+        super().__init__(**config)
+        self.latency: float | list[float] = self.config.get('LATENCY', 0)
+        self.failure_rate: float = float(self.config.get('FAILURE_RATE', 0))
+
+    def send(self, recipient: str, **kwargs: Any) -> None:
+        latency = random.uniform(*self.latency) if isinstance(self.latency, (list, tuple)) else self.latency
+        time.sleep(latency)
+        if random.random() < self.failure_rate:
+            raise NotificationError("Fake SMS provider failure.")
+
+
 class TwilioSMSChannel(BaseNotificationChannel):
     def __init__(self, **config: Any) -> None:
         super().__init__(**config)
         try:
             from twilio.rest import Client
+            from twilio.http.http_client import TwilioHttpClient
         except ImportError:
             raise ImportError("Twilio package is not installed. Run 'pip install twilio'.")
 
@@ -28,7 +49,9 @@ class TwilioSMSChannel(BaseNotificationChannel):
         if not all([self.account_sid, self.auth_token, self.from_number]):
             raise NotificationError("Twilio settings (ACCOUNT_SID, AUTH_TOKEN, FROM_NUMBER) are not configured.")
 
-        self.client = Client(self.account_sid, self.auth_token)
+        # The SDK's pooled HTTP client keeps the connection to Twilio open between messages.
+        http_client = TwilioHttpClient(pool_connections=True, timeout=self.config.get('TIMEOUT', 10))
+        self.client = Client(self.account_sid, self.auth_token, http_client=http_client)
 
     def send(self, recipient: str, **kwargs: Any) -> None:
         message: str = kwargs.get('message', '')
@@ -52,7 +75,7 @@ class KavenegarSMSChannel(BaseNotificationChannel):
         if not self.api_key:
             raise NotificationError("Kavenegar 'API_KEY' is not configured.")
 
-        self.api = KavenegarAPI(self.api_key)
+        self.api = KavenegarAPI(self.api_key, timeout=self.config.get('TIMEOUT', 10))
 
     def send(self, recipient: str, **kwargs: Any) -> None:
         message: str = kwargs.get('message', '')
@@ -63,3 +86,22 @@ class KavenegarSMSChannel(BaseNotificationChannel):
             self.api.sms_send(params)
         except Exception as e:
             raise NotificationError(f"Failed to send SMS via Kavenegar: {e}") from e
+
+    def send_many(self, recipients: Iterable[str], **kwargs: Any) -> dict[str, str]:
+        """Sends the message to up to BATCH_SIZE (at most 200) recipients per API call."""
+        message: str = kwargs.get('message', '')
+        if not message:
+            raise NotificationError("KavenegarSMSChannel requires a 'message' in kwargs.")
+
+        batch_size = min(int(self.config.get('BATCH_SIZE', 200)), 200)
+        recipients = list(recipients)
+        failures: dict[str, str] = {}
+        for start in range(0, len(recipients), batch_size):
+            batch = recipients[start:start + batch_size]
+            self.throttle(len(batch))
+            try:
+                # A comma-separated receptor list is Kavenegar's bulk send for one message.
+                self.api.sms_send({'receptor': ','.join(batch), 'message': message})
+            except Exception as e:
+                failures.update(dict.fromkeys(batch, f"Failed to send SMS via Kavenegar: {e}"))
+        return failures
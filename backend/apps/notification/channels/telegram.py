@@ -3,16 +3,17 @@ from typing import Any
 import requests
 
 from apps.notification.exceptions import NotificationError
-from apps.notification.channels.base import BaseNotificationChannel
+from apps.notification.channels.base import HTTPNotificationChannel
 
 
-class TelegramBotChannel(BaseNotificationChannel):
+class TelegramBotChannel(HTTPNotificationChannel):
     def __init__(self, **config: Any) -> None:
         super().__init__(**config)
         self.telegram_bot_token: str | None = self.config.get('TELEGRAM_BOT_TOKEN')
         if not self.telegram_bot_token:
             raise NotificationError("Telegram 'TELEGRAM_BOT_TOKEN' is not configured in NOTIFICATIONS_SETTINGS.")
-        self.api_url: str = f"https://api.telegram.org/bot{self.telegram_bot_token}/sendMessage"
+        api_base_url: str = str(self.config.get('API_BASE_URL', 'https://api.telegram.org')).rstrip('/')
+        self.api_url: str = f"{api_base_url}/bot{self.telegram_bot_token}/sendMessage"
 
     def send(self, recipient: str, **kwargs: Any) -> None:
         message: str = kwargs.get('message', '')
@@ -26,7 +27,7 @@ class TelegramBotChannel(BaseNotificationChannel):
         }
 
         try:
-            response = requests.post(self.api_url, data=payload)
+            response = self.session.post(self.api_url, data=payload, timeout=self.timeout)
             response.raise_for_status()
 
             response_data: dict[str, Any] = response.json()
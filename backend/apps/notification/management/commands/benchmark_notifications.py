@@ -0,0 +1,115 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+from apps.notification.exceptions import NotificationError
+from apps.notification.channels.telegram import TelegramBotChannel
+
+
+class _StubProviderHandler(BaseHTTPRequestHandler):
+    """Answers every POST like the Telegram Bot API does, keeping the connection open."""
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; with Nagle's algorithm a kept-alive connection would stall on delayed ACKs.
+    disable_nagle_algorithm = True
+    body = json.dumps({'ok': True, 'result': {}}).encode()
+
+    def setup(self):
+        super().setup()
+        # One handler per TCP connection.
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _StubProviderServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for every benchmark thread connecting at once.
+    request_queue_size = 256
+
+    def __init__(self, latency: float):
+        super().__init__(('127.0.0.1', 0), _StubProviderHandler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.connections = 0
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures notification sends per second against a local stub of the Telegram Bot API: a new channel '
+        'and connection per message (how NotificationService used to work) against the shared channel of the '
+        'registry, which reuses keep-alive connections. The stub speaks plain HTTP; against a real provider '
+        'each new connection also pays for a TLS handshake, so the difference is larger.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=2000, help='Messages per mode and concurrency level.')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32], help='Threads sending at once.')
+        parser.add_argument('--latency', type=float, default=0, help='Milliseconds the stub provider takes per message.')
+
+    def handle(self, *args, **options):
+        server = _StubProviderServer(latency=options['latency'] / 1000)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        config = {
+            'TELEGRAM_BOT_TOKEN': 'benchmark',
+            'API_BASE_URL': f'http://127.0.0.1:{server.server_address[1]}',
+            'POOL_SIZE': max(options['concurrency']),
+        }
+        try:
+            self.stdout.write(f"{'mode':<12} {'conc':>5} {'sends/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'conns':>6} {'errors':>6}")
+            for concurrency in options['concurrency']:
+                for mode in ('per-message', 'registry'):
+                    server.connections = 0
+                    elapsed, latencies = self._run(mode, config, options['messages'], concurrency)
+                    errors = latencies.count(None)
+                    latencies = sorted(seconds for seconds in latencies if seconds is not None) or [0]
+                    self.stdout.write(
+                        f"{mode:<12} {concurrency:>5} {len(latencies) / elapsed:>9.0f} "
+                        f"{latencies[len(latencies) // 2] * 1000:>8.2f} {latencies[int(len(latencies) * 0.99)] * 1000:>8.2f} "
+                        f"{server.connections:>6} {errors:>6}"
+                    )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    @staticmethod
+    def _run(mode: str, config: dict, messages: int, concurrency: int) -> tuple[float, list]:
+        """Sends `messages` from `concurrency` threads; returns the elapsed time and each send's latency (None if it failed)."""
+        shared = TelegramBotChannel(**config) if mode == 'registry' else None
+
+        def send(i):
+            started = time.perf_counter()
+            channel = shared or TelegramBotChannel(**config)
+            try:
+                channel.send('1000', message=f'Benchmark message {i}')
+            except NotificationError:
+                return None
+            finally:
+                if channel is not shared:
+                    channel.close()
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                latencies = list(executor.map(send, range(messages)))
+        finally:
+            if shared is not None:
+                shared.close()
+        return time.perf_counter() - started, latencies
@@ -0,0 +1,89 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.test import override_settings
+from django.core.management.base import BaseCommand
+
+from apps.notification.exceptions import NotificationError
+from apps.notification.channels.router import SMSRouterChannel
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs SMSRouterChannel against two fake providers through three phases: both healthy, the '
+        'primary slowing down and failing, and the primary recovering. Reports per phase which provider '
+        'carried the traffic, the failures and the send latency callers saw.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=300, help='Messages per phase.')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--deadline', type=float, default=1.0, help="The router's DEADLINE in seconds.")
+        parser.add_argument('--open-seconds', type=float, default=2.0, help="The router's OPEN_SECONDS.")
+
+    def handle(self, *args, **options):
+        notification_settings = {
+            **settings.NOTIFICATIONS_SETTINGS,
+            'SMS_PROVIDERS': {
+                'primary': {'CHANNEL_CLASS': 'apps.notification.channels.sms.FakeSMSChannel', 'CONFIG': {'LATENCY': [0.01, 0.03]}},
+                'backup': {'CHANNEL_CLASS': 'apps.notification.channels.sms.FakeSMSChannel', 'CONFIG': {'LATENCY': [0.04, 0.08]}},
+            },
+        }
+        with override_settings(NOTIFICATIONS_SETTINGS=notification_settings):
+            router = SMSRouterChannel(
+                PROVIDERS=['primary', 'backup'], DEADLINE=options['deadline'], OPEN_SECONDS=options['open_seconds'],
+                WINDOW=20, MIN_SAMPLES=5,
+            )
+        primary = router.providers['primary']
+        phases = [
+            ('healthy', [0.01, 0.03], 0.0),
+            ('degraded', [0.2, 3.0], 0.3),  # Slower than the deadline half of the time, and flaky.
+            ('recovered', [0.01, 0.03], 0.0),
+        ]
+
+        self.stdout.write(f"{'phase':<10} {'primary':>8} {'backup':>8} {'failed':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}  circuit")
+        try:
+            for name, latency, failure_rate in phases:
+                primary.latency, primary.failure_rate = latency, failure_rate
+                if name == 'recovered':
+                    # Give the open circuit time to let a trial send through.
+                    time.sleep(options['open_seconds'])
+                carried, failed, latencies = self._run(router, options['messages'], options['concurrency'])
+                latencies.sort()
+                self.stdout.write(
+                    f"{name:<10} {carried['primary']:>8} {carried['backup']:>8} {failed:>7} "
+                    f"{latencies[len(latencies) // 2] * 1000:>8.0f} {latencies[int(len(latencies) * 0.99)] * 1000:>8.0f} "
+                    f"{latencies[-1] * 1000:>8.0f}  {router.health['primary'].state}"
+                )
+        finally:
+            router.close()
+
+    @staticmethod
+    def _run(router: SMSRouterChannel, messages: int, concurrency: int) -> tuple[Counter, int, list[float]]:
+        """Sends `messages`; returns the messages each provider carried, the failures and every send's latency."""
+        carried = Counter()
+        originals = {}
+        for name, provider in router.providers.items():
+            def counted_send(recipient, _name=name, _send=provider.send, **kwargs):
+                _send(recipient, **kwargs)
+                carried[_name] += 1
+            originals[name], provider.send = provider.send, counted_send
+
+        def send(i):
+            started = time.perf_counter()
+            try:
+                router.send('09120000000', message=f'Message {i}')
+                failed = False
+            except NotificationError:
+                failed = True
+            return failed, time.perf_counter() - started
+
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(executor.map(send, range(messages)))
+        finally:
+            for name, provider in router.providers.items():
+                provider.send = originals[name]
+        return carried, sum(failed for failed, _ in results), [seconds for _, seconds in results]
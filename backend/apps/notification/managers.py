@@ -0,0 +1,64 @@
+import time
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+class OutboxMessageQuerySet(models.QuerySet):
+    """Custom QuerySet for the OutboxMessage model."""
+
+    def due(self):
+        """Pending messages whose (next) delivery attempt is due."""
+        return self.filter(status=self.model.StatusChoices.PENDING, available_at__lte=timezone.now())
+
+    def claim(self, limit: int, lease_seconds: int, ids=None) -> list:
+        """
+        Claims up to `limit` due messages for delivery by this worker and returns them.
+
+        The rows are locked with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent workers claim disjoint
+        batches without waiting for each other, and are then leased: they are not due again for
+        `lease_seconds`, which is how a message claimed by a worker that died is picked up again.
+        Each claim counts as a delivery attempt.
+        """
+        with transaction.atomic():
+            queryset = self.due()
+            if ids is not None:
+                queryset = queryset.filter(pk__in=ids)
+            messages = list(queryset.select_for_update(skip_locked=True).order_by('available_at')[:limit])
+            if messages:
+                available_at = timezone.now() + timedelta(seconds=lease_seconds)
+                self.filter(pk__in=[message.pk for message in messages]).update(
+                    available_at=available_at, attempts=F('attempts') + 1,
+                )
+                for message in messages:
+                    message.available_at = available_at
+                    message.attempts += 1
+        return messages
+
+    def finished(self):
+        """Messages that will not be sent (again): sent, expired or dead-lettered."""
+        StatusChoices = self.model.StatusChoices
+        return self.filter(status__in=[StatusChoices.SENT, StatusChoices.EXPIRED, StatusChoices.DEAD])
+
+    def purge(self, older_than, batch_size: int = 1000, pause: float = 0) -> int:
+        """
+        Deletes finished messages created before `older_than` in batches, to keep each transaction short.
+        Ids grow with creation time, so the batches walk the primary key index up to the first message
+        created since `older_than`; pending messages are stepped over, not deleted.
+        """
+        queryset = self.finished().filter(created_at__lt=older_than)
+        boundary = self.filter(created_at__gte=older_than).order_by('pk').values_list('pk', flat=True).first()
+        if boundary is not None:
+            queryset = queryset.filter(pk__lt=boundary)
+
+        deleted, last_id = 0, 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                return deleted
+            # Filtered again, in case a message was requeued since the batch was read.
+            deleted += self.finished().filter(pk__in=batch).delete()[0]
+            last_id = batch[-1]
+            time.sleep(pause)
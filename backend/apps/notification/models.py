@@ -0,0 +1,197 @@
+from django.db import models
+from django.conf import settings
+from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.translation import gettext_lazy as _
+
+from apps.common.models import TimeStampedModel
+from apps.notification.managers import OutboxMessageQuerySet
+
+
+class OutboxMessage(TimeStampedModel):
+    """
+    A notification waiting to be sent (transactional outbox). It is written in the same transaction as the
+    change that triggers it, so it is sent if and only if that change is committed, and it survives provider
+    outages and worker crashes. Delivered by apps.notification.tasks.deliver_outbox.
+    """
+
+    class ChannelChoices(models.TextChoices):
+        EMAIL = 'email', _('Email')
+        SMS = 'sms', _('SMS')
+        TELEGRAM = 'telegram', _('Telegram')
+
+    class StatusChoices(models.TextChoices):
+        PENDING = 'pending', _('Pending')
+        SENT = 'sent', _('Sent')
+        EXPIRED = 'expired', _('Expired')
+        DEAD = 'dead', _('Dead-lettered')
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='outbox_messages',
+        verbose_name=_("User"),
+        help_text=_("The user the message is for, if any. Email templates receive it as `user`.")
+    )
+    channel = models.CharField(
+        max_length=10,
+        choices=ChannelChoices.choices,
+        verbose_name=_("Channel")
+    )
+    recipient = models.CharField(
+        max_length=255,
+        verbose_name=_("Recipient"),
+        help_text=_("The email address, phone number or chat id the message is sent to.")
+    )
+    payload = models.JSONField(
+        default=dict,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        verbose_name=_("Payload"),
+        help_text=_("The keyword arguments of the channel's send(): message, subject, template_name, context, etc.")
+    )
+    language = models.CharField(
+        max_length=10,
+        blank=True,
+        verbose_name=_("Language"),
+        help_text=_("The language templates are rendered in.")
+    )
+    kind = models.CharField(
+        max_length=32,
+        blank=True,
+        verbose_name=_("Kind"),
+        help_text=_("What the message is about (e.g. otp, password_reset, stock_alert).")
+    )
+    object_id = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("Object ID"),
+        help_text=_("The primary key of the record the message is about, e.g. the OTP.")
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=StatusChoices.choices,
+        default=StatusChoices.PENDING,
+        verbose_name=_("Status")
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name=_("Attempts"),
+        help_text=_("The number of times a worker has claimed the message for delivery.")
+    )
+    available_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name=_("Available At"),
+        help_text=_("When the message may next be claimed: now, after a retry backoff, or when a worker's lease runs out.")
+    )
+    expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Expires At"),
+        help_text=_("Messages not sent by then are dropped, e.g. OTPs that are no longer valid.")
+    )
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Sent At")
+    )
+    last_error = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name=_("Last Error")
+    )
+
+    objects = OutboxMessageQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("Outbox Message")
+        verbose_name_plural = _("Outbox Messages")
+        indexes = [
+            # Only pending rows are ever claimed; the index stays small however many messages were sent.
+            models.Index(fields=['available_at'], condition=models.Q(status='pending'), name='outbox_pending_idx'),
+            models.Index(fields=['kind', 'object_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} to {self.recipient} ({self.status})"
+
+    @property
+    def is_expired(self):
+        return self.expires_at is not None and timezone.now() >= self.expires_at
+
+
+class Campaign(TimeStampedModel):
+    """
+    A message pushed to every active user with a verified address for its channel (e.g. a new harvest or
+    price drops). Recipients are sent to in ascending id order and `last_user_id` records the progress,
+    so a paused or interrupted campaign resumes where it stopped. Run by apps.notification.tasks.run_campaign.
+    """
+
+    class ChannelChoices(models.TextChoices):
+        EMAIL = 'email', _('Email')
+        SMS = 'sms', _('SMS')
+
+    class StatusChoices(models.TextChoices):
+        DRAFT = 'draft', _('Draft')
+        RUNNING = 'running', _('Running')
+        PAUSED = 'paused', _('Paused')
+        COMPLETED = 'completed', _('Completed')
+
+    name = models.CharField(
+        max_length=255,
+        verbose_name=_("Name")
+    )
+    channel = models.CharField(
+        max_length=10,
+        choices=ChannelChoices.choices,
+        verbose_name=_("Channel")
+    )
+    subject = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name=_("Subject"),
+        help_text=_("The email subject. Not used for SMS.")
+    )
+    message = models.TextField(
+        verbose_name=_("Message"),
+        help_text=_("The text of the SMS, or the body of the email.")
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=StatusChoices.choices,
+        default=StatusChoices.DRAFT,
+        verbose_name=_("Status")
+    )
+    last_user_id = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name=_("Last User ID"),
+        help_text=_("The id of the last user the campaign was sent to; sending resumes after it.")
+    )
+    sent_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Sent")
+    )
+    failed_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Failed")
+    )
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Started At")
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Finished At")
+    )
+
+    class Meta:
+        verbose_name = _("Campaign")
+        verbose_name_plural = _("Campaigns")
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.name
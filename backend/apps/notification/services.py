@@ -1,50 +1,309 @@
-from typing import Any, Dict
+import time
+import random
+import logging
+import threading
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from django.conf import settings
+from django.core.cache import cache
+from django.dispatch import Signal
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone, translation
+from django.contrib.auth import get_user_model
 from django.utils.module_loading import import_string
 
+from apps.common import metrics
+from apps.notification.models import Campaign, OutboxMessage
 from apps.notification.exceptions import NotificationError
+from apps.notification.channels.base import BaseNotificationChannel
 
+logger = logging.getLogger(__name__)
+
+# Sent (with `message`) once an outbox message was handed to its provider.
+outbox_message_sent = Signal()
+# Sent (with `message`, `error` and `final`) when a delivery attempt failed; `final` when it will not be retried.
+outbox_message_failed = Signal()
+
+# Channel name -> the NOTIFICATIONS_SETTINGS keys of its active provider and of its providers.
+CHANNEL_SETTINGS: Dict[str, Tuple[str, str]] = {
+    'email': ('ACTIVE_EMAIL_PROVIDER', 'EMAIL_PROVIDERS'),
+    'sms': ('ACTIVE_SMS_PROVIDER', 'SMS_PROVIDERS'),
+    'telegram': ('ACTIVE_TELEGRAM_PROVIDER', 'TELEGRAM_PROVIDERS'),
+}
 
-class NotificationService:
-    def __init__(self) -> None:
-        self.channels: Dict[str, Any] = self._load_channels()
 
-    def _load_channels(self) -> Dict[str, Any]:
-        loaded_channels: Dict[str, Any] = {}
+class ChannelRegistry:
+    """
+    The process's channel instances, created from NOTIFICATIONS_SETTINGS on first use and shared by every
+    NotificationService, so provider clients and their HTTP connections are reused across messages.
+    A channel that is not configured only fails when something is sent through it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels: Dict[str, Tuple[str, BaseNotificationChannel]] = {}
+
+    def get(self, channel: str) -> Tuple[str, BaseNotificationChannel]:
+        """The active provider key and channel instance for `channel` ('email', 'sms' or 'telegram')."""
         try:
-            # Load active Email channel
-            email_provider_key: str = settings.NOTIFICATIONS_SETTINGS['ACTIVE_EMAIL_PROVIDER']
-            email_config: Dict[str, Any] = settings.NOTIFICATIONS_SETTINGS['EMAIL_PROVIDERS'][email_provider_key]
-            loaded_channels['email'] = self._initialize_channel(email_config)
-
-            # Load active SMS channel
-            sms_provider_key: str = settings.NOTIFICATIONS_SETTINGS['ACTIVE_SMS_PROVIDER']
-            sms_config: Dict[str, Any] = settings.NOTIFICATIONS_SETTINGS['SMS_PROVIDERS'][sms_provider_key]
-            loaded_channels['sms'] = self._initialize_channel(sms_config)
-
-            # Load active Telegram channel
-            telegram_provider_key: str = settings.NOTIFICATIONS_SETTINGS['ACTIVE_TELEGRAM_PROVIDER']
-            telegram_config: Dict[str, Any] = settings.NOTIFICATIONS_SETTINGS['TELEGRAM_PROVIDERS'][telegram_provider_key]
-            loaded_channels['telegram'] = self._initialize_channel(telegram_config)
-
-        except (KeyError, AttributeError) as e:
-            raise NotificationError(f"Notification settings are misconfigured. Error: {e}") from e
+            return self._channels[channel]
+        except KeyError:
+            pass
+        with self._lock:
+            if channel not in self._channels:
+                self._channels[channel] = self._load_channel(channel)
+            return self._channels[channel]
 
-        return loaded_channels
+    def reset(self) -> None:
+        """Closes and forgets the channels, e.g. after NOTIFICATIONS_SETTINGS changed or in a forked worker."""
+        with self._lock:
+            channels, self._channels = self._channels, {}
+        for _, instance in channels.values():
+            instance.close()
 
     @staticmethod
-    def _initialize_channel(provider_config: Dict[str, Any]) -> Any:
-        channel_class_path: str = provider_config['CHANNEL_CLASS']
-        config_dict: Dict[str, Any] = provider_config.get('CONFIG', {})
-        ChannelClass: Any = import_string(channel_class_path)
-        return ChannelClass(**config_dict)
+    def _load_channel(channel: str) -> Tuple[str, BaseNotificationChannel]:
+        try:
+            active_key, providers_key = CHANNEL_SETTINGS[channel]
+            provider_key: str = settings.NOTIFICATIONS_SETTINGS[active_key]
+            provider_config: Dict[str, Any] = settings.NOTIFICATIONS_SETTINGS[providers_key][provider_key]
+            ChannelClass: Any = import_string(provider_config['CHANNEL_CLASS'])
+        except (KeyError, AttributeError, ImportError) as e:
+            raise NotificationError(f"Notification settings are misconfigured. Error: {e}") from e
+        return provider_key, ChannelClass(**provider_config.get('CONFIG', {}))
+
+
+registry = ChannelRegistry()
+
+
+class NotificationService:
+    """Sends notifications through the active provider of each channel. Cheap to create: channels come from the registry."""
+
+    def _send(self, channel: str, recipient: str, **kwargs: Any) -> None:
+        provider, instance = registry.get(channel)
+        try:
+            instance.send(recipient, **kwargs)
+        except NotificationError:
+            metrics.notification_failures_total.labels(channel=channel, provider=provider).inc()
+            raise
 
     def send_email(self, recipient: str, **kwargs: Any) -> None:
-        self.channels['email'].send(recipient, **kwargs)
+        self._send('email', recipient, **kwargs)
 
     def send_sms(self, recipient: str, **kwargs: Any) -> None:
-        self.channels['sms'].send(recipient, **kwargs)
+        self._send('sms', recipient, **kwargs)
 
     def send_telegram(self, recipient: str, **kwargs: Any) -> None:
-        self.channels['telegram'].send(recipient, **kwargs)
+        self._send('telegram', recipient, **kwargs)
+
+
+class OutboxService:
+    """Writes notifications to the outbox and delivers claimed batches of them."""
+
+    @staticmethod
+    def enqueue(channel: str, recipient: str, *, user=None, kind: str = '', object_id: Optional[int] = None,
+                expires_at=None, queue: str = 'bulk', **payload: Any) -> OutboxMessage:
+        """
+        Stores a notification to be sent once the current transaction commits; call it inside the transaction
+        that makes the triggering change. `payload` holds the arguments of the channel's send() and must be
+        JSON serializable. A worker on `queue` is woken up on commit, so the message is normally sent right away.
+        """
+        message = OutboxMessage.objects.create(
+            user=user,
+            channel=channel,
+            recipient=recipient,
+            payload=payload,
+            language=translation.get_language() or '',
+            kind=kind,
+            object_id=object_id,
+            expires_at=expires_at,
+        )
+        transaction.on_commit(lambda: OutboxService._wake_worker(message.pk, queue))
+        return message
+
+    @staticmethod
+    def _wake_worker(message_id: int, queue: str) -> None:
+        from apps.notification.tasks import deliver_outbox
+        try:
+            deliver_outbox.apply_async(kwargs={'ids': [message_id]}, queue=queue)
+        except Exception as e:
+            # The message is safe in the outbox; the periodic sweep sends it.
+            logger.warning(f"Could not wake an outbox worker for message {message_id}, leaving it to the next sweep: {e}")
+
+    def deliver(self, messages: List[OutboxMessage]) -> None:
+        """
+        Sends claimed messages, at most CHANNEL_CONCURRENCY[channel] at once per channel, and records the outcomes.
+        Failed messages are retried with exponential backoff and dead-lettered after MAX_ATTEMPTS attempts.
+        """
+        config = settings.NOTIFICATION_OUTBOX_SETTINGS
+        users = get_user_model().objects.in_bulk({message.user_id for message in messages if message.user_id})
+        for message in messages:
+            if message.user_id:
+                message.user = users.get(message.user_id)
+
+        expired = [message for message in messages if message.is_expired]
+        executors: Dict[str, ThreadPoolExecutor] = {}
+        futures = {}
+        try:
+            for message in messages:
+                if message in expired:
+                    continue
+                if message.channel not in executors:
+                    executors[message.channel] = ThreadPoolExecutor(
+                        max_workers=config['CHANNEL_CONCURRENCY'].get(message.channel, 1),
+                        thread_name_prefix=f'outbox-{message.channel}',
+                    )
+                futures[message] = executors[message.channel].submit(self._send, message)
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=True)
+
+        now = timezone.now()
+        sent = [message for message, future in futures.items() if future.exception() is None]
+        # The payload (OTP codes, reset links) is not kept once it has been delivered.
+        OutboxMessage.objects.filter(pk__in=[message.pk for message in sent]).update(
+            status=OutboxMessage.StatusChoices.SENT, sent_at=now, last_error='', payload={}, updated_at=now,
+        )
+        for message in sent:
+            message.status, message.sent_at = OutboxMessage.StatusChoices.SENT, now
+            metrics.notification_outbox_messages_total.labels(channel=message.channel, outcome='sent').inc()
+            metrics.notification_outbox_delay_seconds.labels(channel=message.channel).observe((now - message.created_at).total_seconds())
+            outbox_message_sent.send(sender=OutboxMessage, message=message)
+
+        for message, future in futures.items():
+            if future.exception() is not None:
+                self._record_failure(message, future.exception(), now)
+        for message in expired:
+            self._record_failure(message, NotificationError("Expired before it could be sent."), now)
+
+    @staticmethod
+    def _send(message: OutboxMessage) -> None:
+        payload = dict(message.payload)
+        if message.channel == OutboxMessage.ChannelChoices.EMAIL and message.user is not None:
+            # Templates may greet the user, who cannot be stored in the JSON payload.
+            payload['context'] = {**payload.get('context', {}), 'user': message.user}
+        with translation.override(message.language or None):
+            getattr(NotificationService(), f'send_{message.channel}')(message.recipient, **payload)
+
+    @staticmethod
+    def _record_failure(message: OutboxMessage, error: Exception, now) -> None:
+        config = settings.NOTIFICATION_OUTBOX_SETTINGS
+        backoff = min(config['RETRY_BACKOFF'] * 2 ** (message.attempts - 1), config['RETRY_BACKOFF_MAX'])
+        message.available_at = now + timedelta(seconds=random.uniform(backoff / 2, backoff))
+        message.last_error = str(error)[:255]
+
+        update_fields = ['status', 'available_at', 'last_error', 'updated_at']
+        if message.expires_at is not None and message.available_at >= message.expires_at:
+            message.status = OutboxMessage.StatusChoices.EXPIRED
+            # Its content is no longer valid; only dead-lettered messages keep theirs, to be requeued.
+            message.payload = {}
+            update_fields.append('payload')
+        elif message.attempts >= config['MAX_ATTEMPTS']:
+            message.status = OutboxMessage.StatusChoices.DEAD
+        message.save(update_fields=update_fields)
+
+        final = message.status != OutboxMessage.StatusChoices.PENDING
+        if message.status == OutboxMessage.StatusChoices.DEAD:
+            logger.error(f"Dead-lettered outbox message {message.pk} after {message.attempts} attempts: {error}")
+        elif not final:
+            logger.warning(f"Outbox message {message.pk} failed (attempt {message.attempts}), retrying at {message.available_at}: {error}")
+        outcome = message.status if final else 'retried'
+        metrics.notification_outbox_messages_total.labels(channel=message.channel, outcome=outcome).inc()
+        outbox_message_failed.send(sender=OutboxMessage, message=message, error=error, final=final)
+
+
+class CampaignService:
+    """Sends a campaign to its audience in chunks, through the channel's bulk API and rate limit."""
+
+    # The user field holding each channel's address, and the flag saying it was verified.
+    AUDIENCE_FIELDS = {
+        Campaign.ChannelChoices.EMAIL: ('email', 'is_email_verified'),
+        Campaign.ChannelChoices.SMS: ('phone_number', 'is_phone_number_verified'),
+    }
+
+    LOCK_KEY = 'notification:campaign:{campaign_id}:sending'
+
+    def __init__(self, campaign: Campaign):
+        self.campaign = campaign
+
+    def audience(self):
+        """Active users with a verified address for the campaign's channel."""
+        address_field, verified_field = self.AUDIENCE_FIELDS[self.campaign.channel]
+        return get_user_model().objects.filter(is_active=True, **{verified_field: True}).exclude(**{f'{address_field}__isnull': True})
+
+    def payload(self) -> Dict[str, Any]:
+        if self.campaign.channel == Campaign.ChannelChoices.EMAIL:
+            return {
+                'subject': self.campaign.subject,
+                'message': self.campaign.message,
+                'template_name': 'notifications/email/campaign.html',
+                'context': {'subject': self.campaign.subject, 'message': self.campaign.message, 'site_name': settings.SITE_NAME},
+            }
+        return {'message': self.campaign.message}
+
+    def start(self) -> None:
+        """Marks the campaign as running (again, after a pause); run() then sends it."""
+        Campaign.objects.filter(pk=self.campaign.pk).exclude(status=Campaign.StatusChoices.COMPLETED).update(
+            status=Campaign.StatusChoices.RUNNING, started_at=self.campaign.started_at or timezone.now(),
+        )
+
+    def run(self, chunk_size: int = None, on_chunk: Callable[[int, int, float], None] = None) -> Campaign:
+        """
+        Sends a running campaign from where it stopped until it is done or paused (checked between chunks),
+        saving the progress after each chunk. A chunk interrupted by a crash is sent again on resume.
+        `on_chunk(sent, failed, seconds)` is called after each chunk, e.g. to report throughput.
+        """
+        campaign = self.campaign
+        config = settings.NOTIFICATION_CAMPAIGN_SETTINGS
+        chunk_size = chunk_size or config['CHUNK_SIZE']
+        address_field, _ = self.AUDIENCE_FIELDS[campaign.channel]
+
+        # One sender per campaign; the lock expires by itself if its holder dies.
+        lock_key = self.LOCK_KEY.format(campaign_id=campaign.pk)
+        if not cache.add(lock_key, 1, timeout=config['LOCK_TIMEOUT']):
+            logger.info(f"Campaign {campaign.pk} is already being sent by another worker.")
+            return campaign
+        try:
+            provider, channel = registry.get(campaign.channel)
+            payload = self.payload()
+            while True:
+                campaign.refresh_from_db()
+                if campaign.status != Campaign.StatusChoices.RUNNING:
+                    logger.info(f"Campaign {campaign.pk} stopped after user {campaign.last_user_id}: {campaign.status}.")
+                    return campaign
+
+                # Keyset pagination: every chunk is an index range scan, however far the campaign has got.
+                chunk = list(
+                    self.audience().filter(pk__gt=campaign.last_user_id).order_by('pk').values_list('pk', address_field)[:chunk_size]
+                )
+                if not chunk:
+                    Campaign.objects.filter(pk=campaign.pk).update(status=Campaign.StatusChoices.COMPLETED, finished_at=timezone.now())
+                    campaign.refresh_from_db()
+                    logger.info(f"Campaign {campaign.pk} completed: {campaign.sent_count} sent, {campaign.failed_count} failed.")
+                    return campaign
+
+                started = time.perf_counter()
+                recipients = [str(address) for _, address in chunk]
+                try:
+                    failures = channel.send_many(recipients, **payload)
+                except NotificationError as e:
+                    failures = dict.fromkeys(recipients, str(e))
+                elapsed = time.perf_counter() - started
+
+                sent, failed = len(recipients) - len(failures), len(failures)
+                if failures:
+                    logger.warning(f"Campaign {campaign.pk}: {failed} of {len(recipients)} messages failed, e.g. {next(iter(failures.values()))}")
+                Campaign.objects.filter(pk=campaign.pk).update(
+                    last_user_id=chunk[-1][0], sent_count=F('sent_count') + sent, failed_count=F('failed_count') + failed,
+                )
+                cache.touch(lock_key, config['LOCK_TIMEOUT'])
+                metrics.notification_campaign_messages_total.labels(channel=campaign.channel, outcome='sent').inc(sent)
+                metrics.notification_campaign_messages_total.labels(channel=campaign.channel, outcome='failed').inc(failed)
+                metrics.notification_failures_total.labels(channel=campaign.channel, provider=provider).inc(failed)
+                if on_chunk is not None:
+                    on_chunk(sent, failed, elapsed)
+        finally:
+            cache.delete(lock_key)
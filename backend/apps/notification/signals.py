@@ -0,0 +1,11 @@
+from django.dispatch import receiver
+from django.core.signals import setting_changed
+
+from apps.notification.services import registry
+
+
+@receiver(setting_changed)
+def reset_channel_registry(setting=None, **kwargs):
+    """Recreates the channels from the new settings when NOTIFICATIONS_SETTINGS is overridden (e.g. in tests)."""
+    if setting == 'NOTIFICATIONS_SETTINGS':
+        registry.reset()
@@ -0,0 +1,45 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from celery import shared_task
+
+from apps.notification.models import Campaign, OutboxMessage
+from apps.notification.services import CampaignService, OutboxService
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def deliver_outbox(ids: list[int] = None) -> None:
+    """
+    Claims a batch of due outbox messages (or the messages `ids`, when woken up for them) and sends them.
+    Runs on the `bulk` queue every SWEEP_INTERVAL seconds and on commit of new messages. When the batch is
+    full it queues itself again before sending, so other workers take the next batches in parallel.
+    """
+    config = settings.NOTIFICATION_OUTBOX_SETTINGS
+    messages = OutboxMessage.objects.claim(config['BATCH_SIZE'], config['LEASE_SECONDS'], ids=ids)
+    if ids is None and len(messages) == config['BATCH_SIZE']:
+        deliver_outbox.delay()
+    if messages:
+        OutboxService().deliver(messages)
+
+
+@shared_task(ignore_result=True)
+def purge_outbox() -> None:
+    """Deletes sent, expired and dead-lettered outbox messages older than RETENTION_DAYS. Runs daily."""
+    config = settings.NOTIFICATION_OUTBOX_SETTINGS
+    older_than = timezone.now() - timedelta(days=config['RETENTION_DAYS'])
+    deleted = OutboxMessage.objects.purge(older_than, batch_size=config['PURGE_BATCH_SIZE'], pause=config['PURGE_BATCH_PAUSE'])
+    logger.info(f"Deleted {deleted} finished outbox message(s) created before {older_than:%Y-%m-%d}.")
+
+
+@shared_task(ignore_result=True, acks_late=True)
+def run_campaign(campaign_id: int) -> None:
+    """Sends a campaign, or resumes it, until it is completed or paused. Runs on the `bulk` queue."""
+    campaign = Campaign.objects.filter(pk=campaign_id).first()
+    if campaign is None or campaign.status == Campaign.StatusChoices.COMPLETED:
+        return
+    CampaignService(campaign).run()
@@ -0,0 +1,172 @@
+import hashlib
+from typing import Any, Callable, Iterable, Optional
+
+from django.conf import settings
+
+from apps.common.cache import get_or_fill, get_tag_versions, aget_fresh, aget_tag_versions
+from apps.media.models import MediaLink
+from apps.products.models import (
+    Product, ProductVariant, Price, Inventory, Brand, Category, Tag, Attribute, AttributeValue,
+    ProductCollection, ProductCollectionEntry,
+)
+
+# --- Cache keys ---
+PRODUCT_DETAIL_KEY = 'catalog:product:{version}:{slug}'
+PRODUCT_LIST_KEY = 'catalog:products:{version}:{params}'
+CATEGORY_TREE_KEY = 'catalog:categories:{version}'
+COLLECTION_DETAIL_KEY = 'catalog:collection:{version}:{slug}'
+FACETS_KEY = 'catalog:facets'
+
+# --- Dependency tags ---
+PRODUCT_LIST_TAG = 'product-list'
+CATEGORY_TREE_TAG = 'category-tree'
+FACETS_TAG = 'facets'
+# Bumped by every catalog change; for responses whose exact dependencies are unknown until they are built.
+CATALOG_TAG = 'catalog'
+
+
+def product_tag(product_id) -> str:
+    return f'product:{product_id}'
+
+
+def collection_tag(slug: str) -> str:
+    return f'collection:{slug}'
+
+
+def _get_or_fill(name: str, key: str, fill: Callable[[], Any], tags=()) -> Any:
+    """Reads one of the catalog caches, with the TTLs configured in CATALOG_CACHE_SETTINGS[name]."""
+    config = settings.CATALOG_CACHE_SETTINGS
+    return get_or_fill(
+        key,
+        fill,
+        soft_ttl=config[name]['SOFT_TTL'],
+        hard_ttl=config[name]['HARD_TTL'],
+        lock_ttl=config['LOCK_TTL'],
+        wait=config['LOCK_WAIT'],
+        tags=tags,
+    )
+
+
+def get_product_detail(request, slug: str, fill: Callable[[], Any]) -> Any:
+    """The serialized product detail page."""
+    key = PRODUCT_DETAIL_KEY.format(version=request.version, slug=slug)
+    return _get_or_fill('PRODUCT_DETAIL', key, fill, tags=product_detail_tags)
+
+
+async def aget_product_detail(version: str, slug: str) -> Any:
+    """The cached product detail page if it is fresh, else None."""
+    return await aget_fresh(PRODUCT_DETAIL_KEY.format(version=version, slug=slug))
+
+
+def product_detail_tags(data: dict) -> list[str]:
+    return [product_tag(data['product_id'])]
+
+
+def _product_list_key(version: str, host: str, query_params) -> str:
+    # Absolute image URLs depend on the host, so it is part of the key along with the normalized query string.
+    params = sorted((key, sorted(values)) for key, values in query_params.lists())
+    digest = hashlib.md5(f'{host}|{params}'.encode()).hexdigest()
+    return PRODUCT_LIST_KEY.format(version=version, params=digest)
+
+
+def get_product_list(request, fill: Callable[[], Any]) -> Any:
+    """The serialized product listing for the request's filters and ordering."""
+    key = _product_list_key(request.version, request.get_host(), request.query_params)
+    # Changes to listed products invalidate the listing; which products match the filters is refreshed
+    # when any product is saved (PRODUCT_LIST_TAG), otherwise within the configured TTLs.
+    return _get_or_fill('PRODUCT_LIST', key, fill, tags=product_list_tags)
+
+
+async def aget_product_list(version: str, host: str, query_params) -> Any:
+    """The cached product listing if it is fresh, else None."""
+    return await aget_fresh(_product_list_key(version, host, query_params))
+
+
+def product_list_tags(data: list) -> list[str]:
+    return [PRODUCT_LIST_TAG, *(product_tag(item['id']) for item in data)]
+
+
+def get_category_tree(request, fill: Callable[[], Any]) -> Any:
+    """The serialized list of active categories."""
+    return _get_or_fill('CATEGORY_TREE', CATEGORY_TREE_KEY.format(version=request.version), fill, tags=[CATEGORY_TREE_TAG])
+
+
+async def aget_category_tree(version: str) -> Any:
+    """The cached list of active categories if it is fresh, else None."""
+    return await aget_fresh(CATEGORY_TREE_KEY.format(version=version))
+
+
+def get_collection_detail(request, slug: str, fill: Callable[[], Any]) -> Any:
+    """The serialized collection page, with its products."""
+    key = COLLECTION_DETAIL_KEY.format(version=request.version, slug=slug)
+    return _get_or_fill('COLLECTION_DETAIL', key, fill, tags=collection_detail_tags)
+
+
+async def aget_collection_detail(version: str, slug: str) -> Any:
+    """The cached collection page if it is fresh, else None."""
+    return await aget_fresh(COLLECTION_DETAIL_KEY.format(version=version, slug=slug))
+
+
+def collection_detail_tags(data: dict) -> list[str]:
+    return [collection_tag(data['slug']), *(product_tag(item['id']) for item in data['products'])]
+
+
+def get_facets(fill: Callable[[], Any]) -> Any:
+    """The filterable attributes offered as product list filters, as (slug, name) pairs."""
+    return _get_or_fill('FACETS', FACETS_KEY, fill, tags=[FACETS_TAG])
+
+
+def version_of(*tags: str) -> Optional[str]:
+    """
+    A string that changes whenever any of `tags` is invalidated, or None if the versions cannot be read.
+    Used as the ETag source of cached catalog responses, so revalidation never builds the payload.
+    """
+    versions = get_tag_versions(tags)
+    return None if versions is None else '.'.join(map(str, versions))
+
+
+async def aversion_of(*tags: str) -> Optional[str]:
+    """version_of() for the async views."""
+    versions = await aget_tag_versions(tags)
+    return None if versions is None else '.'.join(map(str, versions))
+
+
+# --- Model dependencies ---
+# Which tags a saved or deleted instance invalidates. Used by apps.products.signals.
+
+def _products_of(queryset) -> list[str]:
+    return [product_tag(product_id) for product_id in queryset.values_list('id', flat=True)]
+
+
+def _variant_product(variant_id) -> list[str]:
+    product_id = ProductVariant.objects.filter(pk=variant_id).values_list('product_id', flat=True).first()
+    # None when the whole product is being deleted; the product's own signal covers that case.
+    return [product_tag(product_id)] if product_id else []
+
+
+def _media_link(link: MediaLink) -> list[str]:
+    if link.content_type.model_class() is Product:
+        return [product_tag(link.object_id)]
+    return []
+
+
+MODEL_DEPENDENCIES: dict[type, Callable[[Any], Iterable[str]]] = {
+    Product: lambda product: [product_tag(product.pk), PRODUCT_LIST_TAG],
+    ProductVariant: lambda variant: [product_tag(variant.product_id)],
+    Price: lambda price: _variant_product(price.variant_id),
+    Inventory: lambda inventory: _variant_product(inventory.variant_id),
+    MediaLink: _media_link,
+    Brand: lambda brand: [PRODUCT_LIST_TAG, *_products_of(brand.products)],
+    Category: lambda category: [CATEGORY_TREE_TAG, PRODUCT_LIST_TAG, *_products_of(category.products)],
+    Tag: lambda tag: _products_of(tag.products),
+    Attribute: lambda attribute: [FACETS_TAG],
+    AttributeValue: lambda value: _products_of(Product.objects.filter(variants__attributes=value).distinct()),
+    ProductCollection: lambda collection: [collection_tag(collection.slug)],
+    ProductCollectionEntry: lambda entry: [collection_tag(entry.collection.slug)],
+}
+
+
+def tags_for(instance) -> list[str]:
+    """The cache tags depending on `instance`, or an empty list for models the catalog caches ignore."""
+    dependencies = MODEL_DEPENDENCIES.get(type(instance))
+    return [*dependencies(instance), CATALOG_TAG] if dependencies else []
@@ -2,7 +2,8 @@ from django.db.models import Q
 
 import django_filters
 
-from apps.products.models import Product, Attribute, Category
+from apps.products import reference, cache as catalog_cache
+from apps.products.models import Product, Attribute
 
 
 class ProductFilter(django_filters.FilterSet):
@@ -57,15 +58,17 @@ class ProductFilter(django_filters.FilterSet):
         This is the core of the dynamic filtering system.
         """
         super().__init__(*args, **kwargs)
-        # Fetch all attributes marked as filterable from the database
-        filterable_attributes = Attribute.objects.filter(is_filterable=True, is_active=True)
+        # Fetch all attributes marked as filterable, through the facets cache
+        filterable_attributes = catalog_cache.get_facets(
+            lambda: list(Attribute.objects.filter(is_filterable=True, is_active=True).values_list('slug', 'name'))
+        )
 
-        for attr in filterable_attributes:
+        for slug, name in filterable_attributes:
             # For each attribute, create a new filter field.
             # The field name will be the attribute's slug (e.g., 'color', 'size').
-            self.filters[attr.slug] = django_filters.CharFilter(
+            self.filters[slug] = django_filters.CharFilter(
                 method='filter_by_dynamic_attribute',
-                label=attr.name  # The label shown in the UI
+                label=name  # The label shown in the UI
             )
 
     # --- Custom Filter Methods ---
@@ -82,13 +85,12 @@ class ProductFilter(django_filters.FilterSet):
     @staticmethod
     def filter_by_category(queryset, name, value):
         """Filter by a category slug and all of its descendants."""
-        try:
-            # Get the category and all its children using django-mptt's get_descendants
-            category = Category.objects.get(slug=value)
-            categories = category.get_descendants(include_self=True)
-            return queryset.filter(categories__in=categories)
-        except Category.DoesNotExist:
+        # Get the category from the reference cache and all its children using django-mptt's get_descendants
+        category = reference.categories.get(slug=value)
+        if category is None:
             return queryset.none()
+        categories = category.get_descendants(include_self=True)
+        return queryset.filter(categories__in=categories)
 
     @staticmethod
     def filter_on_sale(queryset, name, value):
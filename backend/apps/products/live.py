@@ -0,0 +1,171 @@
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from django.conf import settings
+from django.db import connections
+
+import redis.asyncio as aioredis
+
+from apps.common.cache import get_redis_client, get_redis_url
+from apps.common.renderers import ORJSONRenderer
+from apps.products import reference
+from apps.products.models import Product, Price, Inventory, ProductVariant
+
+logger = logging.getLogger(__name__)
+
+_renderer = ORJSONRenderer()
+
+
+# --- Publishing (sync, from model signals) ---
+
+def stock_event(inventory: Inventory) -> dict:
+    return {
+        'variant_id': inventory.variant_id,
+        'available_quantity': inventory.available_quantity,
+        'is_in_stock': inventory.is_in_stock,
+        'is_low_stock': inventory.is_low_stock,
+    }
+
+
+def price_event(price: Price) -> dict:
+    currency = reference.currencies.get(pk=price.currency_id) or price.currency
+    return {
+        'variant_id': price.variant_id,
+        'currency_code': currency.code,
+        'base_price': price.base_price,
+        'final_price': price.current_price,
+        'is_on_sale': price.is_on_sale,
+        'discount_amount': price.saved_amount,
+    }
+
+
+def publish(product_id: int, event: str, data: dict) -> None:
+    """
+    Publishes one update for the product's live streams. Messages are `<product id>|<event>|<json>`,
+    so subscribers route them without decoding the payload.
+    """
+    client = get_redis_client()
+    if client is None:
+        return
+    message = f'{product_id}|{event}|'.encode() + _renderer.render(data)
+    try:
+        client.publish(settings.LIVE_UPDATES_SETTINGS['CHANNEL'], message)
+    except Exception as e:
+        logger.warning(f"Could not publish a live {event} update for product {product_id}: {e}")
+
+
+def publish_change(instance) -> None:
+    """Publishes a saved Inventory or Price record. Called once the transaction has committed."""
+    if get_redis_client() is None:
+        return
+    product_id = ProductVariant.objects.filter(pk=instance.variant_id).values_list('product_id', flat=True).first()
+    if product_id is None:
+        return
+    if isinstance(instance, Inventory):
+        publish(product_id, 'stock', stock_event(instance))
+    else:
+        publish(product_id, 'price', price_event(instance))
+
+
+# --- Subscribing (async, in the SSE view) ---
+
+def get_published_product_id(slug: str) -> Optional[int]:
+    try:
+        return Product.objects.published().filter(slug=slug).values_list('id', flat=True).first()
+    finally:
+        # Runs in a shared thread pool rather than a thread per stream, so it must not keep the connection.
+        connections.close_all()
+
+
+def snapshot(product_id: int) -> bytes:
+    """The current stock and prices of the product's active variants, sent when a stream opens."""
+    try:
+        variants = ProductVariant.objects.active().filter(
+            product_id=product_id
+        ).select_related('inventory').prefetch_related('prices')
+        data = {
+            'product_id': product_id,
+            'stock': [stock_event(variant.inventory) for variant in variants if hasattr(variant, 'inventory')],
+            'prices': [price_event(price) for variant in variants for price in variant.prices.all()],
+        }
+        return _renderer.render(data)
+    finally:
+        connections.close_all()
+
+
+def format_event(event: str, data: bytes) -> bytes:
+    """One Server-Sent Events frame."""
+    return b'event: ' + event.encode() + b'\ndata: ' + data + b'\n\n'
+
+
+class LiveUpdateHub:
+    """
+    Fans the single Redis subscription of this process out to the open streams of individual products.
+    An idle stream costs one queue and its socket, not a Redis connection or a thread, which is what
+    lets one ASGI worker hold tens of thousands of them.
+    """
+
+    def __init__(self):
+        self._subscribers: dict[int, set[asyncio.Queue]] = defaultdict(set)
+        self._listener: Optional[asyncio.Task] = None
+
+    @asynccontextmanager
+    async def subscribe(self, product_id: int):
+        """Yields a queue receiving the ready-to-send SSE frames for the product."""
+        self._ensure_listener()
+        queue = asyncio.Queue(maxsize=settings.LIVE_UPDATES_SETTINGS['QUEUE_SIZE'])
+        self._subscribers[product_id].add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(product_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[product_id]
+
+    def _ensure_listener(self) -> None:
+        url = get_redis_url()
+        if url is None:
+            # Without Redis (e.g. the locmem cache in development) streams only get their snapshot and heartbeats.
+            return
+        loop = asyncio.get_running_loop()
+        if self._listener is None or self._listener.done() or self._listener.get_loop() is not loop:
+            self._listener = loop.create_task(self._listen(url))
+
+    async def _listen(self, url: str) -> None:
+        channel = settings.LIVE_UPDATES_SETTINGS['CHANNEL']
+        while True:
+            client = aioredis.from_url(url)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(channel)
+                    async for message in pubsub.listen():
+                        if message['type'] == 'message':
+                            self._dispatch(message['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Live update subscription to {channel} lost, reconnecting: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await client.aclose()
+
+    def _dispatch(self, message: bytes) -> None:
+        product_id, event, data = message.split(b'|', 2)
+        subscribers = self._subscribers.get(int(product_id))
+        if not subscribers:
+            return
+        # Encoded once, shared by every stream of the product.
+        frame = format_event(event.decode(), data)
+        for queue in subscribers:
+            if queue.full():
+                # A slow client loses its oldest update rather than holding memory for everyone.
+                queue.get_nowait()
+            queue.put_nowait(frame)
+
+
+hub = LiveUpdateHub()
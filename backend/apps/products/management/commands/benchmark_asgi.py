@@ -0,0 +1,83 @@
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+import requests
+
+from apps.products.management.commands.benchmark_edge_cache import Command as EdgeCacheBenchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Replays the same anonymous catalog traffic mix against the sync (gunicorn) and the ASGI deployments '
+        'at increasing concurrency, and compares throughput and tail latency. Targets are called directly, '
+        'bypassing the nginx micro-cache, e.g. `docker-compose -f docker-compose.yml -f docker-compose.dev.yml '
+        'exec backend python manage.py benchmark_asgi`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sync-url', default='http://backend:8000', help='The sync gunicorn deployment.')
+        parser.add_argument('--asgi-url', default='http://backend-asgi:8001', help='The ASGI deployment.')
+        parser.add_argument('--host', default='localhost', help='Host header to send (must be in ALLOWED_HOSTS).')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per target and concurrency level.')
+        parser.add_argument(
+            '--concurrency', type=int, nargs='+', default=[8, 32, 128],
+            help='Concurrency levels; above the number of sync workers, their requests queue.',
+        )
+        parser.add_argument('--warmup', type=int, default=200, help='Unmeasured requests sent first, to fill the caches.')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        paths = EdgeCacheBenchmark._traffic_mix(random.Random(options['seed']), options['requests'])
+        if not paths:
+            raise CommandError('No published products found. Run `seed_data` first.')
+
+        targets = [('sync', options['sync_url']), ('asgi', options['asgi_url'])]
+        for _, base_url in targets:
+            self._run(base_url, paths[:options['warmup']], 8, options['host'], options['timeout'])
+
+        self.stdout.write(f"{'target':<6} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}  errors")
+        for concurrency in options['concurrency']:
+            for name, base_url in targets:
+                elapsed, latencies, errors = self._run(base_url, paths, concurrency, options['host'], options['timeout'])
+                latencies.sort()
+
+                def percentile(p):
+                    return latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000 if latencies else 0
+
+                self.stdout.write(
+                    f"{name:<6} {concurrency:>5} {len(paths) / elapsed:>8.0f} {percentile(0.5):>8.1f} "
+                    f"{percentile(0.95):>8.1f} {percentile(0.99):>8.1f} {percentile(1):>8.1f}  "
+                    f"{', '.join(f'{error}: {count}' for error, count in errors.most_common()) or '-'}"
+                )
+
+    @staticmethod
+    def _run(base_url: str, paths: list[str], concurrency: int, host: str, timeout: float) -> tuple[float, list[float], Counter]:
+        """Sends `paths` with `concurrency` clients; returns the elapsed time, the latencies of successful requests and the errors."""
+        local = threading.local()
+        errors = Counter()
+
+        def fetch(path):
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+                local.session.headers['Host'] = host
+            started = time.perf_counter()
+            try:
+                response = local.session.get(base_url + path, timeout=timeout)
+            except requests.RequestException as e:
+                errors[type(e).__name__] += 1
+                return None
+            if response.status_code != 200:
+                errors[f'HTTP {response.status_code}'] += 1
+                return None
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = [seconds for seconds in executor.map(fetch, paths) if seconds is not None]
+        return time.perf_counter() - started, latencies, errors
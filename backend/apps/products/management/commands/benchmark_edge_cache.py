@@ -0,0 +1,106 @@
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+import requests
+
+from apps.products.models import Product, Category, Brand, Price
+
+# Cache statuses (X-Cache-Status) answered by nginx without calling the backend.
+OFFLOADED = {'HIT', 'STALE', 'UPDATING', 'REVALIDATED'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Replays an anonymous catalog traffic mix against nginx and reports how many requests the micro-cache '
+        'answered without reaching Django. Run it in the compose stack, e.g. '
+        '`docker-compose -f docker-compose.yml -f docker-compose.dev.yml exec backend '
+        'python manage.py benchmark_edge_cache --base-url http://nginx`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://nginx', help='The nginx server in front of the API.')
+        parser.add_argument('--host', default='localhost', help='Host header to send (must be in ALLOWED_HOSTS).')
+        parser.add_argument('--requests', type=int, default=5000, help='Total number of requests.')
+        parser.add_argument('--concurrency', type=int, default=16, help='Number of concurrent clients.')
+        parser.add_argument(
+            '--write-every', type=int, default=500,
+            help='Save a random price every N requests, to exercise the purge path. 0 disables writes.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        paths = self._traffic_mix(rng, options['requests'])
+        if not paths:
+            raise CommandError('No published products found. Run `seed_data` first.')
+
+        statuses, latencies = Counter(), []
+        session = requests.Session()
+        session.headers['Host'] = options['host']
+
+        def fetch(path):
+            started = time.perf_counter()
+            response = session.get(options['base_url'] + path, timeout=10)
+            return response.headers.get('X-Cache-Status', 'NONE'), response.status_code, time.perf_counter() - started
+
+        prices = list(Price.objects.values_list('pk', flat=True))
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            step = options['write_every'] or len(paths)
+            for offset in range(0, len(paths), step):
+                for cache_status, status_code, seconds in executor.map(fetch, paths[offset:offset + step]):
+                    statuses[cache_status if status_code == 200 else f'HTTP {status_code}'] += 1
+                    latencies.append(seconds)
+                if options['write_every'] and prices:
+                    # Goes through the post_save signal, i.e. cache invalidation plus the edge purge task.
+                    Price.objects.get(pk=rng.choice(prices)).save()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        offloaded = sum(count for cache_status, count in statuses.items() if cache_status in OFFLOADED)
+        self.stdout.write(f'{len(paths)} requests in {elapsed:.1f}s ({len(paths) / elapsed:.0f} req/s)')
+        for cache_status, count in statuses.most_common():
+            self.stdout.write(f'  {cache_status:<12} {count:>7}')
+        self.stdout.write(
+            f'  latency p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, '
+            f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms'
+        )
+        if 'NONE' in statuses:
+            self.stdout.write(self.style.WARNING('Some responses had no X-Cache-Status; is --base-url the nginx server?'))
+        self.stdout.write(self.style.SUCCESS(f'Offload ratio: {offloaded / len(paths):.1%} answered by nginx'))
+
+    @staticmethod
+    def _traffic_mix(rng: random.Random, total: int) -> list[str]:
+        """A skewed mix of catalog reads: popular products and listings are requested far more often."""
+        products = list(Product.objects.published().values_list('slug', flat=True)[:500])
+        if not products:
+            return []
+        categories = list(Category.objects.filter(is_active=True).values_list('slug', flat=True)[:50])
+        brands = list(Brand.objects.filter(is_active=True).values_list('slug', flat=True)[:50])
+
+        def listing():
+            params = []
+            if categories and rng.random() < 0.5:
+                params.append(f'category={rng.choice(categories)}')
+            if brands and rng.random() < 0.3:
+                params.append(f'brand={rng.choice(brands)}')
+            if rng.random() < 0.3:
+                params.append(rng.choice(['ordering=-created_at', 'ordering=name', 'on_sale=true']))
+            if rng.random() < 0.2:
+                params.append('utm_source=newsletter')
+            # Clients send parameters in any order; the edge normalizes them into one cache key.
+            rng.shuffle(params)
+            return '/api/v1/products/' + (f'?{"&".join(params)}' if params else '')
+
+        weights = [1 / (rank + 1) for rank in range(len(products))]
+        generators = [
+            (0.55, lambda: f'/api/v1/products/{rng.choices(products, weights)[0]}/'),
+            (0.30, listing),
+            (0.10, lambda: '/api/v1/categories/'),
+            (0.05, lambda: '/api/v1/brands/'),
+        ]
+        return [rng.choices([g for _, g in generators], [w for w, _ in generators])[0]() for _ in range(total)]
@@ -0,0 +1,46 @@
+import json
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.renderers import JSONRenderer
+
+from apps.common.renderers import ORJSONRenderer
+from apps.products.models import Product
+from apps.products.services import ProductService
+from apps.products.views import ProductListView
+from apps.products.serializers import ProductListSerializer, ProductDetailSerializer
+
+
+class Command(BaseCommand):
+    help = "Compares DRF's JSONRenderer with ORJSONRenderer on the product list and product detail payloads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help='Number of renders per renderer and payload.')
+
+    def handle(self, *args, **options):
+        product = Product.objects.published().first()
+        if product is None:
+            raise CommandError('No published products found. Run `seed_data` first.')
+
+        list_queryset = ProductListSerializer.project_queryset(ProductListView().get_queryset())
+        payloads = {
+            'product list': ProductListSerializer(list_queryset, many=True).data,
+            'product detail': ProductDetailSerializer(ProductService(product_slug=product.slug).get_context_for_detail_page()).data,
+        }
+        renderers = {'JSONRenderer': JSONRenderer(), 'ORJSONRenderer': ORJSONRenderer()}
+
+        for name, data in payloads.items():
+            outputs = {label: renderer.render(data) for label, renderer in renderers.items()}
+            # Both renderers must describe the same document; DRF writes Decimals as floats, so compare parsed values.
+            if len({json.dumps(json.loads(output), sort_keys=True) for output in outputs.values()}) != 1:
+                raise CommandError(f'The renderers produced different documents for the {name} payload.')
+
+            self.stdout.write(f'{name} ({len(outputs["JSONRenderer"])} bytes):')
+            timings = {
+                label: timeit.timeit(lambda: renderer.render(data), number=options['iterations']) / options['iterations']
+                for label, renderer in renderers.items()
+            }
+            for label, seconds in timings.items():
+                self.stdout.write(f'  {label:<15} {seconds * 1000:8.3f} ms/render  ({len(outputs[label])} bytes)')
+            self.stdout.write(self.style.SUCCESS(f'  speedup: {timings["JSONRenderer"] / timings["ORJSONRenderer"]:.1f}x'))
@@ -0,0 +1,62 @@
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.products.models import Product, Brand, Category, ProductCollection
+from apps.products.serializers import (
+    CompiledProductListSerializer, CompiledBrandSerializer, CompiledCategorySerializer,
+    CompiledProductCollectionDetailSerializer,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Checks that the compiled read serializers produce exactly the same output as the DRF serializers '
+        'they were compiled from, then compares their throughput.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help='Number of serializations per serializer.')
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get('/', HTTP_HOST='localhost'))
+        # Serializers are compared on already-loaded rows, so only the serialization itself is measured.
+        cases = [
+            (CompiledProductListSerializer, Product.objects.published(), True),
+            (CompiledBrandSerializer, Brand.objects.all(), True),
+            (CompiledCategorySerializer, Category.objects.all(), True),
+            (CompiledProductCollectionDetailSerializer, ProductCollection.objects.all(), True),
+        ]
+
+        failures = []
+        for compiled_class, queryset, many in cases:
+            rows = list(compiled_class.project_queryset(queryset))
+            if not rows:
+                self.stdout.write(self.style.WARNING(f'{compiled_class.__name__}: no rows, skipped.'))
+                continue
+            context = {'request': request, 'strict_projection': False}
+
+            def compiled():
+                return compiled_class(rows, many=many, context=context).data
+
+            def original():
+                return compiled_class.serializer_class(rows, many=many, context=context).data
+
+            if compiled() != original():
+                failures.append(compiled_class.__name__)
+                continue
+
+            compiled_time = timeit.timeit(compiled, number=options['iterations']) / options['iterations']
+            original_time = timeit.timeit(original, number=options['iterations']) / options['iterations']
+            self.stdout.write(
+                f'{compiled_class.serializer_class.__name__} ({len(rows)} rows): '
+                f'DRF {len(rows) / original_time:,.0f} rows/s, compiled {len(rows) / compiled_time:,.0f} rows/s '
+                f'({original_time / compiled_time:.1f}x)'
+            )
+
+        if failures:
+            raise CommandError(f'Compiled output differs from the DRF serializer for: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS('Compiled serializers match their DRF serializers.'))
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.core.management.base import BaseCommand
+
+from apps.products.models import CatalogChange
+
+
+class Command(BaseCommand):
+    help = 'Deletes catalog change log entries older than the retention period of the delta sync endpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.CATALOG_CHANGES_SETTINGS['RETENTION_DAYS'],
+            help='Keep the changes of the last N days.',
+        )
+
+    def handle(self, *args, **options):
+        deleted = CatalogChange.objects.prune(timezone.now() - timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} catalog change(s).'))
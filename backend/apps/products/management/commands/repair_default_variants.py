@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.models import ProductVariant
+
+
+class Command(BaseCommand):
+    help = 'Promotes a default variant for every product that has none. Run it after bulk imports that bypass save().'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--product',
+            type=int,
+            action='append',
+            dest='product_ids',
+            help='Limit the repair to the given product id. Can be passed multiple times.',
+        )
+
+    def handle(self, *args, **options):
+        promoted = ProductVariant.objects.repair_default_variants(product_ids=options['product_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Promoted {promoted} default variant(s).'))
@@ -10,6 +10,7 @@ from apps.products.models import (
     ProductType, Product, ProductVariant, Price, Inventory, ProductCollection,
     ProductCollectionEntry
 )
+from apps.products.signals import defer_variant_naming
 from apps.products.factories import (
     CurrencyFactory, BrandFactory, CategoryFactory, TagFactory,
     ProductTypeFactory, ProductFactory, ProductVariantFactory,
@@ -104,23 +105,25 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING("  Missing brands, categories, types, or currencies. Cannot create products."))
             return all_products
 
-        for _ in range(30):
-            # Create a single product with random associations
-            product = ProductFactory(
-                brand=random.choice(brands),
-                categories=random.sample(categories, k=random.randint(1, 3)),
-                tags=random.sample(tags, k=random.randint(0, 2)),
-                product_type=random.choice(product_types)
-            )
-            all_products.append(product)
-
-            # For each product, create 1 to 5 variants
-            num_variants = random.randint(1, 5)
-            ProductVariantFactory.create_batch(
-                size=num_variants,
-                product=product,
-                currency_obj=random.choice(currencies)
-            )
+        # Variant names are generated in bulk once all attributes are assigned.
+        with defer_variant_naming():
+            for _ in range(30):
+                # Create a single product with random associations
+                product = ProductFactory(
+                    brand=random.choice(brands),
+                    categories=random.sample(categories, k=random.randint(1, 3)),
+                    tags=random.sample(tags, k=random.randint(0, 2)),
+                    product_type=random.choice(product_types)
+                )
+                all_products.append(product)
+
+                # For each product, create 1 to 5 variants
+                num_variants = random.randint(1, 5)
+                ProductVariantFactory.create_batch(
+                    size=num_variants,
+                    product=product,
+                    currency_obj=random.choice(currencies)
+                )
 
         self.stdout.write("  Products and variants created.")
         return all_products
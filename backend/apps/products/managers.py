@@ -1,4 +1,8 @@
-from django.db import models
+from datetime import timedelta
+from itertools import groupby
+
+from django.db import models, connections, transaction
+from django.db.models import Exists, F, OuterRef, Q, Subquery
 from django.utils import timezone
 
 
@@ -36,3 +40,144 @@ class ProductVariantQuerySet(models.QuerySet):
     def active(self):
         """Returns only active variants belonging to published products."""
         return self.filter(is_active=True, product__is_active=True)
+
+    def generate_names(self, batch_size: int = 500) -> int:
+        """
+        Names every variant in the queryset after its attribute values, ordered by attribute name
+        (e.g. "Blue, Large"). Variants whose name was set manually (i.e. differs from the SKU) are skipped.
+        The names are computed in one aggregated query, along with the current ones, and written with
+        batched UPDATEs. Returns the number of renamed variants.
+        """
+        candidates = self.filter(Q(name='') | Q(name=F('sku')))
+        variants = [
+            self.model(pk=pk, name=generated_name)
+            for pk, (name, generated_name) in self._attribute_names(candidates).items()
+            if generated_name != name
+        ]
+        if variants:
+            self.model.objects.bulk_update(variants, ['name'], batch_size=batch_size)
+        return len(variants)
+
+    def _attribute_names(self, variants) -> dict:
+        """Returns {variant pk: (current name, "Value, Value")} for the given variants that have attributes."""
+        if connections[self.db].vendor == 'postgresql':
+            from django.contrib.postgres.aggregates import StringAgg
+
+            rows = variants.values('pk', 'name').annotate(
+                generated_name=StringAgg('attributes__value', delimiter=', ', ordering='attributes__attribute__name')
+            ).values_list('pk', 'name', 'generated_name').order_by()
+            return {pk: (name, generated_name) for pk, name, generated_name in rows if generated_name}
+
+        # Other backends have no ordered string aggregate; group the same single query in Python instead.
+        through = self.model.attributes.through
+        rows = through.objects.filter(productvariant__in=variants.values('pk')).order_by(
+            'productvariant_id', 'attributevalue__attribute__name'
+        ).values_list('productvariant_id', 'productvariant__name', 'attributevalue__value')
+        return {
+            pk: (group[0][1], ", ".join(value for _, _, value in group))
+            for pk, group in ((pk, list(group)) for pk, group in groupby(rows, key=lambda row: row[0]))
+        }
+
+    def repair_default_variants(self, product_ids=None, demote_duplicates: bool = True) -> int:
+        """
+        Set-based enforcement of "exactly one default variant per product".
+        Duplicate defaults (e.g. left by bulk_update) are demoted, keeping the newest one, and every
+        product without a default gets its most recently created active variant promoted.
+        Each step is one set-based read and UPDATE (see set_default()), in a single transaction. Pass `product_ids`
+        to limit the repair to some products; omit it to repair the whole catalog (e.g. after bulk_create/update imports).
+        Signal handlers pass `demote_duplicates=False`, as save() already keeps a single default.
+        Returns the number of promoted variants.
+        """
+        with transaction.atomic(using=self.db):
+            if demote_duplicates:
+                self._demote_duplicate_defaults(product_ids)
+            return self._promote_missing_defaults(product_ids)
+
+    def _promote_missing_defaults(self, product_ids=None) -> int:
+        """Promotes the newest active variant of each product without a default."""
+        first_active = self.model.objects.filter(
+            product_id=OuterRef('product_id'),
+            is_active=True,
+        ).order_by('-created_at', '-pk').values('pk')[:1]
+        has_default = self.model.objects.filter(product_id=OuterRef('product_id'), is_default=True)
+
+        candidates = self.model.objects.filter(pk=Subquery(first_active)).filter(~Exists(has_default))
+        if product_ids is not None:
+            candidates = candidates.filter(product_id__in=product_ids)
+        return candidates.set_default(True)
+
+    def _demote_duplicate_defaults(self, product_ids=None) -> None:
+        """Keeps only the newest default variant of each product."""
+        newer_default = self.model.objects.filter(
+            product_id=OuterRef('product_id'),
+            is_default=True,
+        ).filter(
+            Q(created_at__gt=OuterRef('created_at')) |
+            Q(created_at=OuterRef('created_at'), pk__gt=OuterRef('pk'))
+        )
+        duplicates = self.model.objects.filter(is_default=True).filter(Exists(newer_default))
+        if product_ids is not None:
+            duplicates = duplicates.filter(product_id__in=product_ids)
+        duplicates.set_default(False)
+
+    def set_default(self, is_default: bool) -> int:
+        """
+        update(is_default=...) that also logs each changed variant for delta sync, which queryset updates
+        otherwise bypass (see log_catalog_change). The variants are read first, as UPDATE cannot return
+        them; the UPDATE repeats the filters, so a variant changed in between is left as it is.
+        """
+        from apps.products.models import CatalogChange
+        from apps.products.services import CatalogChangeLog
+
+        rows = list(self.exclude(is_default=is_default).values_list('pk', 'product_id'))
+        if not rows:
+            return 0
+        with transaction.atomic(using=self.db):
+            updated = self.filter(pk__in=[pk for pk, _ in rows]).update(is_default=is_default)
+            for pk, product_id in rows:
+                CatalogChangeLog.record(self.model(pk=pk, product_id=product_id), CatalogChange.ActionChoices.UPDATED)
+        return updated
+
+
+class CatalogChangeQuerySet(models.QuerySet):
+    """Reads and maintenance of the catalog change log (see CatalogChange)."""
+
+    def page_after(self, cursor: int, limit: int, settle_seconds: float) -> list:
+        """
+        Up to `limit` changes after `cursor`, in order.
+        Ids are allocated when a row is inserted, not when it becomes visible, so a concurrent writer may still
+        commit a lower id than the newest visible row. Rows younger than `settle_seconds` are therefore held
+        back, together with everything after them, so clients never move their cursor past an unseen change.
+        """
+        cutoff = timezone.now() - timedelta(seconds=settle_seconds)
+        page = []
+        for change in self.filter(pk__gt=cursor).order_by('pk')[:limit]:
+            if change.changed_at > cutoff:
+                break
+            page.append(change)
+        return page
+
+    def latest_cursor(self) -> int:
+        return self.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+    def oldest_cursor(self) -> int:
+        """The cursor just before the oldest retained change; older cursors have missed pruned changes."""
+        oldest = self.order_by('pk').values_list('pk', flat=True).first()
+        # prune() never empties the log, so an empty log has never had any changes.
+        return oldest - 1 if oldest else 0
+
+    def prune(self, older_than, batch_size: int = 5000) -> int:
+        """
+        Deletes changes recorded before `older_than`, in batches to keep each transaction short.
+        The newest change is always kept: its id marks where the pruned history ends, so oldest_cursor()
+        keeps rejecting older cursors even when every other change has been pruned.
+        """
+        newest = self.model.objects.latest_cursor()
+        deleted = 0
+        while True:
+            batch = list(
+                self.filter(changed_at__lt=older_than, pk__lt=newest).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not batch:
+                return deleted
+            deleted += self.model.objects.filter(pk__in=batch).delete()[0]
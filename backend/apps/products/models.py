@@ -1,6 +1,6 @@
 from functools import cached_property
 
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
 from django.conf import settings
 from django.utils import timezone
@@ -14,7 +14,7 @@ from mptt.models import MPTTModel, TreeForeignKey
 
 from apps.common.models import TimeStampedModel
 from apps.common.utils import GenerateUploadPath
-from apps.products.managers import ProductQuerySet, ProductVariantQuerySet
+from apps.products.managers import ProductQuerySet, ProductVariantQuerySet, CatalogChangeQuerySet
 from apps.common.validators import FileSizeValidator, FileExtensionValidator
 
 
@@ -570,13 +570,19 @@ class Product(TimeStampedModel):
         Returns the default variant for the product.
         Caches the result for the lifetime of the request to avoid extra queries.
         """
+        if hasattr(self, 'prefetched_default_variants'):
+            # Loaded in bulk by ProductListSerializer's projection.
+            return next(iter(self.prefetched_default_variants), None)
         return self.variants.filter(is_active=True, is_default=True).first()
 
         # The get_featured_image method can now be written cleanly
 
     @cached_property
     def featured_image(self):
-        featured_link = self.media_links.filter(is_featured=True).first()
+        if hasattr(self, 'prefetched_featured_links'):
+            featured_link = next(iter(self.prefetched_featured_links), None)
+        else:
+            featured_link = self.media_links.filter(is_featured=True).first()
         if featured_link and featured_link.media.media_type == 'image':
             return featured_link.media
         return None
@@ -641,6 +647,15 @@ class ProductVariant(TimeStampedModel):
         # A variant is unique by its product and the combination of its attributes.
         # This is enforced at the application level, not as a DB constraint here
         # due to the complexity of enforcing uniqueness on a ManyToManyField.
+        constraints = [
+            # At most one default variant per product. Products without any default are
+            # repaired by ProductVariantQuerySet.repair_default_variants().
+            models.UniqueConstraint(
+                fields=['product'],
+                condition=models.Q(is_default=True),
+                name='unique_default_variant_per_product',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - {self.name or self.sku}"
@@ -649,7 +664,14 @@ class ProductVariant(TimeStampedModel):
         if not self.name:
             # Auto-generate a name if it's blank
             self.name = self.sku
-        super().save(*args, **kwargs)
+        # Unset the previous default first, otherwise the partial unique constraint would reject this row.
+        # This cannot be folded into one UPDATE setting is_default on both rows: the partial index cannot be
+        # deferred, so PostgreSQL checks it row by row and fails whenever the new default is updated first.
+        # One transaction, so the demoted variant is logged for delta sync together with this one.
+        with transaction.atomic(using=kwargs.get('using')):
+            if self.is_default:
+                ProductVariant.objects.filter(product_id=self.product_id).exclude(pk=self.pk).set_default(False)
+            super().save(*args, **kwargs)
 
 
 class ProductCollection(TimeStampedModel):
@@ -922,3 +944,62 @@ class Inventory(TimeStampedModel):
         if not self.track_inventory:
             return False
         return self.available_quantity <= self.threshold
+
+
+class CatalogChange(models.Model):
+    """
+    An append-only log of created, updated and deleted products, variants, prices and inventory records,
+    written from model signals. Its id is the cursor of the delta sync endpoint.
+    """
+
+    class KindChoices(models.TextChoices):
+        PRODUCT = 'product', _('Product')
+        VARIANT = 'variant', _('Product Variant')
+        PRICE = 'price', _('Price')
+        INVENTORY = 'inventory', _('Inventory')
+
+    class ActionChoices(models.TextChoices):
+        CREATED = 'created', _('Created')
+        UPDATED = 'updated', _('Updated')
+        DELETED = 'deleted', _('Deleted')
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(
+        max_length=10,
+        choices=KindChoices.choices,
+        verbose_name=_("kind"),
+        help_text=_("The kind of record that changed.")
+    )
+    object_id = models.PositiveBigIntegerField(
+        verbose_name=_("object id"),
+        help_text=_("The primary key of the record that changed. Not a foreign key, so deletions are kept.")
+    )
+    product_id = models.PositiveBigIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_("product id"),
+        help_text=_("The product the record belongs to, so clients can refresh whole products.")
+    )
+    action = models.CharField(
+        max_length=10,
+        choices=ActionChoices.choices,
+        verbose_name=_("action")
+    )
+    changed_at = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name=_("changed at")
+    )
+
+    objects = CatalogChangeQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("Catalog Change")
+        verbose_name_plural = _("Catalog Changes")
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['kind', 'object_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.kind} {self.object_id}"
@@ -0,0 +1,77 @@
+"""
+Cached access to the small catalog tables read on almost every request.
+
+    from apps.products import reference
+
+    reference.currencies.default()
+    reference.categories.get(slug='laptops')
+    reference.attributes.get(pk=attribute_id)
+
+Each table is loaded whole and kept in a two-tier cache (see apps.common.cache.TwoTierCache).
+The returned instances are shared between requests and must be treated as read-only.
+Saving or deleting a row invalidates its table in every process (see apps.products.signals).
+"""
+from typing import Optional
+
+from django.conf import settings
+from django.db import models
+
+from apps.common.cache import TwoTierCache
+from apps.products.models import Currency, Category, Brand, Tag, Attribute, ProductType
+
+_cache = TwoTierCache(
+    channel=settings.REFERENCE_CACHE_SETTINGS['CHANNEL'],
+    max_entries=settings.REFERENCE_CACHE_SETTINGS['MAX_ENTRIES'],
+    local_ttl=settings.REFERENCE_CACHE_SETTINGS['LOCAL_TTL'],
+    ttl=settings.REFERENCE_CACHE_SETTINGS['TTL'],
+)
+
+
+class ReferenceTable:
+    """All rows of one reference model, with in-memory lookups."""
+
+    def __init__(self, model: type[models.Model]):
+        self.model = model
+        self.key = f'reference:{model._meta.label_lower}'
+
+    def all(self) -> list:
+        """All rows, in the model's default ordering."""
+        return self._snapshot()[0]
+
+    def get(self, pk=None, **lookup) -> Optional[models.Model]:
+        """Returns the row with the given primary key or matching the given field values, or None."""
+        if pk is not None and not lookup:
+            return self._snapshot()[1].get(pk)
+        if pk is not None:
+            lookup['pk'] = pk
+        return next(iter(self.filter(**lookup)), None)
+
+    def filter(self, **lookup) -> list:
+        """Returns the rows matching the given field values."""
+        return [obj for obj in self.all() if all(getattr(obj, field) == value for field, value in lookup.items())]
+
+    def invalidate(self) -> None:
+        _cache.invalidate(self.key)
+
+    def _snapshot(self) -> tuple[list, dict]:
+        return _cache.get(self.key, self._load)
+
+    def _load(self) -> tuple[list, dict]:
+        rows = list(self.model._default_manager.all())
+        return rows, {obj.pk: obj for obj in rows}
+
+
+class CurrencyTable(ReferenceTable):
+    def default(self) -> Optional[Currency]:
+        """The store's default currency, replacing queries such as `prices.get(currency__is_default=True)`."""
+        return self.get(is_default=True)
+
+
+currencies = CurrencyTable(Currency)
+categories = ReferenceTable(Category)
+brands = ReferenceTable(Brand)
+tags = ReferenceTable(Tag)
+attributes = ReferenceTable(Attribute)
+product_types = ReferenceTable(ProductType)
+
+TABLES = {table.model: table for table in (currencies, categories, brands, tags, attributes, product_types)}
@@ -1,10 +1,13 @@
+from django.db.models import Prefetch
 from rest_framework import serializers
 
+from apps.media.models import MediaLink
 from apps.products.services import PricingService
-from apps.products.models import Product, Brand, Category, Tag, Currency, AttributeValue, Attribute, ProductType, Price, Inventory, ProductVariant, ProductCollection
+from apps.common.serializers import ProjectedModelSerializer, compile_serializer
+from apps.products.models import Product, Brand, Category, Tag, Currency, AttributeValue, Attribute, ProductType, Price, Inventory, ProductVariant, ProductCollection, CatalogChange
 
 
-class CurrencySerializer(serializers.ModelSerializer):
+class CurrencySerializer(ProjectedModelSerializer):
     """Serializer for the Currency model."""
 
     class Meta:
@@ -12,23 +15,25 @@ class CurrencySerializer(serializers.ModelSerializer):
         fields = ('id', 'code', 'name', 'symbol')
 
 
-class BrandSerializer(serializers.ModelSerializer):
+class BrandSerializer(ProjectedModelSerializer):
     """Serializer for the Brand model."""
 
     class Meta:
         model = Brand
         fields = ('id', 'name', 'slug', 'get_logo_url')
+        read_columns = ('logo',)
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(ProjectedModelSerializer):
     """Serializer for the Category model."""
 
     class Meta:
         model = Category
         fields = ('id', 'name', 'slug', 'get_image_url')
+        read_columns = ('image',)
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(ProjectedModelSerializer):
     """Serializer for the Tag model."""
 
     class Meta:
@@ -97,7 +102,7 @@ class ProductVariantSerializer(serializers.ModelSerializer):
         fields = ('id', 'sku', 'name', 'is_default', 'attributes', 'prices', 'inventory')
 
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(ProjectedModelSerializer):
     """
     A lightweight serializer for representing products in a list view.
     Includes essential information like name, price, and featured image.
@@ -109,6 +114,21 @@ class ProductListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = ('id', 'name', 'slug', 'short_description', 'brand', 'price_info', 'featured_image_url',)
+        # Feed Product.default_variant and Product.featured_image, read by the method fields.
+        prefetch_related = (
+            Prefetch(
+                'variants',
+                queryset=ProductVariant.objects.filter(is_active=True, is_default=True).only('id', 'product').prefetch_related(
+                    'prices'  # Currencies are read from apps.products.reference.
+                ),
+                to_attr='prefetched_default_variants',
+            ),
+            Prefetch(
+                'media_links',
+                queryset=MediaLink.objects.filter(is_featured=True).select_related('media'),
+                to_attr='prefetched_featured_links',
+            ),
+        )
 
     @staticmethod
     def get_price_info(obj: Product) -> dict:
@@ -154,15 +174,31 @@ class ProductDetailSerializer(serializers.Serializer):
     media = serializers.ListField(child=serializers.DictField(), read_only=True)
 
 
-class ProductCollectionSerializer(serializers.ModelSerializer):
+class ProductCollectionSerializer(ProjectedModelSerializer):
     class Meta:
         model = ProductCollection
         fields = ['id', 'name', 'slug', 'description', 'image', ]
 
 
-class ProductCollectionDetailSerializer(serializers.ModelSerializer):
+class ProductCollectionDetailSerializer(ProjectedModelSerializer):
     products = ProductListSerializer(many=True, read_only=True)
 
     class Meta:
         model = ProductCollection
         fields = ['id', 'name', 'slug', 'description', 'image', 'products', ]
+
+
+class CatalogChangeSerializer(serializers.ModelSerializer):
+    """Serializer for one entry of the delta sync feed."""
+
+    class Meta:
+        model = CatalogChange
+        fields = ('kind', 'object_id', 'product_id', 'action', 'changed_at')
+
+
+# --- Compiled read serializers, used by the list and retrieve views ---
+CompiledBrandSerializer = compile_serializer(BrandSerializer)
+CompiledCategorySerializer = compile_serializer(CategorySerializer)
+CompiledTagSerializer = compile_serializer(TagSerializer)
+CompiledProductListSerializer = compile_serializer(ProductListSerializer)
+CompiledProductCollectionDetailSerializer = compile_serializer(ProductCollectionDetailSerializer)
@@ -1,11 +1,16 @@
+import threading
 from typing import Dict, Any, List
 
+from django.conf import settings
 from django.db import transaction
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
 
+from apps.common import metrics
+from apps.products import reference
 from apps.products.exceptions import ProductNotFound, OutOfStockError
-from apps.products.models import Product, ProductVariant, Price, Inventory
+from apps.products.models import Product, ProductVariant, Price, Inventory, CatalogChange
+from apps.notification.services import OutboxService
 
 User = get_user_model()
 
@@ -77,7 +82,11 @@ class ProductService:
                 'discount_amount': price_info['discount_amount'],
                 'currency_symbol': price_info['currency_symbol'],
                 'is_in_stock': inventory_info.is_in_stock(),
-                'attributes': {attr.attribute.slug: attr.value for attr in variant.attributes.all()}
+                'attributes': {
+                    # The cached table may not have an attribute created in another process or transaction yet.
+                    (reference.attributes.get(pk=attr.attribute_id) or attr.attribute).slug: attr.value
+                    for attr in variant.attributes.all()
+                }
             }
         return variant_map
 
@@ -140,13 +149,40 @@ class InventoryService:
             return
 
         if not self.is_in_stock(quantity):
+            metrics.stock_reservation_conflicts_total.inc()
             raise OutOfStockError(_("Not enough stock available for this variant."))
 
         # Use select_for_update to lock the row during the transaction
         inventory_to_update = Inventory.objects.select_for_update().get(pk=self.inventory.pk)
+        was_low_stock = inventory_to_update.is_low_stock
         inventory_to_update.quantity -= quantity
         inventory_to_update.save(update_fields=['quantity'])
 
+        if inventory_to_update.is_low_stock and not was_low_stock:
+            self._send_low_stock_alert(inventory_to_update)
+
+    def _send_low_stock_alert(self, inventory: Inventory):
+        """Notifies the staff (STOCK_ALERT_EMAILS) through the outbox, within the transaction of the sale."""
+        for email in settings.STOCK_ALERT_EMAILS:
+            OutboxService.enqueue(
+                'email',
+                email,
+                kind='stock_alert',
+                object_id=inventory.pk,
+                subject=str(_("Low stock: %(sku)s") % {'sku': self.variant.sku}),
+                message=str(_("%(variant)s is running low: %(quantity)d left.") % {
+                    'variant': self.variant, 'quantity': inventory.available_quantity,
+                }),
+                template_name='notifications/email/stock_alert.html',
+                context={
+                    'variant_name': str(self.variant),
+                    'sku': self.variant.sku,
+                    'available_quantity': inventory.available_quantity,
+                    'threshold': inventory.threshold,
+                    'site_name': str(settings.SITE_NAME),
+                },
+            )
+
     @transaction.atomic
     def increase_stock(self, quantity: int):
         """Increases the stock for a variant (e.g., order cancellation, return)."""
@@ -172,18 +208,15 @@ class PricingService:
         """
         # For now, we delegate to the model's properties.
         # This service provides a layer for future, more complex logic (e.g., taxes, user-specific discounts).
-        try:
-            # Assuming a single currency for now. This can be extended.
-            price_obj = self.variant.prices.get()  # This might fail if you have multiple currencies
-            return {
-                "base_price": price_obj.base_price,
-                "final_price": price_obj.current_price,
-                "is_on_sale": price_obj.is_on_sale,
-                "discount_amount": price_obj.saved_amount,
-                "currency_code": price_obj.currency.code,
-                "currency_symbol": price_obj.currency.symbol,
-            }
-        except Price.DoesNotExist:
+        # prices.all() is served from the prefetch cache when the caller loaded the prices in bulk.
+        prices = list(self.variant.prices.all())
+        if len(prices) > 1:
+            # Handle cases with multiple currencies, e.g., return the default one.
+            default_currency = reference.currencies.default()
+            if default_currency is not None:
+                prices = [price for price in prices if price.currency_id == default_currency.pk]
+
+        if not prices:
             # Return a default/error state if no price is defined
             return {
                 "base_price": 0,
@@ -193,14 +226,108 @@ class PricingService:
                 "currency_code": "N/A",
                 "currency_symbol": "",
             }
-        except Price.MultipleObjectsReturned:
-            # Handle cases with multiple currencies, e.g., return the default one.
-            price_obj = self.variant.prices.get(currency__is_default=True)
-            return {
-                "base_price": price_obj.base_price,
-                "final_price": price_obj.current_price,
-                "is_on_sale": price_obj.is_on_sale,
-                "discount_amount": price_obj.saved_amount,
-                "currency_code": price_obj.currency.code,
-                "currency_symbol": price_obj.currency.symbol,
-            }
+
+        price_obj = prices[0]
+        currency = reference.currencies.get(pk=price_obj.currency_id) or price_obj.currency
+        return {
+            "base_price": price_obj.base_price,
+            "final_price": price_obj.current_price,
+            "is_on_sale": price_obj.is_on_sale,
+            "discount_amount": price_obj.saved_amount,
+            "currency_code": currency.code,
+            "currency_symbol": currency.symbol,
+        }
+
+
+class CatalogChangeLog:
+    """
+    Records changes to products, variants, prices and inventory in the CatalogChange table.
+    Changes are written once the surrounding transaction commits (rolled back changes are never logged),
+    in a single bulk insert per transaction.
+    """
+    KINDS = {
+        Product: CatalogChange.KindChoices.PRODUCT,
+        ProductVariant: CatalogChange.KindChoices.VARIANT,
+        Price: CatalogChange.KindChoices.PRICE,
+        Inventory: CatalogChange.KindChoices.INVENTORY,
+    }
+
+    _pending = threading.local()
+
+    @classmethod
+    def record(cls, instance, action: str) -> None:
+        kind = cls.KINDS[type(instance)]
+        if kind == CatalogChange.KindChoices.PRODUCT:
+            product_id, variant_id = instance.pk, None
+        elif kind == CatalogChange.KindChoices.VARIANT:
+            product_id, variant_id = instance.product_id, None
+        else:
+            # Resolved for the whole batch in _flush(), unless the variant is already loaded.
+            variant_cached = type(instance).variant.is_cached(instance)
+            product_id, variant_id = (instance.variant.product_id, None) if variant_cached else (None, instance.variant_id)
+        entry = (kind, instance.pk, product_id, variant_id, action)
+
+        connection = transaction.get_connection()
+        if not connection.in_atomic_block:
+            cls._flush([entry])
+            return
+
+        pending = getattr(cls._pending, 'batch', None)
+        # Reuse the batch only while its callback is still queued; a rollback discards it.
+        if pending is not None and any(item[1] == pending.flush for item in connection.run_on_commit):
+            pending.append(entry)
+            return
+
+        pending = _PendingChanges([entry])
+        cls._pending.batch = pending
+        transaction.on_commit(pending.flush)
+
+    @staticmethod
+    def read(cursor: int, limit: int, settle_seconds: float) -> tuple[list, int, bool]:
+        """
+        Returns (changes, next cursor, has more) for the changes after `cursor`.
+        Repeated changes to one record within the page are collapsed into its latest, keeping "created"
+        when the client has not seen the record yet.
+        """
+        page = CatalogChange.objects.page_after(cursor, limit + 1, settle_seconds)
+        has_more = len(page) > limit
+        page = page[:limit]
+
+        latest = {}
+        for change in page:
+            previous = latest.pop((change.kind, change.object_id), None)
+            if (
+                previous is not None
+                and previous.action == CatalogChange.ActionChoices.CREATED
+                and change.action == CatalogChange.ActionChoices.UPDATED
+            ):
+                change.action = CatalogChange.ActionChoices.CREATED
+            # Re-inserted, so records stay ordered by their latest change.
+            latest[(change.kind, change.object_id)] = change
+        return list(latest.values()), (page[-1].pk if page else cursor), has_more
+
+    @staticmethod
+    def _flush(entries: list) -> None:
+        variant_ids = {variant_id for *_, variant_id, _ in entries if variant_id is not None}
+        products_by_variant = dict(
+            ProductVariant.objects.filter(pk__in=variant_ids).values_list('pk', 'product_id')
+        ) if variant_ids else {}
+
+        CatalogChange.objects.bulk_create([
+            CatalogChange(
+                kind=kind,
+                object_id=object_id,
+                product_id=product_id if variant_id is None else products_by_variant.get(variant_id),
+                action=action,
+            )
+            for kind, object_id, product_id, variant_id, action in entries
+        ])
+
+
+class _PendingChanges(list):
+    """Catalog changes waiting for the current transaction to commit."""
+
+    def flush(self) -> None:
+        if getattr(CatalogChangeLog._pending, 'batch', None) is self:
+            CatalogChangeLog._pending.batch = None
+        CatalogChangeLog._flush(self)
@@ -1,34 +1,34 @@
 # In apps/products/signals.py
 
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
-from .models import ProductVariant, AttributeValue
+from .models import Product, ProductVariant, Price, Inventory, AttributeValue, CatalogChange
+from .services import CatalogChangeLog
+from . import reference, live
+from . import cache as catalog_cache
+from apps.common.cache import invalidate_tags_on_commit
+
+# Variant ids collected by defer_variant_naming(); None when no bulk context is active.
+_deferred_variant_ids: ContextVar = ContextVar('deferred_variant_ids', default=None)
 
 
 @receiver(post_save, sender=ProductVariant)
 def manage_default_variant(sender, instance: ProductVariant, created: bool, **kwargs):
     """
     Ensures that there is always one and only one default variant for a product.
-    - If a new variant is created and it's the only one, it becomes the default.
-    - If a variant is explicitly set as default, any other default is unset.
+    - Demoting the previous default happens in ProductVariant.save(), before the row is written.
+    - If the product is left without a default, its newest active variant is promoted.
     """
-    product = instance.product
-
-    # If a variant is saved with is_default=True
+    # A default variant cannot leave its product without one, so there is nothing to repair.
     if instance.is_default:
-        # Unset the is_default flag for all other variants of the same product.
-        # .exclude(pk=instance.pk) ensures we don't unset the current one.
-        product.variants.filter(is_default=True).exclude(pk=instance.pk).update(is_default=False)
+        return
 
-    # After the update, check if ANY default variant exists for the product.
-    # If not (e.g., the first variant was created with is_default=False, or a default was deleted),
-    # make this one the default.
-    if not product.variants.filter(is_default=True).exists():
-        # Find the first available active variant to promote as default.
-        first_variant = product.variants.filter(is_active=True).first()
-        if first_variant:
-            # Use .update() to avoid triggering this signal again in a loop.
-            ProductVariant.objects.filter(pk=first_variant.pk).update(is_default=True)
+    # A no-op when the product already has exactly one default.
+    ProductVariant.objects.repair_default_variants(product_ids=[instance.product_id], demote_duplicates=False)
 
 
 @receiver(post_delete, sender=ProductVariant)
@@ -40,42 +40,113 @@ def reassign_default_on_delete(sender, instance: ProductVariant, **kwargs):
     if not instance.is_default:
         return
 
-    product = instance.product
-    # Check if any other variants exist.
-    if product.variants.exists():
-        # Check if, after deletion, there is still a default variant.
-        # This is a safeguard, as the post_save signal should handle most cases.
-        if not product.variants.filter(is_default=True).exists():
-            # Promote the first active variant to be the new default.
-            new_default = product.variants.filter(is_active=True).first()
-            if new_default:
-                new_default.is_default = True
-                new_default.save(update_fields=['is_default'])
+    # Use the raw id: when the whole product is being deleted, the related object may already be gone.
+    ProductVariant.objects.repair_default_variants(product_ids=[instance.product_id], demote_duplicates=False)
 
 
 @receiver(m2m_changed, sender=ProductVariant.attributes.through)
-def generate_variant_name_from_attributes(sender, instance: ProductVariant, action: str, **kwargs):
+def generate_variant_name_from_attributes(sender, instance, action: str, reverse: bool, pk_set=None, **kwargs):
     """
     Auto-generates the variant's name based on its attributes after they are added.
-    This signal fires when the ManyToManyField 'attributes' is changed.
+    This signal fires when the ManyToManyField 'attributes' is changed, from either side.
+    Inside `defer_variant_naming()` the variants are only collected and named in bulk on exit.
     """
     # We only want to act after new attributes have been added.
     if action != "post_add":
         return
 
-    # If the name is already set manually, do not overwrite it.
-    if instance.name and instance.name != instance.sku:
+    # With reverse=True the attribute value is the instance and pk_set holds the variant ids.
+    variant_ids = set(pk_set or ()) if reverse else {instance.pk}
+    if not variant_ids:
+        return
+
+    deferred = _deferred_variant_ids.get()
+    if deferred is not None:
+        deferred.update(variant_ids)
+        return
+
+    # If the name is already set manually, generate_names() leaves it untouched.
+    ProductVariant.objects.filter(pk__in=variant_ids).generate_names()
+
+
+@contextmanager
+def defer_variant_naming(batch_size: int = 500):
+    """
+    Collects the variants whose attributes change inside the block and names them all at once on exit,
+    instead of two queries per m2m add. Use it around imports and other bulk attribute assignments.
+    Nested blocks are folded into the outermost one.
+    """
+    if _deferred_variant_ids.get() is not None:
+        yield
+        return
+
+    variant_ids = set()
+    token = _deferred_variant_ids.set(variant_ids)
+    try:
+        yield
+    finally:
+        _deferred_variant_ids.reset(token)
+
+    variant_ids = sorted(variant_ids)
+    for i in range(0, len(variant_ids), batch_size):
+        ProductVariant.objects.filter(pk__in=variant_ids[i:i + batch_size]).generate_names(batch_size=batch_size)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_reference_table(sender, **kwargs):
+    """Drops the cached copy of a reference table in every process once the change is committed."""
+    table = reference.TABLES.get(sender)
+    if table is not None:
+        transaction.on_commit(table.invalidate)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_catalog_caches(sender, instance, **kwargs):
+    """Invalidates the catalog cache entries depending on the saved or deleted instance, once committed."""
+    if sender not in catalog_cache.MODEL_DEPENDENCIES:
         return
+    tags = catalog_cache.tags_for(instance)
+    if tags:
+        invalidate_tags_on_commit(*tags)
 
-    # Fetch all attribute values, ordered by their attribute's name for consistency.
-    # e.g., "Blue, Large" instead of "Large, Blue"
-    attributes = instance.attributes.all().order_by('attribute__name')
 
-    if not attributes:
+@receiver(m2m_changed, sender=ProductVariant.attributes.through)
+def invalidate_catalog_caches_on_attribute_change(sender, instance, action: str, reverse: bool, pk_set=None, **kwargs):
+    """A variant's attributes appear on its product's detail page."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
         return
+    if reverse:
+        products = ProductVariant.objects.filter(pk__in=pk_set or ()).values_list('product_id', flat=True)
+        tags = [catalog_cache.product_tag(product_id) for product_id in set(products)]
+    else:
+        tags = [catalog_cache.product_tag(instance.product_id)]
+    if tags:
+        invalidate_tags_on_commit(*tags)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_save, sender=Price)
+@receiver(post_save, sender=Inventory)
+def log_catalog_change(sender, instance, created: bool, **kwargs):
+    """Feeds the delta sync endpoint. Queryset update() and bulk_update() bypass this, like every signal."""
+    action = CatalogChange.ActionChoices.CREATED if created else CatalogChange.ActionChoices.UPDATED
+    CatalogChangeLog.record(instance, action)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_delete, sender=Price)
+@receiver(post_delete, sender=Inventory)
+def log_catalog_deletion(sender, instance, **kwargs):
+    """Deletions cascade through variants, prices and inventory, and each deleted row is logged."""
+    CatalogChangeLog.record(instance, CatalogChange.ActionChoices.DELETED)
 
-    # Join the values to create a descriptive name.
-    new_name = ", ".join(attr.value for attr in attributes)
 
-    # Update the instance without triggering save signals again.
-    ProductVariant.objects.filter(pk=instance.pk).update(name=new_name)
+@receiver(post_save, sender=Price)
+@receiver(post_save, sender=Inventory)
+def publish_live_update(sender, instance, **kwargs):
+    """Pushes stock and price changes to the open product page streams, once committed."""
+    transaction.on_commit(lambda: live.publish_change(instance))
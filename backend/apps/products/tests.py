@@ -0,0 +1,154 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.contenttypes.models import ContentType
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.media.models import Media, MediaLink
+from apps.products import reference
+from apps.products.factories import (
+    CurrencyFactory, BrandFactory, CategoryFactory, TagFactory,
+    ProductTypeFactory, ProductFactory, ProductVariantFactory, ProductCollectionFactory,
+)
+from apps.products.models import Product, Brand, Category, Tag, ProductCollection
+from apps.products.serializers import (
+    BrandSerializer, CategorySerializer, TagSerializer, ProductListSerializer, ProductCollectionDetailSerializer,
+    CompiledBrandSerializer, CompiledCategorySerializer, CompiledTagSerializer, CompiledProductListSerializer,
+    CompiledProductCollectionDetailSerializer,
+)
+
+
+class CatalogSerializerTestCase(TestCase):
+    """A small catalog: products with several variants, one with a featured image, and a collection."""
+
+    @classmethod
+    def setUpTestData(cls):
+        currencies = [CurrencyFactory(code='USD'), CurrencyFactory(code='EUR')]
+        brands = BrandFactory.create_batch(3)
+        categories = CategoryFactory.create_batch(3)
+        tags = TagFactory.create_batch(3)
+        product_type = ProductTypeFactory()
+
+        cls.products = []
+        for i in range(6):
+            product = ProductFactory(
+                brand=brands[i % len(brands)], categories=categories[:1 + i % 3], tags=tags[:i % 3],
+                product_type=product_type,
+            )
+            ProductVariantFactory.create_batch(
+                size=2, product=product, price_and_inventory__currency_obj=currencies[i % 2],
+            )
+            cls.products.append(product)
+
+        product_ct = ContentType.objects.get_for_model(Product)
+        media = Media.objects.create(
+            file='products/featured.jpg', media_type='image', content_type=product_ct, object_id=cls.products[0].pk,
+        )
+        MediaLink.objects.create(media=media, is_featured=True, content_type=product_ct, object_id=cls.products[0].pk)
+
+        ProductCollectionFactory(products=cls.products[:4])
+
+    def setUp(self):
+        # Reference tables are invalidated on commit, which never happens inside a TestCase.
+        for table in reference.TABLES.values():
+            table.invalidate()
+        self.context = {'request': Request(APIRequestFactory().get('/'))}
+
+
+class ProjectedModelSerializerTests(CatalogSerializerTestCase):
+    """The projected queryset gives the same output as a fully loaded one, without per-row queries."""
+
+    cases = (
+        (ProductListSerializer, Product),
+        (BrandSerializer, Brand),
+        (CategorySerializer, Category),
+        (TagSerializer, Tag),
+        (ProductCollectionDetailSerializer, ProductCollection),
+    )
+
+    def serialize(self, serializer_class, queryset, strict: bool):
+        return serializer_class(queryset, many=True, context={**self.context, 'strict_projection': strict}).data
+
+    def test_output_matches_unprojected_queryset(self):
+        for serializer_class, model in self.cases:
+            with self.subTest(serializer=serializer_class.__name__):
+                queryset = model.objects.order_by('pk')
+                projected = self.serialize(serializer_class, serializer_class.project_queryset(queryset), strict=True)
+                self.assertEqual(projected, self.serialize(serializer_class, queryset, strict=False))
+
+    def test_no_deferred_field_is_loaded(self):
+        for serializer_class, model in self.cases:
+            with self.subTest(serializer=serializer_class.__name__):
+                rows = list(serializer_class.project_queryset(model.objects.order_by('pk')))
+                deferred = [row.get_deferred_fields() for row in rows]
+                self.serialize(serializer_class, rows, strict=False)
+                self.assertEqual([row.get_deferred_fields() for row in rows], deferred)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        for serializer_class, model in self.cases:
+            with self.subTest(serializer=serializer_class.__name__):
+                queryset = serializer_class.project_queryset(model.objects.order_by('pk'))
+                # Fills the reference caches (e.g. currencies), which are read once per process, not per row.
+                self.serialize(serializer_class, queryset, strict=True)
+                counts = []
+                for rows in (1, model.objects.count()):
+                    with CaptureQueriesContext(connection) as queries:
+                        self.serialize(serializer_class, queryset[:rows], strict=True)
+                    counts.append(len(queries))
+                self.assertEqual(counts[0], counts[1], f'{counts[0]} queries for 1 row, {counts[1]} for all rows')
+
+
+@override_settings(STRICT_SERIALIZER_PROJECTION=False)
+class CompiledSerializerTests(CatalogSerializerTestCase):
+    """compile_serializer() output is identical to the DRF serializer it was compiled from."""
+
+    cases = (
+        (CompiledProductListSerializer, Product),
+        (CompiledBrandSerializer, Brand),
+        (CompiledCategorySerializer, Category),
+        (CompiledTagSerializer, Tag),
+        (CompiledProductCollectionDetailSerializer, ProductCollection),
+    )
+
+    def test_many_matches_drf_serializer(self):
+        for compiled_class, model in self.cases:
+            with self.subTest(serializer=compiled_class.serializer_class.__name__):
+                rows = list(compiled_class.project_queryset(model.objects.order_by('pk')))
+                self.assertEqual(
+                    compiled_class(rows, many=True, context=self.context).data,
+                    compiled_class.serializer_class(rows, many=True, context=self.context).data,
+                )
+
+    def test_single_instance_matches_drf_serializer(self):
+        for compiled_class, model in self.cases:
+            with self.subTest(serializer=compiled_class.serializer_class.__name__):
+                instance = compiled_class.project_queryset(model.objects.order_by('pk'))[0]
+                self.assertEqual(
+                    compiled_class(instance, context=self.context).data,
+                    compiled_class.serializer_class(instance, context=self.context).data,
+                )
+
+    def test_output_without_request_matches_drf_serializer(self):
+        rows = list(CompiledProductListSerializer.project_queryset(Product.objects.order_by('pk')))
+        self.assertEqual(
+            CompiledProductListSerializer(rows, many=True).data,
+            ProductListSerializer(rows, many=True).data,
+        )
+
+    def test_serializing_loaded_rows_issues_no_queries(self):
+        for compiled_class, model in self.cases:
+            with self.subTest(serializer=compiled_class.serializer_class.__name__):
+                rows = list(compiled_class.project_queryset(model.objects.order_by('pk')))
+                compiled_class(rows, many=True, context=self.context).data  # Fills the reference caches.
+                with self.assertNumQueries(0):
+                    compiled_class(rows, many=True, context=self.context).data
+
+    def test_strict_mode_delegates_to_drf_serializer(self):
+        rows = list(CompiledProductListSerializer.project_queryset(Product.objects.order_by('pk')))
+        context = {**self.context, 'strict_projection': True}
+        self.assertEqual(
+            CompiledProductListSerializer(rows, many=True, context=context).data,
+            ProductListSerializer(rows, many=True, context=context).data,
+        )
@@ -1,27 +1,40 @@
+from django.conf import settings
 from django.urls import path
 
 from apps.products import views
 
 app_name = 'products'
 
+
+def read_view(view_class):
+    """The catalog read view, or its async variant in the ASGI deployment (CATALOG_ASYNC_VIEWS)."""
+    if settings.CATALOG_ASYNC_VIEWS:
+        view_class = views.ASYNC_READ_VIEWS.get(view_class, view_class)
+    return view_class.as_view()
+
+
 urlpatterns = [
     # --- Product ---
-    path("products/", views.ProductListView.as_view(), name="product_list"),
-    path("products/<slug:slug>/", views.ProductDetailView.as_view(), name="product_detail"),
+    path("products/", read_view(views.ProductListView), name="product_list"),
+    path("products/<slug:slug>/", read_view(views.ProductDetailView), name="product_detail"),
+    path("products/<slug:slug>/live/", views.ProductLiveUpdatesView.as_view(), name="product_live_updates"),
 
     # --- Category ---
-    path("categories/", views.CategoryListView.as_view(), name="category_list"),
-    path("categories/<slug:slug>/", views.CategoryDetailView.as_view(), name="category_detail"),
+    path("categories/", read_view(views.CategoryListView), name="category_list"),
+    path("categories/<slug:slug>/", read_view(views.CategoryDetailView), name="category_detail"),
 
     # --- Brand ---
-    path("brands/", views.BrandListView.as_view(), name="brand_list"),
-    path("brands/<slug:slug>/", views.BrandDetailView.as_view(), name="brand_detail"),
+    path("brands/", read_view(views.BrandListView), name="brand_list"),
+    path("brands/<slug:slug>/", read_view(views.BrandDetailView), name="brand_detail"),
 
     # --- Tag ---
-    path("tags/", views.TagListView.as_view(), name="tag_list"),
-    path("tags/<slug:slug>/", views.TagDetailView.as_view(), name="tag_detail"),
+    path("tags/", read_view(views.TagListView), name="tag_list"),
+    path("tags/<slug:slug>/", read_view(views.TagDetailView), name="tag_detail"),
 
     # --- Product Collection ---
-    path("collections/", views.ProductCollectionListView.as_view(), name="collection_list"),
-    path("collections/<slug:slug>/", views.ProductCollectionDetailView.as_view(), name="collection_detail"),
+    path("collections/", read_view(views.ProductCollectionListView), name="collection_list"),
+    path("collections/<slug:slug>/", read_view(views.ProductCollectionDetailView), name="collection_detail"),
+
+    # --- Delta Sync ---
+    path("catalog/changes/", views.CatalogChangesView.as_view(), name="catalog_changes"),
 ]
@@ -1,25 +1,37 @@
-from django.db.models import Q
+import asyncio
+
+from django.conf import settings
+from django.views import View
+from django.db.models import Max, Q
 from django.utils import timezone
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
+from asgiref.sync import sync_to_async
 from rest_framework import generics, status
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny
 
+from apps.products import cache as catalog_cache, live
+from apps.common.mixins import ConditionalGetMixin, EdgeCacheMixin, ProjectedQuerySetMixin, ReplicaReadMixin
+from apps.common.views import AsyncReadView, AsyncProjectedReadView
 from apps.products.filters import ProductFilter
-from apps.products.services import ProductService
+from apps.products.services import ProductService, CatalogChangeLog
 from apps.products.exceptions import ProductNotFound
-from apps.products.models import Product, Category, Brand, Tag, ProductCollection
+from apps.products.models import Product, Category, Brand, Tag, ProductCollection, CatalogChange
 from apps.products.serializers import (
-    ProductListSerializer, ProductDetailSerializer, CategorySerializer, BrandSerializer,
-    TagSerializer, ProductCollectionDetailSerializer, ProductCollectionSerializer,
+    ProductDetailSerializer, ProductCollectionSerializer, CompiledProductListSerializer, CompiledCategorySerializer,
+    CompiledBrandSerializer, CompiledTagSerializer, CompiledProductCollectionDetailSerializer, CatalogChangeSerializer,
 )
 
 
-class ProductListView(generics.ListAPIView):
+class ProductListView(EdgeCacheMixin, ConditionalGetMixin, ReplicaReadMixin, ProjectedQuerySetMixin, generics.ListAPIView):
     """
     API view to list all published products. Supports advanced filtering and ordering.
     e.g., /api/products/?category_slug=laptops&brand_slug=apple
     """
-    serializer_class = ProductListSerializer
+    serializer_class = CompiledProductListSerializer
     permission_classes = [AllowAny]
     filterset_class = ProductFilter
 
@@ -27,72 +39,120 @@ class ProductListView(generics.ListAPIView):
         """
         Return the queryset for the product list, ensuring no duplicates
         are returned when filtering across multiple related tables.
+        Columns and prefetches are narrowed to what the serializer reads by ProjectedQuerySetMixin.
+        """
+        return Product.objects.published().distinct()
+
+    def get_validators(self, request):
         """
-        return Product.objects.published().with_details().distinct()
+        Any catalog change invalidates the listing's ETag, as does a scheduled product going live
+        (which bumps the newest published_at that is not in the future).
+        """
+        version = catalog_cache.version_of(catalog_cache.CATALOG_TAG)
+        if version is None:
+            return None, None
+        latest = Product.objects.filter(published_at__lte=timezone.now()).aggregate(latest=Max('published_at'))['latest']
+        return f'{version}:{latest}', None
+
+    def get_surrogate_keys(self, data):
+        return catalog_cache.product_list_tags(data)
 
+    def list(self, request, *args, **kwargs):
+        """Serves the listing from the catalog cache; see CATALOG_CACHE_SETTINGS['PRODUCT_LIST']."""
+        build_listing = super().list
+        data = catalog_cache.get_product_list(request, lambda: build_listing(request, *args, **kwargs).data)
+        return Response(data)
 
-class ProductDetailView(generics.GenericAPIView):
+
+class ProductDetailView(EdgeCacheMixin, ConditionalGetMixin, ReplicaReadMixin, generics.RetrieveAPIView):
     """API view to retrieve the detailed information for a single product."""
     permission_classes = [AllowAny]
     serializer_class = ProductDetailSerializer
 
-    def get(self, request, slug: str, *args, **kwargs):
+    def get_validators(self, request):
+        """The ETag follows the product's cache tag, which every change to its variants, prices and media bumps."""
+        product_id = Product.objects.published().filter(slug=self.kwargs['slug']).values_list('id', flat=True).first()
+        if product_id is None:
+            return None, None
+        version = catalog_cache.version_of(catalog_cache.product_tag(product_id))
+        return (f'{product_id}:{version}' if version else None), None
+
+    def get_surrogate_keys(self, data):
+        return catalog_cache.product_detail_tags(data)
+
+    def retrieve(self, request, slug: str, *args, **kwargs):
         """Handles GET request for a single product by its slug."""
         try:
-            service = ProductService(product_slug=slug)
-            product_context = service.get_context_for_detail_page()
-            serializer = self.get_serializer(product_context)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            data = catalog_cache.get_product_detail(request, slug, lambda: self._build_detail(slug))
+            return Response(data, status=status.HTTP_200_OK)
         except ProductNotFound as e:
             return Response({"detail": str(e)}, status=status.HTTP_404_NOT_FOUND)
 
+    def _build_detail(self, slug: str) -> dict:
+        service = ProductService(product_slug=slug)
+        product_context = service.get_context_for_detail_page()
+        return self.get_serializer(product_context).data
+
 
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(EdgeCacheMixin, ConditionalGetMixin, ReplicaReadMixin, ProjectedQuerySetMixin, generics.ListAPIView):
     """API view to list all active categories."""
     queryset = Category.objects.filter(is_active=True)
-    serializer_class = CategorySerializer
+    serializer_class = CompiledCategorySerializer
     permission_classes = [AllowAny]
 
+    def get_validators(self, request):
+        """The ETag follows the category tree's cache tag, so revalidation needs no query."""
+        return catalog_cache.version_of(catalog_cache.CATEGORY_TREE_TAG), None
 
-class CategoryDetailView(generics.RetrieveAPIView):
+    def get_surrogate_keys(self, data):
+        return [catalog_cache.CATEGORY_TREE_TAG]
+
+    def list(self, request, *args, **kwargs):
+        """Serves the categories from the catalog cache; see CATALOG_CACHE_SETTINGS['CATEGORY_TREE']."""
+        build_categories = super().list
+        data = catalog_cache.get_category_tree(request, lambda: build_categories(request, *args, **kwargs).data)
+        return Response(data)
+
+
+class CategoryDetailView(EdgeCacheMixin, ConditionalGetMixin, ReplicaReadMixin, ProjectedQuerySetMixin, generics.RetrieveAPIView):
     """API view to retrieve a single category by its slug."""
     queryset = Category.objects.filter(is_active=True)
-    serializer_class = CategorySerializer
+    serializer_class = CompiledCategorySerializer
     permission_classes = [AllowAny]
     lookup_field = 'slug'
 
 
-class BrandListView(generics.ListAPIView):
+class BrandListView(EdgeCacheMixin, ConditionalGetMixin, ReplicaReadMixin, ProjectedQuerySetMixin, generics.ListAPIView):
     """API view to list all active brands."""
     queryset = Brand.objects.filter(is_active=True)
-    serializer_class = BrandSerializer
+    serializer_class = CompiledBrandSerializer
     permission_classes = [AllowAny]
 
 
-class BrandDetailView(generics.RetrieveAPIView):
+class BrandDetailView(EdgeCacheMixin, ConditionalGetMixin, ReplicaReadMixin, ProjectedQuerySetMixin, generics.RetrieveAPIView):
     """API view to retrieve a single brand by its slug."""
     queryset = Brand.objects.filter(is_active=True)
-    serializer_class = BrandSerializer
+    serializer_class = CompiledBrandSerializer
     permission_classes = [AllowAny]
     lookup_field = 'slug'
 
 
-class TagListView(generics.ListAPIView):
+class TagListView(EdgeCacheMixin, ConditionalGetMixin, ReplicaReadMixin, ProjectedQuerySetMixin, generics.ListAPIView):
     """API view to list all active tags."""
     queryset = Tag.objects.filter(is_active=True)
-    serializer_class = TagSerializer
+    serializer_class = CompiledTagSerializer
     permission_classes = [AllowAny]
 
 
-class TagDetailView(generics.RetrieveAPIView):
+class TagDetailView(EdgeCacheMixin, ConditionalGetMixin, ReplicaReadMixin, ProjectedQuerySetMixin, generics.RetrieveAPIView):
     """API view to retrieve a single tag by its slug."""
     queryset = Tag.objects.filter(is_active=True)
-    serializer_class = TagSerializer
+    serializer_class = CompiledTagSerializer
     permission_classes = [AllowAny]
     lookup_field = 'slug'
 
 
-class ProductCollectionListView(generics.ListAPIView):
+class ProductCollectionListView(EdgeCacheMixin, ConditionalGetMixin, ReplicaReadMixin, generics.ListAPIView):
     serializer_class = ProductCollectionSerializer
     permission_classes = [AllowAny]
 
@@ -108,9 +168,198 @@ class ProductCollectionListView(generics.ListAPIView):
         ).filter(Q(end_date__gte=now) | Q(end_date__isnull=True))
 
 
-class ProductCollectionDetailView(generics.RetrieveAPIView):
+class ProductCollectionDetailView(EdgeCacheMixin, ConditionalGetMixin, ReplicaReadMixin, ProjectedQuerySetMixin, generics.RetrieveAPIView):
     """API view to retrieve a single product collection by its slug."""
     queryset = ProductCollection.objects.filter(is_active=True)
-    serializer_class = ProductCollectionDetailSerializer
+    serializer_class = CompiledProductCollectionDetailSerializer
     permission_classes = [AllowAny]
     lookup_field = 'slug'
+
+    def get_validators(self, request):
+        """The collection shows its products' prices and stock, so any catalog change invalidates its ETag."""
+        version = catalog_cache.version_of(catalog_cache.CATALOG_TAG)
+        return (f"{self.kwargs['slug']}:{version}" if version else None), None
+
+    def get_surrogate_keys(self, data):
+        return catalog_cache.collection_detail_tags(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Serves the collection from the catalog cache; see CATALOG_CACHE_SETTINGS['COLLECTION_DETAIL']."""
+        build_collection = super().retrieve
+        data = catalog_cache.get_collection_detail(
+            request, kwargs['slug'], lambda: build_collection(request, *args, **kwargs).data
+        )
+        return Response(data)
+
+
+class CatalogChangesView(generics.GenericAPIView):
+    """
+    Delta sync: the products, variants, prices and inventory records created, updated or deleted after a cursor.
+    e.g., /api/v1/catalog/changes/?since=1042&limit=500
+    Without `since`, returns the current cursor, to start syncing from after a full download.
+    A cursor older than the retained log gets 410 Gone, and the client must download the catalog again.
+    """
+    permission_classes = [AllowAny]
+    serializer_class = CatalogChangeSerializer
+
+    def get(self, request, *args, **kwargs):
+        config = settings.CATALOG_CHANGES_SETTINGS
+        if 'since' not in request.query_params:
+            return Response({'changes': [], 'cursor': str(CatalogChange.objects.latest_cursor()), 'has_more': False})
+
+        cursor = self._get_int_param('since', minimum=0)
+        limit = min(self._get_int_param('limit', default=config['PAGE_SIZE'], minimum=1), config['MAX_PAGE_SIZE'])
+        if cursor < CatalogChange.objects.oldest_cursor():
+            return Response(
+                {"detail": _("The cursor is older than the retained change log. Download the catalog again.")},
+                status=status.HTTP_410_GONE,
+            )
+
+        changes, next_cursor, has_more = CatalogChangeLog.read(cursor, limit, config['SETTLE_SECONDS'])
+        return Response({
+            'changes': self.get_serializer(changes, many=True).data,
+            'cursor': str(next_cursor),
+            'has_more': has_more,
+        })
+
+    def _get_int_param(self, name: str, default: int = None, minimum: int = 0) -> int:
+        value = self.request.query_params.get(name, default)
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            raise ValidationError({name: _("A whole number is required.")})
+        if value < minimum:
+            raise ValidationError({name: _("Must be at least %(minimum)s.") % {'minimum': minimum}})
+        return value
+
+
+class ProductLiveUpdatesView(View):
+    """
+    Streams stock and price changes of a product as Server-Sent Events.
+    e.g., /api/v1/products/<slug>/live/
+    The stream opens with a `snapshot` event, followed by `stock` and `price` events as they happen.
+    Served by the ASGI deployment, where an open stream is a coroutine waiting on a queue rather than a
+    worker; under WSGI the stream ends after the snapshot and EventSource clients poll on reconnect.
+    """
+
+    async def get(self, request, slug: str, *args, **kwargs):
+        product_id = await sync_to_async(live.get_published_product_id, thread_sensitive=False)(slug)
+        if product_id is None:
+            return JsonResponse({"detail": str(_("The product with the given slug does not exist or is not active."))}, status=404)
+
+        stream = self._stream(product_id, follow=isinstance(request, ASGIRequest))
+        response = StreamingHttpResponse(stream, content_type='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        # Tells nginx to pass events through as they are written.
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+    @staticmethod
+    async def _stream(product_id: int, follow: bool):
+        config = settings.LIVE_UPDATES_SETTINGS
+        # Subscribed before the snapshot is read, so no update falls between the two.
+        async with live.hub.subscribe(product_id) as queue:
+            data = await sync_to_async(live.snapshot, thread_sensitive=False)(product_id)
+            yield f"retry: {config['RETRY_MS']}\n\n".encode() + live.format_event('snapshot', data)
+            while follow:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=config['HEARTBEAT'])
+                except asyncio.TimeoutError:
+                    yield b': keep-alive\n\n'
+
+
+# --- Async read path ---
+# Served instead of the DRF views above when CATALOG_ASYNC_VIEWS is set, i.e. by the ASGI deployment (backend-asgi).
+
+class AsyncProductListView(AsyncReadView):
+    sync_view_class = ProductListView
+
+    async def aget_validators(self, request, *args, **kwargs):
+        version = await catalog_cache.aversion_of(catalog_cache.CATALOG_TAG)
+        if version is None:
+            return None, None
+        latest = await Product.objects.filter(published_at__lte=timezone.now()).aaggregate(latest=Max('published_at'))
+        return f"{version}:{latest['latest']}", None
+
+    async def aget_data(self, request, *args, **kwargs):
+        return await catalog_cache.aget_product_list(kwargs['version'], request.get_host(), request.GET)
+
+    def get_surrogate_keys(self, data):
+        return catalog_cache.product_list_tags(data)
+
+
+class AsyncProductDetailView(AsyncReadView):
+    sync_view_class = ProductDetailView
+
+    async def aget_validators(self, request, *args, **kwargs):
+        product_id = await Product.objects.published().filter(slug=kwargs['slug']).values_list('id', flat=True).afirst()
+        if product_id is None:
+            return None, None
+        version = await catalog_cache.aversion_of(catalog_cache.product_tag(product_id))
+        return (f'{product_id}:{version}' if version else None), None
+
+    async def aget_data(self, request, *args, **kwargs):
+        return await catalog_cache.aget_product_detail(kwargs['version'], kwargs['slug'])
+
+    def get_surrogate_keys(self, data):
+        return catalog_cache.product_detail_tags(data)
+
+
+class AsyncCategoryListView(AsyncReadView):
+    sync_view_class = CategoryListView
+
+    async def aget_validators(self, request, *args, **kwargs):
+        return await catalog_cache.aversion_of(catalog_cache.CATEGORY_TREE_TAG), None
+
+    async def aget_data(self, request, *args, **kwargs):
+        return await catalog_cache.aget_category_tree(kwargs['version'])
+
+    def get_surrogate_keys(self, data):
+        return [catalog_cache.CATEGORY_TREE_TAG]
+
+
+class AsyncCategoryDetailView(AsyncProjectedReadView):
+    sync_view_class = CategoryDetailView
+
+
+class AsyncBrandListView(AsyncProjectedReadView):
+    sync_view_class = BrandListView
+
+
+class AsyncBrandDetailView(AsyncProjectedReadView):
+    sync_view_class = BrandDetailView
+
+
+class AsyncTagListView(AsyncProjectedReadView):
+    sync_view_class = TagListView
+
+
+class AsyncTagDetailView(AsyncProjectedReadView):
+    sync_view_class = TagDetailView
+
+
+class AsyncProductCollectionListView(AsyncProjectedReadView):
+    sync_view_class = ProductCollectionListView
+
+
+class AsyncProductCollectionDetailView(AsyncReadView):
+    sync_view_class = ProductCollectionDetailView
+
+    async def aget_validators(self, request, *args, **kwargs):
+        version = await catalog_cache.aversion_of(catalog_cache.CATALOG_TAG)
+        return (f"{kwargs['slug']}:{version}" if version else None), None
+
+    async def aget_data(self, request, *args, **kwargs):
+        return await catalog_cache.aget_collection_detail(kwargs['version'], kwargs['slug'])
+
+    def get_surrogate_keys(self, data):
+        return catalog_cache.collection_detail_tags(data)
+
+
+ASYNC_READ_VIEWS = {
+    view.sync_view_class: view for view in (
+        AsyncProductListView, AsyncProductDetailView, AsyncCategoryListView, AsyncCategoryDetailView,
+        AsyncBrandListView, AsyncBrandDetailView, AsyncTagListView, AsyncTagDetailView,
+        AsyncProductCollectionListView, AsyncProductCollectionDetailView,
+    )
+}
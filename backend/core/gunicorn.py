@@ -23,3 +23,17 @@ capture_output = True
 
 # The granularity of error log output.
 loglevel = "info"
+
+
+# --- Prometheus multiprocess mode ---
+# Every worker writes its samples to PROMETHEUS_MULTIPROC_DIR; the /metrics view aggregates them.
+def on_starting(server):
+    """Clears samples left over from a previous run of the master process."""
+    from apps.common import metrics
+    metrics.clear_multiprocess_dir()
+
+
+def child_exit(server, worker):
+    """Drops the live samples of a worker that has exited."""
+    from apps.common import metrics
+    metrics.mark_process_dead(worker.pid)
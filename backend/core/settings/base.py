@@ -53,6 +53,7 @@ INSTALLED_APPS = DEFAULT_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 # --- Middleware configuration ---
 MIDDLEWARE = [
+    "apps.common.middleware.PrometheusMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     'corsheaders.middleware.CorsMiddleware',
@@ -60,6 +61,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "apps.common.middleware.DatabaseRoutingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -139,6 +141,19 @@ OTP_SETTINGS = {
     'OTP_EXPIRY_MINUTES': 2,
     'MAX_ATTEMPTS': 5,
     'COOLDOWN_SECONDS': 60,
+    # Where live codes are kept: the OTP table (DatabaseOTPStore), or Redis (RedisOTPStore), which leaves
+    # only verified and failed codes in the table, written by a background task for auditing.
+    'STORE_CLASS': env.str('DJANGO_OTP_STORE_CLASS', default='apps.account.otp_stores.DatabaseOTPStore'),
+    'REDIS_CACHE_ALIAS': 'default',
+}
+
+# --- Account data retention (apps.account.tasks, run daily by Celery beat) ---
+ACCOUNT_RETENTION_SETTINGS = {
+    'OTP_RETENTION_DAYS': 30,  # OTPs are kept this long for auditing; a partitioned table keeps whole months.
+    'STALE_ACCOUNT_DAYS': 7,  # Inactive accounts that never verified their phone number or logged in.
+    'BATCH_SIZE': 1000,  # Rows deleted per transaction.
+    'BATCH_PAUSE': 0.1,  # Seconds between batches, so replicas and autovacuum keep up.
+    'PARTITION_MONTHS_AHEAD': 2,  # Monthly OTP partitions created in advance.
 }
 
 # --- Notification settings ---
@@ -177,6 +192,18 @@ NOTIFICATIONS_SETTINGS = {
                 'API_KEY': env.str('DJANGO_KAVENEGAR_API_KEY', default=''),
             }
         },
+        # Sends through the healthiest of PROVIDERS with failover (see SMSRouterChannel).
+        'router': {
+            'CHANNEL_CLASS': 'apps.notification.channels.router.SMSRouterChannel',
+            'CONFIG': {
+                'PROVIDERS': env.list('DJANGO_SMS_ROUTER_PROVIDERS', default=['kavenegar']),
+                'DEADLINE': 5,  # Seconds a send may take, failovers included.
+                'WINDOW': 50,  # Recent sends per provider that its latency and error rate are computed over.
+                'MIN_SAMPLES': 10,
+                'FAILURE_RATE': 0.5,  # Error rate at which a provider's circuit opens...
+                'OPEN_SECONDS': 30,  # ...and how long it stays open before a trial send.
+            }
+        },
     },
 
     # --- TELEGRAM CHANNEL (NEW) ---
@@ -191,6 +218,122 @@ NOTIFICATIONS_SETTINGS = {
     },
 }
 
+# --- Notification outbox (see apps.notification.tasks.deliver_outbox) ---
+NOTIFICATION_OUTBOX_SETTINGS = {
+    'BATCH_SIZE': 100,  # Messages a worker claims at once.
+    'LEASE_SECONDS': 300,  # A claimed message that was neither sent nor failed (its worker died) is retried after this.
+    'MAX_ATTEMPTS': 6,  # Messages are dead-lettered after this many failed attempts.
+    # Failed sends are retried after RETRY_BACKOFF * 2^n seconds, with jitter and capped at RETRY_BACKOFF_MAX.
+    'RETRY_BACKOFF': 5,
+    'RETRY_BACKOFF_MAX': 600,
+    # Sends in flight at once per channel and worker process, to stay within each provider's limits.
+    'CHANNEL_CONCURRENCY': {'email': 4, 'sms': 8, 'telegram': 4},
+    'SWEEP_INTERVAL': 10,  # Seconds between sweeps for retries and messages whose worker was not woken up.
+    # Sent, expired and dead-lettered messages are deleted this long after they were written, by a daily task.
+    # Dead-lettered messages keep their payload until then, so they can be requeued from the admin.
+    'RETENTION_DAYS': 14,
+    'PURGE_BATCH_SIZE': 1000,  # Rows deleted per transaction.
+    'PURGE_BATCH_PAUSE': 0.1,  # Seconds between batches.
+}
+
+# --- Notification campaigns (see apps.notification.services.CampaignService) ---
+# The pace of a campaign is set by the RATE_LIMIT of the active provider's CONFIG (messages per second).
+NOTIFICATION_CAMPAIGN_SETTINGS = {
+    'CHUNK_SIZE': 1000,  # Recipients loaded and sent per step; progress is saved after each.
+    'LOCK_TIMEOUT': 600,  # Seconds a chunk may take before another worker may take the campaign over.
+}
+
+# --- Low stock alerts ---
+# Staff addresses emailed when a sale takes a variant's available stock down to its threshold.
+STOCK_ALERT_EMAILS = env.list("DJANGO_STOCK_ALERT_EMAILS", default=[])
+
+# --- Read replicas (see apps.common.db) ---
+# Read-only catalog views and replica_reads() blocks read from a replica; everything else uses `default`.
+DATABASE_ROUTERS = ["apps.common.db.PrimaryReplicaRouter"]
+DATABASE_REPLICA_SETTINGS = {
+    'REPLICAS': [],  # Aliases in DATABASES, set in prod.py from POSTGRES_REPLICA_HOSTS.
+    'STICKY_SECONDS': 15,  # Clients read from the primary for this long after a write; above MAX_LAG_SECONDS.
+    'MAX_LAG_SECONDS': 5,  # Replicas further behind are bypassed until they catch up.
+    'CHECK_INTERVAL': 5,  # Seconds between lag measurements of a replica, per worker process.
+}
+
+# --- Catalog cache configuration ---
+# Soft TTL: after it, one process refreshes the entry while the others keep serving the stale value.
+# Hard TTL: after it, the entry is gone and requests wait for (or compute) a fresh one.
+CATALOG_CACHE_SETTINGS = {
+    'PRODUCT_DETAIL': {'SOFT_TTL': 60, 'HARD_TTL': 60 * 30},
+    'PRODUCT_LIST': {'SOFT_TTL': 30, 'HARD_TTL': 60 * 10},
+    'CATEGORY_TREE': {'SOFT_TTL': 60 * 5, 'HARD_TTL': 60 * 60},
+    'FACETS': {'SOFT_TTL': 60 * 5, 'HARD_TTL': 60 * 60},
+    'COLLECTION_DETAIL': {'SOFT_TTL': 60, 'HARD_TTL': 60 * 30},
+    'LOCK_TTL': 10,  # Seconds a refresh may take before another process is allowed to try.
+    'LOCK_WAIT': 2,  # Seconds a request waits for another process to fill a missing entry.
+}
+
+# --- Cache tags ---
+# Lifetime of the Redis sets that map a dependency tag (e.g. "product:42") to the cache keys depending on it.
+# Must be at least as long as the longest-lived tagged cache entry.
+CACHE_TAG_SETTINGS = {
+    'TAG_TTL': 60 * 60 * 24,
+}
+
+# --- Catalog delta sync (/catalog/changes/) ---
+CATALOG_CHANGES_SETTINGS = {
+    'PAGE_SIZE': 500,
+    'MAX_PAGE_SIZE': 2000,
+    'SETTLE_SECONDS': 2,  # Changes younger than this are held back until concurrent transactions have committed.
+    'RETENTION_DAYS': 30,  # Clients whose cursor is older must download the catalog again.
+}
+
+# --- Live stock and price updates (Server-Sent Events, /products/<slug>/live/) ---
+LIVE_UPDATES_SETTINGS = {
+    'CHANNEL': 'catalog:live',  # Redis pub/sub channel that Price and Inventory changes are published to.
+    'HEARTBEAT': 15,  # Seconds between keep-alive comments, below the proxy read timeout.
+    'QUEUE_SIZE': 32,  # Updates buffered per stream; a slow client loses the oldest ones.
+    'RETRY_MS': 3000,  # Reconnection delay suggested to EventSource clients.
+}
+
+# --- Async catalog reads ---
+# Routes the catalog read endpoints to their async views (apps.products.views, "Async read path").
+# Set for the ASGI deployment (backend-asgi); the sync gunicorn workers keep the DRF views.
+CATALOG_ASYNC_VIEWS = env.bool("DJANGO_CATALOG_ASYNC_VIEWS", default=False)
+
+# --- Edge cache (nginx micro-cache in front of the catalog API, see nginx/snippets/) ---
+# PURGE_URL points at the nginx purge server; when empty, edge entries are never purged and every
+# response is kept for TTL only.
+EDGE_CACHE_SETTINGS = {
+    'PURGE_URL': env.str('EDGE_CACHE_PURGE_URL', default=''),
+    'TTL': 10,  # Seconds the edge keeps responses that cannot be purged.
+    'KEYED_TTL': 60 * 5,  # Seconds the edge keeps responses labelled with surrogate keys.
+    'KEY_TTL': 60 * 60,  # Lifetime of the Redis sets mapping a surrogate key to edge-cached paths.
+    'MAX_SURROGATE_KEYS': 100,  # Larger key sets would overflow the proxy's header buffers.
+    'MAX_PURGE_PATHS': 500,
+    'PURGE_TIMEOUT': 5,
+}
+
+# --- Reference data cache ---
+# Currencies, categories, brands, tags, attributes and product types are kept in an in-process LRU
+# in every worker, over the shared cache. Changes are broadcast on CHANNEL through Redis pub/sub.
+REFERENCE_CACHE_SETTINGS = {
+    'CHANNEL': 'reference-cache:invalidate',
+    'MAX_ENTRIES': 64,
+    'LOCAL_TTL': 60,  # Upper bound on staleness if an invalidation message is missed.
+    'TTL': 60 * 60 * 24,
+}
+
+# --- Authenticated user cache ---
+# Token and session authentication resolve users through the same two-tier cache as reference data
+# (see apps.account.authentication). Saving or deleting a user invalidates it in every worker.
+USER_CACHE_SETTINGS = {
+    'CHANNEL': 'user-cache:invalidate',
+    'MAX_ENTRIES': 10000,
+    'LOCAL_TTL': 30,  # Upper bound on staleness if an invalidation message is missed.
+    'TTL': 60 * 15,
+    # User fields copied into access tokens on login and refresh, so views using ClaimsJWTAuthentication
+    # can answer read-only requests without loading the user. Empty to leave them out.
+    'TOKEN_CLAIMS': env.list('DJANGO_JWT_USER_CLAIMS', default=['is_staff', 'is_superuser']),
+}
+
 # --- Rosetta configuration ---
 # https://django-rosetta.readthedocs.io/
 ROSETTA_MESSAGES_PER_PAGE = 100
@@ -221,21 +364,58 @@ CELERY_RESULT_BACKEND = f'redis://redis:{env("REDIS_PORT")}'
 # Set the celery timezone
 CELERY_TIMEZONE = 'UTC'
 
+# Queues: `otp` carries the deliveries of one-time passwords only (OTPService queues them there) and has a
+# worker of its own (celery-worker-otp), so a code never waits behind other work; `bulk` carries other
+# notifications; everything else uses `celery`.
+CELERY_TASK_ROUTES = {
+    'apps.notification.tasks.*': {'queue': 'bulk'},
+}
+
 # Celery Beat Schedule
 CELERY_BEAT_SCHEDULE = {
+    'deliver-notification-outbox': {
+        'task': 'apps.notification.tasks.deliver_outbox',
+        'schedule': NOTIFICATION_OUTBOX_SETTINGS['SWEEP_INTERVAL'],
+    },
+    'purge-expired-otps': {
+        'task': 'apps.account.tasks.purge_expired_otps',
+        'schedule': crontab(minute='15', hour='3'),
+    },
+    'purge-stale-accounts': {
+        'task': 'apps.account.tasks.purge_stale_accounts',
+        'schedule': crontab(minute='45', hour='3'),
+    },
+    'purge-notification-outbox': {
+        'task': 'apps.notification.tasks.purge_outbox',
+        'schedule': crontab(minute='30', hour='3'),
+    },
     # 'clear-expired-reservations': {
     #     'task': 'apps.checkout.tasks.clear_expired_reservations',
     #     'schedule': crontab(minute='0', hour='0'),
     # }
 }
 
+# --- Metrics Configuration ---
+# Set PROMETHEUS_MULTIPROC_DIR in the environment to aggregate metrics across gunicorn/Celery worker processes.
+METRICS_SETTINGS = {
+    'CELERY_QUEUES': ['celery', 'otp', 'bulk'],
+    'CELERY_EXPORTER_PORT': env.int('CELERY_METRICS_PORT', default=9808),
+    'POOL_STATS_INTERVAL': 5,  # Seconds between exports of a worker's connection pool statistics.
+    # /metrics answers direct (not proxied) requests from these networks, or, when AUTH_TOKEN is set,
+    # only requests sending it as "Authorization: Bearer <token>".
+    'ALLOWED_NETWORKS': env.list(
+        'DJANGO_METRICS_ALLOWED_NETWORKS', default=['127.0.0.0/8', '10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16'],
+    ),
+    'AUTH_TOKEN': env.str('DJANGO_METRICS_TOKEN', default=''),
+}
+
 # --- Django Rest Framework Configuration ---
 REST_FRAMEWORK = {
     # 'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     # 'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     # 'PAGE_SIZE': 10,
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.account.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',  # For DRF browsable API
     ],
     # 'DEFAULT_PERMISSION_CLASSES': [
@@ -245,16 +425,45 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend'
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'apps.common.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'apps.common.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_VERSIONING_CLASS': 'rest_framework.versioning.URLPathVersioning',
     'DEFAULT_VERSION': 'v1',
     'ALLOWED_VERSIONS': ['v1', 'v2'],
     'VERSION_PARAM': 'version',
+    # Rates of the throttles in apps.account.throttles, checked before any database work.
+    'DEFAULT_THROTTLE_RATES': {
+        'auth_ip': '30/min',  # Per client IP, across the login and OTP endpoints.
+        'login_identifier': '20/hour',  # Account checks and password logins per phone number or email.
+        'otp_identifier': '5/hour',  # Codes and reset messages sent per phone number or email.
+        'otp_phone_prefix': '50/hour',  # Codes sent per phone number prefix, e.g. a block of 1,000 numbers in +98.
+    },
+    # nginx appends the address it sees to X-Forwarded-For; earlier entries come from the client.
+    'NUM_PROXIES': env.int('DJANGO_NUM_PROXIES', default=1),
 }
 
+# --- JSON rendering ---
+# How ORJSONRenderer writes Decimal values that are not already formatted by a serializer field:
+# "number" (exact JSON number, e.g. 99149.88) or "string" (e.g. "99149.88").
+JSON_DECIMAL_FORMAT = env.str("DJANGO_JSON_DECIMAL_FORMAT", default="number")
+
+# --- Serializer projection ---
+# When enabled, a ProjectedModelSerializer that reads a column it did not declare raises instead of
+# silently issuing one refresh query per row. Enabled in development, see dev.py.
+STRICT_SERIALIZER_PROJECTION = env.bool("DJANGO_STRICT_SERIALIZER_PROJECTION", default=False)
+
 # --- Simple JWT Configuration ---
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=30),
+    "TOKEN_REFRESH_SERIALIZER": "apps.account.serializers.UserTokenRefreshSerializer",
 
     # # 'ROTATE_REFRESH_TOKENS': False,
     # # 'BLACKLIST_AFTER_ROTATION': True,
@@ -3,6 +3,9 @@ from core.settings.base import *
 # --- SECURITY WARNING: don't run with debug turned on in production! ---
 DEBUG = env.bool("DJANGO_DEBUG", default=True)
 
+# --- Fail loudly when a serializer reads a deferred column ---
+STRICT_SERIALIZER_PROJECTION = env.bool("DJANGO_STRICT_SERIALIZER_PROJECTION", default=DEBUG)
+
 # --- Allowed hosts ---
 ALLOWED_HOSTS = env.list("DJANGO_ALLOWED_HOSTS", default=["localhost", "127.0.0.1"])
 
@@ -36,16 +36,42 @@ DATABASES = {
         "PASSWORD": env.str("POSTGRES_PASSWORD", default=""),
         "HOST": env.str("POSTGRES_HOST", default="db"),  # Use 'db' for Docker container
         "PORT": env.int("POSTGRES_PORT", default=5432),
+        # Connections are pooled per worker process (psycopg_pool) rather than opened per request;
+        # a request borrows one and returns it when it ends. Checked with a round trip before reuse.
+        "CONN_MAX_AGE": 0,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "pool": {
+                "min_size": env.int("POSTGRES_POOL_MIN_SIZE", default=1),
+                # One per thread that may query at once: 1-2 for a sync worker or a Celery pool process,
+                # more for the ASGI workers, whose ORM calls run in a thread pool.
+                "max_size": env.int("POSTGRES_POOL_MAX_SIZE", default=2),
+                "timeout": env.float("POSTGRES_POOL_TIMEOUT", default=10),  # Seconds to wait for a free connection.
+                "max_idle": 300,
+                "max_lifetime": 60 * 30,
+            },
+        },
     }
 }
 
+# Streaming replicas of the primary, as a comma-separated host[:port] list, reached with the same credentials.
+for index, replica in enumerate(env.list("POSTGRES_REPLICA_HOSTS", default=[]), start=1):
+    replica_host, _, replica_port = replica.partition(":")
+    DATABASES[f"replica_{index}"] = {
+        **DATABASES["default"],
+        "HOST": replica_host,
+        "PORT": int(replica_port or 5432),
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_REPLICA_SETTINGS["REPLICAS"] = [alias for alias in DATABASES if alias.startswith("replica_")]
+
 # --- Cache Configuration ---
 CACHES = {
     'default': {
         'BACKEND': 'django_redis.cache.RedisCache',
         'LOCATION': f'redis://redis:{env("REDIS_PORT", default=6379)}/1',  # 1 to separate from celery
         'OPTIONS': {
-            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'CLIENT_CLASS': 'apps.common.cache.MetricsRedisClient',
         },
         'KEY_PREFIX': 'fast_miveh',
     }
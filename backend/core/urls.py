@@ -4,6 +4,8 @@ from django.conf.urls.static import static
 from django.urls import path, include, re_path
 from django.conf.urls.i18n import i18n_patterns
 
+from apps.common.views import metrics_view
+
 api_urlpatterns = [
     re_path(r'^(?P<version>v\d+)/', include('apps.account.urls', namespace='account')),
     re_path(r'^(?P<version>v\d+)/', include('apps.products.urls', namespace='products')),
@@ -13,6 +15,8 @@ api_urlpatterns = [
 urlpatterns = [
     # Group all API urls under a single path
     path('api/', include(api_urlpatterns)),
+    # Prometheus scrape endpoint (internal network only, see METRICS_SETTINGS)
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 # urlpatterns += i18n_patterns(
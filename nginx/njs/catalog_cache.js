@@ -0,0 +1,21 @@
+// Builds the micro-cache key of catalog API requests from a normalized query string:
+// parameters sorted by name and value, with empty and tracking parameters dropped, so that
+// ?brand=x&category=y and ?category=y&brand=x&utm_source=z share one cache entry.
+const IGNORED_PARAMS = /^(utm_\w+|fbclid|gclid|_)$/;
+
+function cacheKey(r) {
+    const pairs = [];
+    for (const name of Object.keys(r.args).sort()) {
+        if (IGNORED_PARAMS.test(name)) {
+            continue;
+        }
+        const values = [].concat(r.args[name]).filter((value) => value !== '').sort();
+        for (const value of values) {
+            pairs.push(encodeURIComponent(name) + '=' + encodeURIComponent(value));
+        }
+    }
+    const query = pairs.length ? '?' + pairs.join('&') : '';
+    return r.variables.catalog_cache_scheme + '://' + r.variables.host + r.uri + query;
+}
+
+export default { cacheKey };